@@ -27,8 +27,13 @@ admin.site.register(models.Game, GameAdmin)
 admin.site.register(models.Question)
 admin.site.register(models.Participant)
 admin.site.register(models.Leaderboard)
+admin.site.register(models.LeaderboardFrame)
+admin.site.register(models.GlobalLeaderboardEntry)
 admin.site.register(models.Answer)
 admin.site.register(models.Topic)
 admin.site.register(models.GameMessage)
+admin.site.register(models.GamePreparationJob)
+admin.site.register(models.QuestionPool)
+admin.site.register(models.LLMCallRecord)
 admin.site.register(models.SinglePlayerGame, SinglePlayerGameAdmin)
 admin.site.register(models.SinglePlayerQuestion)
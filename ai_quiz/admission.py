@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import random
+import time
+import uuid
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from django.core.cache import cache
+
+import quizio.settings as settings
+from ai_quiz import metrics
+from ai_quiz.llm_policy import AdmissionRejected
+
+logger = logging.getLogger(__name__)
+
+# The host an LLM call is made for; background work shares the "" queue
+current_host: ContextVar[str] = ContextVar("admission_host", default="")
+
+# Seconds a call is assumed to hold its slot until one has been timed
+INITIAL_HOLD_SECONDS = 5.0
+
+
+class FairQueue:
+    """LLM calls waiting for admission in this worker, served round robin by
+    host, so a burst from one host delays each other host by at most one
+    call per round."""
+
+    def __init__(self):
+        # Insertion order is the round robin order
+        self._queues: dict[str, deque] = {}
+        self._changed = asyncio.Event()
+
+    def push(self, waiter, host: str):
+        self._queues.setdefault(host, deque()).append(waiter)
+
+    def head(self):
+        """The waiter to admit next, if any."""
+        for queue in self._queues.values():
+            return queue[0]
+        return None
+
+    def pop(self):
+        """Remove the head and move its host to the back of the round."""
+        host, queue = next(iter(self._queues.items()))
+        waiter = queue.popleft()
+        del self._queues[host]
+        if queue:
+            self._queues[host] = queue
+        self.notify()
+        return waiter
+
+    def discard(self, waiter, host: str):
+        queue = self._queues.get(host)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[host]
+            self.notify()
+
+    def position(self, host: str) -> int:
+        """How many queued calls would be admitted before a new one from `host`."""
+        own = len(self._queues.get(host, ()))
+        return own + sum(
+            min(len(queue), own + 1)
+            for other, queue in self._queues.items()
+            if other != host
+        )
+
+    def notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait(self, timeout: float):
+        """Wait until the queue changes or `timeout` seconds pass."""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def __len__(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+
+class AdmissionController:
+    """Cluster-wide admission control for LLM calls.
+
+    A call needs one of `ADMISSION_CONCURRENCY` slots and a token from a
+    bucket of `ADMISSION_RATE` tokens refilled every second. Both live in the
+    Django cache (Redis when `REDIS_CACHE_URL` is set), so the limits hold
+    across workers; slots are leases, so a worker that dies frees its slots
+    when they expire. Waiting calls queue fairly by host, and calls whose
+    estimated wait exceeds `ADMISSION_MAX_QUEUE_WAIT` are rejected at once.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._queues: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._in_flight: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._hold = INITIAL_HOLD_SECONDS
+        # Count of leased slots, so polls skip the slot scan while all are
+        # taken. The leases stay the limit; the count expires a lease after
+        # it was created, dropping increments of workers that died holding
+        # slots no later than their leases would.
+        self._in_use = f"admission:{name}:in_use"
+
+    def _queue(self) -> FairQueue:
+        loop = asyncio.get_running_loop()
+        queue = self._queues.get(loop)
+        if queue is None:
+            queue = self._queues[loop] = FairQueue()
+        return queue
+
+    def estimate(self, host: str) -> tuple[int, float]:
+        """Return the queue position and estimated wait in seconds of a new
+        call from `host`."""
+        position = self._queue().position(host)
+        in_flight = self._in_flight.get(asyncio.get_running_loop(), 0)
+        rounds = (position + in_flight) // max(1, settings.ADMISSION_CONCURRENCY)
+        wait = max(rounds * self._hold, position / max(1, settings.ADMISSION_RATE))
+        return position, wait
+
+    def queued(self) -> int:
+        """How many calls of this worker are waiting for admission."""
+        return len(self._queue())
+
+    def check(self, host: str) -> tuple[int, float]:
+        """Return `estimate(host)`, raising `AdmissionRejected` when the wait
+        would exceed the SLO."""
+        position, wait = self.estimate(host)
+        if settings.ADMISSION_ENABLED and wait > settings.ADMISSION_MAX_QUEUE_WAIT:
+            metrics.increment("llm_admission", controller=self.name, outcome="rejected")
+            raise AdmissionRejected(
+                f"Estimated LLM queue wait of {wait:.1f}s exceeds "
+                f"{settings.ADMISSION_MAX_QUEUE_WAIT}s",
+                retry_after=wait,
+            )
+        return position, wait
+
+    @asynccontextmanager
+    async def slot(self, timeout: float | None = None):
+        """Hold admission for one call of the current host.
+
+        Raises `AdmissionRejected` when the wait would exceed the SLO and
+        `TimeoutError` after waiting `timeout` seconds.
+        """
+        if not settings.ADMISSION_ENABLED:
+            yield
+            return
+        host = current_host.get()
+        self.check(host)
+        lease = await self._admit(host, timeout)
+        loop = asyncio.get_running_loop()
+        self._in_flight[loop] = self._in_flight.get(loop, 0) + 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._in_flight[loop] -= 1
+            held = time.perf_counter() - started
+            self._hold += 0.2 * (held - self._hold)
+            await self._release(*lease)
+            self._queue().notify()
+
+    async def _admit(self, host: str, timeout: float | None) -> tuple[str, str]:
+        queue = self._queue()
+        loop = asyncio.get_running_loop()
+        requested_at = loop.time()
+        deadline = None if timeout is None else requested_at + timeout
+        waiter = object()
+        queue.push(waiter, host)
+        try:
+            while True:
+                if queue.head() is waiter:
+                    lease = await self._try_acquire()
+                    if lease is not None:
+                        queue.pop()
+                        metrics.increment(
+                            "llm_admission", controller=self.name, outcome="admitted"
+                        )
+                        metrics.observe(
+                            "llm_admission_wait_seconds",
+                            loop.time() - requested_at,
+                            controller=self.name,
+                        )
+                        return lease
+                pause = settings.ADMISSION_POLL_INTERVAL
+                if deadline is not None:
+                    if loop.time() >= deadline:
+                        metrics.increment(
+                            "llm_admission", controller=self.name, outcome="timeout"
+                        )
+                        raise asyncio.TimeoutError()
+                    pause = min(pause, deadline - loop.time())
+                # Slots freed by other workers are only seen by polling
+                await queue.wait(pause)
+        finally:
+            queue.discard(waiter, host)
+
+    async def _try_acquire(self) -> tuple[str, str] | None:
+        """Lease a free slot and take a token, or return None."""
+        token = uuid.uuid4().hex
+        key = ""
+        try:
+            slots = max(1, settings.ADMISSION_CONCURRENCY)
+            # One read instead of a lease attempt per slot while all are taken
+            if (await cache.aget(self._in_use) or 0) >= slots:
+                return None
+            first = random.randrange(slots)
+            for i in range(slots):
+                slot = f"admission:{self.name}:slot:{(first + i) % slots}"
+                if await cache.aadd(slot, token, timeout=settings.ADMISSION_SLOT_LEASE):
+                    key = slot
+                    break
+            else:
+                return None
+            await cache.aadd(self._in_use, 0, timeout=settings.ADMISSION_SLOT_LEASE)
+            await cache.aincr(self._in_use)
+            if not await self._take_token():
+                await self._release(key, token)
+                return None
+            return key, token
+        except Exception as e:
+            # Without the cache every call is admitted
+            logger.warning(f"LLM admission unavailable: {e!r}")
+            await self._release(key, token)
+            return "", token
+
+    async def _take_token(self) -> bool:
+        bucket = f"admission:{self.name}:tokens:{int(time.time())}"
+        await cache.aadd(bucket, 0, timeout=2)
+        return await cache.aincr(bucket) <= settings.ADMISSION_RATE
+
+    async def _release(self, key: str, token: str):
+        if not key:
+            return
+        try:
+            if await cache.aget(key) == token:
+                await cache.adelete(key)
+                await cache.adecr(self._in_use)
+        except ValueError:
+            # The in-use count expired while the slot was held
+            pass
+        except Exception as e:
+            logger.warning(f"Could not release LLM admission slot: {e!r}")
+
+
+# Every ai.py chain call is admitted here
+LLM_ADMISSION = AdmissionController("llm")
@@ -1,14 +1,33 @@
+import asyncio
 import logging
+import math
 import random
 import textwrap
-
-from langchain.output_parsers import YamlOutputParser
-from langchain.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
+import threading
+import time
+from contextlib import aclosing, nullcontext
+from typing import AsyncIterator, Awaitable, Callable
 
 logger = logging.getLogger(__name__)
-from pydantic import BaseModel
+from pydantic import BaseModel, RootModel
 import quizio.settings as settings
+from ai_quiz.admission import LLM_ADMISSION
+from ai_quiz.batching import (
+    BatchLatencyModel,
+    ConcurrencyBudget,
+    balanced_counts,
+    plan_batches,
+)
+from ai_quiz.llm_policy import (
+    AdmissionRejected,
+    CallPolicy,
+    LLMUnavailableError,
+    call_with_policy,
+    record_outcome,
+)
+from ai_quiz.parsers import OUTPUT_FORMATS, streaming_list_parser
+from ai_quiz.singleflight import SingleFlight, make_key
+from quizio.utils import normalize_text
 
 
 class TopicGenerator(BaseModel):
@@ -17,18 +36,12 @@ class TopicGenerator(BaseModel):
     subtopics: list[str]
 
 
-TOPIC_GENERATOR_PROMPT = PromptTemplate.from_template(
-    textwrap.dedent(
-        """
-You are an assistant who generates a list of subtopics based on a given topic. You should provide a diverse set of subtopics related to the given topic. Ensure that the subtopics span various aspects of the topic. The response should be structured as a YAML object in the following format:
+TOPIC_GENERATOR_TEMPLATE = textwrap.dedent(
+    """
+You are an assistant who generates a list of subtopics based on a given topic. You should provide a diverse set of subtopics related to the given topic. Ensure that the subtopics span various aspects of the topic. The response should be structured as a {format_name} object in the following format:
 
-```yaml
-thoughts: ""
-topic: ""
-subtopics:
-  - ""
-```
-Here is what the fields in the yaml mean:
+{output_format}
+Here is what the fields mean:
 - `thoughts`: Your notes to generate relevant subtopics.
 - `topic`: The main topic given by the user.
 - `subtopics`: A list of 10 subtopics related to the topic which is a short keyword or phrase.
@@ -44,7 +57,6 @@ Here is what the fields in the yaml mean:
 
 The topic is: {topic}.
 Begin!"""
-    )
 )
 
 
@@ -63,9 +75,18 @@ class TriviaGenerator(BaseModel):
     questions: list[Question]
 
 
+class TopicTriviaGenerator(TriviaGenerator):
+    """Subtopics and questions generated together by the combined prompt."""
+
+    subtopics: list[str]
+
+
+class Subtopic(RootModel[str]):
+    """One item of a streamed subtopics list."""
+
+
 # Get the prompt to use - you can modify this!
-QUESTION_GENERATOR_PROMPT = PromptTemplate.from_template(
-    """
+QUESTION_GENERATOR_TEMPLATE = """
 You are an AI assistant who generates trivia questions grounded in factuality from a given topic and it's subtopics. 
 Here are the terms you will encounter:
 - topic: str = The main subject for which you will generate questions.
@@ -76,18 +97,8 @@ Here are the terms you will encounter:
 - difficulty: str = The level of difficulty for the question, either "easy", "medium", or "hard".
 - n: int = The number of questions to generate.
 
-You must generate responses strictly in the given YAML format:
-```yaml
-thoughts: ""
-topic: ""
-difficulty: ""
-n: int
-questions:
- - subtopic: ""
-  question: ""
-  answer: ""
-  options: ["", "", "", ""]
-```
+You must generate responses strictly in the given {format_name} format:
+{output_format}
 For each topic, decide to choose some subtopics from the given list and generate a trivia. The question should be clear, and appropriate for the given difficulty level. The question should not be subjective. Ensure there are four options, with the correct answer randomly placed among them.
 
 ### Guidelines:
@@ -113,46 +124,464 @@ Now, generate the questions based on the provided data. Ensure accuracy, variety
 Begin!
 
 """
-)
 
-TOPIC_LLM = ChatOpenAI(
-    model="gpt-4o-mini",
-    model_kwargs={"response_format": {"type": "text"}},
-    temperature=0.2,
+# Chooses the subtopics and writes the questions in a single LLM round trip
+COMBINED_GENERATOR_TEMPLATE = """
+You are an AI assistant who generates trivia questions grounded in factuality for a given topic. First choose subtopics that span various aspects of the topic, then generate the questions from them.
+Here is what the fields mean:
+- `thoughts`: Your notes to choose the subtopics and generate the questions.
+- `topic`: The main subject for which you will generate questions.
+- `subtopics`: A list of 10 subtopics related to the topic, each a short keyword or phrase.
+- `difficulty`: The level of difficulty for the questions, either "easy", "medium", or "hard".
+- `n`: The number of questions to generate.
+- `questions`: The questions, each with the `subtopic` it is about, the `question`, the correct `answer` and four multiple-choice `options`.
+
+You must generate responses strictly in the given {format_name} format, with the subtopics before the questions:
+{output_format}
+
+### Guidelines:
+- The subtopics should be relevant to the topic and must not be subjective or opinion-based.
+- For **easy** difficulty: Questions should be basic and straightforward. This includes questions anyone who has heard the term should know.
+- For **medium** difficulty: Questions should require a basic understanding related to the subtopic.
+- For **hard** difficulty: Questions should be challenge the user's expertise in the subtopic.
+- You MUST ONLY GENERATE factual questions. Do not include opinion-based or subjective questions.
+- For **the questions**, ensure that:
+  - There is ONLY one correct answer.
+  - The other three options are plausible but incorrect.
+  - The correct answer should be randomly positioned among the four options.
+- Spread the questions across your subtopics.
+
+
+### Here is the data you'll need to generate the questions:
+- topic: {topic}
+- difficulty: {difficulty}
+- n: {n}
+
+Begin!
+
+"""
+
+# The response layout shown in each prompt, by `LLM_OUTPUT_FORMAT`
+TOPIC_OUTPUT_FORMATS = {
+    "json": """```json
+{"thoughts": "", "topic": "", "subtopics": [""]}
+```""",
+    "yaml": """```yaml
+thoughts: ""
+topic: ""
+subtopics:
+  - ""
+```""",
+}
+QUESTION_OUTPUT_FORMATS = {
+    "json": """```json
+{
+  "thoughts": "",
+  "topic": "",
+  "difficulty": "",
+  "n": 0,
+  "questions": [
+    {"subtopic": "", "question": "", "answer": "", "options": ["", "", "", ""]}
+  ]
+}
+```""",
+    "yaml": """```yaml
+thoughts: ""
+topic: ""
+difficulty: ""
+n: int
+questions:
+ - subtopic: ""
+  question: ""
+  answer: ""
+  options: ["", "", "", ""]
+```""",
+}
+COMBINED_OUTPUT_FORMATS = {
+    "json": """```json
+{
+  "thoughts": "",
+  "topic": "",
+  "subtopics": [""],
+  "difficulty": "",
+  "n": 0,
+  "questions": [
+    {"subtopic": "", "question": "", "answer": "", "options": ["", "", "", ""]}
+  ]
+}
+```""",
+    "yaml": """```yaml
+thoughts: ""
+topic: ""
+subtopics:
+  - ""
+difficulty: ""
+n: int
+questions:
+ - subtopic: ""
+  question: ""
+  answer: ""
+  options: ["", "", "", ""]
+```""",
+}
+
+TOPIC_POLICY = CallPolicy(
+    name="topic",
+    deadline=settings.LLM_TOPIC_DEADLINE,
+    max_retries=settings.LLM_MAX_RETRIES,
+    backoff_base=settings.LLM_RETRY_BACKOFF,
+    backoff_max=settings.LLM_RETRY_BACKOFF_MAX,
+    hedge_percentile=settings.LLM_HEDGE_PERCENTILE,
+    hedge_min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
 )
-QUESTION_LLM = ChatOpenAI(
-    model="gpt-4o",
-    model_kwargs={"response_format": {"type": "text"}},
-    temperature=0.2,
+QUESTION_POLICY = CallPolicy(
+    name="question",
+    deadline=settings.LLM_QUESTION_DEADLINE,
+    max_retries=settings.LLM_MAX_RETRIES,
+    backoff_base=settings.LLM_RETRY_BACKOFF,
+    backoff_max=settings.LLM_RETRY_BACKOFF_MAX,
+    hedge_percentile=settings.LLM_HEDGE_PERCENTILE,
+    hedge_min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
 )
 
+# Identical concurrent calls, e.g. a class sharing one topic, make one LLM call
+TOPIC_FLIGHTS = SingleFlight("topic")
+QUESTION_FLIGHTS = SingleFlight("question")
+QUESTION_STREAM_FLIGHTS = SingleFlight("question_stream")
 
-async def generate_subtopics(topic: str) -> TopicGenerator:
-    if settings.ENABLE_OPENAI:
-        topic_chain = (
-            TOPIC_GENERATOR_PROMPT
-            | TOPIC_LLM
-            | YamlOutputParser(pydantic_object=TopicGenerator)
+# Question calls are sized from their observed latency, within a budget of
+# concurrent calls shared by every request
+QUESTION_LATENCY = BatchLatencyModel()
+QUESTION_BUDGET = ConcurrencyBudget(settings.QUESTION_LLM_CONCURRENCY)
+
+
+def _output_format() -> str:
+    if settings.LLM_OUTPUT_FORMAT not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"LLM_OUTPUT_FORMAT must be one of {OUTPUT_FORMATS}, "
+            f"not {settings.LLM_OUTPUT_FORMAT!r}"
         )
-        logger.info(f"Generating subtopics for topic: {topic}")
-        subtopics: TopicGenerator = topic_chain.invoke({"topic": topic})
-        logger.info(f"Generated subtopics: {subtopics.subtopics}")
-        return subtopics
-    return TopicGenerator(
-        thoughts="",
-        topic="Nepal",
-        subtopics=[
-            "Geography",
-            "Culture",
-            "History",
-            "Mountains",
-            "Religion",
-            "Food",
-            "Tourism",
-            "Wildlife",
-            "People",
-            "Economy",
-        ],
+    return settings.LLM_OUTPUT_FORMAT
+
+
+def _build_llm(model: str):
+    if not settings.ENABLE_OPENAI:
+        from ai_quiz.fake_llm import FakeQuizChatModel
+
+        # Offline stand-in that answers any topic and n in the prompt's format
+        return FakeQuizChatModel(
+            seed=settings.FAKE_LLM_SEED,
+            latency=settings.FAKE_LLM_LATENCY,
+            latency_jitter=settings.FAKE_LLM_LATENCY_JITTER,
+            tokens_per_second=settings.FAKE_LLM_TOKENS_PER_SECOND,
+            throughput_jitter=settings.FAKE_LLM_THROUGHPUT_JITTER,
+        )
+    from langchain_openai import ChatOpenAI
+
+    # JSON mode guarantees a syntactically valid object
+    response_format = "json_object" if _output_format() == "json" else "text"
+    return ChatOpenAI(
+        model=model,
+        model_kwargs={"response_format": {"type": response_format}},
+        temperature=0.2,
+        # Retries are handled by the call policies above
+        max_retries=0,
+        # Report token usage on streamed responses too
+        stream_usage=True,
+    )
+
+
+def _build_prompt(template: str, output_formats: dict, fmt: str | None = None):
+    from langchain.prompts import PromptTemplate
+
+    fmt = fmt or _output_format()
+    return PromptTemplate.from_template(template).partial(
+        format_name=fmt.upper(), output_format=output_formats[fmt]
+    )
+
+
+def _build_chain(prompt: str, llm: str, pydantic_object=None):
+    chain = _lazy(prompt) | _lazy(llm)
+    if pydantic_object is None:
+        return chain
+    from ai_quiz.output_parsers import ItemValidatingOutputParser
+
+    return chain | ItemValidatingOutputParser(
+        pydantic_object=pydantic_object, format=_output_format()
+    )
+
+
+# langchain and the LLM clients are slow to import and build, so prompts,
+# clients and chains are created on first use rather than at import. Each is
+# then kept as a module attribute, which tests can patch as usual.
+_LAZY_ATTRIBUTES = {
+    "TOPIC_GENERATOR_PROMPT": lambda: _build_prompt(
+        TOPIC_GENERATOR_TEMPLATE, TOPIC_OUTPUT_FORMATS
+    ),
+    "QUESTION_GENERATOR_PROMPT": lambda: _build_prompt(
+        QUESTION_GENERATOR_TEMPLATE, QUESTION_OUTPUT_FORMATS
+    ),
+    "COMBINED_GENERATOR_PROMPT": lambda: _build_prompt(
+        COMBINED_GENERATOR_TEMPLATE, COMBINED_OUTPUT_FORMATS
+    ),
+    "TOPIC_LLM": lambda: _build_llm("gpt-4o-mini"),
+    "QUESTION_LLM": lambda: _build_llm("gpt-4o"),
+    "TOPIC_CHAIN": lambda: _build_chain(
+        "TOPIC_GENERATOR_PROMPT", "TOPIC_LLM", TopicGenerator
+    ),
+    "QUESTION_CHAIN": lambda: _build_chain(
+        "QUESTION_GENERATOR_PROMPT", "QUESTION_LLM", TriviaGenerator
+    ),
+    "COMBINED_CHAIN": lambda: _build_chain(
+        "COMBINED_GENERATOR_PROMPT", "QUESTION_LLM", TopicTriviaGenerator
+    ),
+    # Raw token streams, parsed item by item by `stream_questions`
+    "QUESTION_STREAM_CHAIN": lambda: _build_chain(
+        "QUESTION_GENERATOR_PROMPT", "QUESTION_LLM"
+    ),
+    "COMBINED_STREAM_CHAIN": lambda: _build_chain(
+        "COMBINED_GENERATOR_PROMPT", "QUESTION_LLM"
+    ),
+}
+_lazy_lock = threading.RLock()
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _lazy_lock:
+        if name not in globals():
+            globals()[name] = _LAZY_ATTRIBUTES[name]()
+        return globals()[name]
+
+
+def _lazy(name: str):
+    """Return a lazily built module attribute, or whatever patched it."""
+    try:
+        return globals()[name]
+    except KeyError:
+        return __getattr__(name)
+
+
+async def _ainvoke_traced(
+    chain,
+    inputs: dict,
+    name: str,
+    llm,
+    difficulty: str = "",
+    requested_at: float | None = None,
+    budget: ConcurrencyBudget | None = None,
+    batch_size: int | None = None,
+):
+    """Invoke `chain`, holding a slot of `budget` if given, and record the
+    call. Admission is up to the caller, `call_with_policy`.
+
+    The latency of a call for `batch_size` questions feeds the batch sizing.
+    """
+    from ai_quiz.instrumentation import trace_llm_call
+
+    async with (
+        budget.slot() if budget else nullcontext(),
+        trace_llm_call(name, llm.model_name, difficulty, requested_at) as recorder,
+    ):
+        result = await chain.ainvoke(inputs, config={"callbacks": [recorder]})
+    if batch_size and recorder.latency is not None:
+        QUESTION_LATENCY.observe(batch_size, recorder.latency)
+    return result
+
+
+def _question_key(topic: str, subtopics: list[str], n: int, difficulty: str) -> str:
+    return make_key(
+        normalize_text(topic),
+        sorted(normalize_text(subtopic) for subtopic in subtopics),
+        n,
+        difficulty,
+    )
+
+
+async def generate_subtopics(
+    topic: str,
+    fallback: Callable[[], Awaitable[TopicGenerator]] | None = None,
+    shared: list | None = None,
+) -> TopicGenerator:
+    """Generate subtopics, sharing one LLM call between concurrent callers.
+
+    A result produced by another caller's call is also appended to `shared`.
+    """
+    subtopics, joined = await TOPIC_FLIGHTS.do(
+        make_key(normalize_text(topic)),
+        lambda: _generate_subtopics(topic, fallback),
+        TopicGenerator,
+    )
+    if joined and shared is not None:
+        shared.append(subtopics)
+    return subtopics
+
+
+async def _generate_subtopics(
+    topic: str, fallback: Callable[[], Awaitable[TopicGenerator]] | None = None
+) -> TopicGenerator:
+    logger.info(f"Generating subtopics for topic: {topic}")
+    requested_at = time.perf_counter()
+    # ainvoke keeps the event loop free while waiting on the LLM
+    subtopics: TopicGenerator = await call_with_policy(
+        TOPIC_POLICY,
+        lambda: _ainvoke_traced(
+            _lazy("TOPIC_CHAIN"),
+            {"topic": topic},
+            "topic",
+            _lazy("TOPIC_LLM"),
+            requested_at=requested_at,
+        ),
+        fallback,
+        admission=LLM_ADMISSION,
+    )
+    logger.info(f"Generated subtopics: {subtopics.subtopics}")
+    return subtopics
+
+
+def split_into_shards(
+    subtopics: list[str], n: int, shard_size: int
+) -> list[tuple[list[str], int]]:
+    """Split `n` questions into shards of at most `shard_size`, each with its
+    own slice of the subtopics."""
+    return assign_subtopics(subtopics, balanced_counts(n, math.ceil(n / shard_size)))
+
+
+def assign_subtopics(
+    subtopics: list[str], counts: list[int]
+) -> list[tuple[list[str], int]]:
+    """Pair each shard of `counts` questions with its own slice of the
+    subtopics."""
+    shard_count = len(counts)
+    if not subtopics:
+        return [([], count) for count in counts]
+    groups = [
+        subtopics[i::shard_count] or [subtopics[i % len(subtopics)]]
+        for i in range(shard_count)
+    ]
+    return list(zip(groups, counts))
+
+
+def plan_question_batches(n: int) -> list[int]:
+    """Return the number of questions to ask for in each LLM call.
+
+    Batches are sized to get all `n` questions soonest given the observed
+    latency per call and question, at most `QUESTION_SHARD_SIZE` each and no
+    more concurrent than the request's share of the budget allows.
+    """
+    if not settings.ADAPTIVE_BATCHING_ENABLED:
+        return balanced_counts(n, math.ceil(n / settings.QUESTION_SHARD_SIZE))
+    concurrency = min(settings.QUESTION_SHARD_CONCURRENCY, QUESTION_BUDGET.available())
+    counts = plan_batches(
+        n,
+        QUESTION_LATENCY,
+        concurrency,
+        settings.QUESTION_BATCH_MIN_SIZE,
+        settings.QUESTION_SHARD_SIZE,
+    )
+    overhead, per_question = QUESTION_LATENCY.coefficients()
+    logger.info(
+        f"Planned batches {counts} for {n} questions "
+        f"(overhead {overhead:.2f}s, {per_question:.2f}s per question)"
+    )
+    return counts
+
+
+def _merge_questions(questions, n: int) -> list[Question]:
+    """Drop questions whose normalized text was already seen, keeping `n`."""
+    seen = set()
+    merged = []
+    for question in questions:
+        text = normalize_text(question.question)
+        if text not in seen:
+            seen.add(text)
+            merged.append(question)
+    return merged[:n]
+
+
+async def _invoke_question_chain(
+    topic: str,
+    subtopics: list[str],
+    n: int,
+    difficulty: str,
+    fallback: Callable[[], Awaitable[TriviaGenerator]] | None = None,
+    requested_at: float | None = None,
+) -> TriviaGenerator:
+    inputs = {
+        "topic": topic,
+        "subtopics": subtopics,
+        "n": n,
+        "difficulty": difficulty,
+    }
+    requested_at = requested_at or time.perf_counter()
+    return await call_with_policy(
+        QUESTION_POLICY,
+        lambda: _ainvoke_traced(
+            _lazy("QUESTION_CHAIN"),
+            inputs,
+            "question",
+            _lazy("QUESTION_LLM"),
+            difficulty,
+            requested_at,
+            QUESTION_BUDGET,
+            batch_size=n,
+        ),
+        fallback,
+        admission=LLM_ADMISSION,
+    )
+
+
+async def _generate_sharded_questions(
+    topic: str,
+    subtopics: list[str],
+    counts: list[int],
+    difficulty: str,
+    fallback: Callable[[], Awaitable[TriviaGenerator]] | None = None,
+) -> TriviaGenerator:
+    """Generate large question counts as concurrent per-subtopic shards of
+    `counts` questions each."""
+    n = sum(counts)
+    shards = assign_subtopics(subtopics, counts)
+    semaphore = asyncio.Semaphore(settings.QUESTION_SHARD_CONCURRENCY)
+    logger.info(f"Generating {n} questions for {topic} in {len(shards)} shards")
+
+    async def run_shard(shard_subtopics: list[str], shard_n: int):
+        # Taken before the semaphore so waiting for a slot counts as queue wait
+        requested_at = time.perf_counter()
+        async with semaphore:
+            return await _invoke_question_chain(
+                topic, shard_subtopics, shard_n, difficulty, requested_at=requested_at
+            )
+
+    results = await asyncio.gather(
+        *(run_shard(s, count) for s, count in shards), return_exceptions=True
+    )
+    trivia = [r for r in results if isinstance(r, TriviaGenerator)]
+    failures = [r for r in results if isinstance(r, BaseException)]
+    for failure in failures:
+        logger.warning(f"Question shard failed for topic {topic}: {failure!r}")
+    if not trivia:
+        if fallback is None:
+            raise failures[0]
+        record_outcome(QUESTION_POLICY, "fallback")
+        return await fallback()
+    questions = _merge_questions((q for t in trivia for q in t.questions), n)
+    if len(questions) < n and fallback is not None:
+        # Failed shards (or duplicates) leave a shortfall the fallback fills
+        try:
+            extra = await fallback()
+        except Exception as e:
+            logger.warning(f"Question fallback failed for topic {topic}: {e!r}")
+        else:
+            record_outcome(QUESTION_POLICY, "fallback")
+            questions = _merge_questions([*questions, *extra.questions], n)
+    return TriviaGenerator(
+        thoughts="\n".join(t.thoughts for t in trivia if t.thoughts),
+        topic=topic,
+        difficulty=difficulty,
+        n=len(questions),
+        questions=questions,
     )
 
 
@@ -161,54 +590,299 @@ async def generate_questions(
     subtopics: list[str],
     n: int,
     difficulty: str,
+    fallback: Callable[[], Awaitable[TriviaGenerator]] | None = None,
+    shared: list | None = None,
     **kwargs,
+) -> TriviaGenerator:
+    """Generate questions, awaiting `fallback` if the LLM misses its deadline.
+
+    Concurrent calls with the same arguments share one generation; questions
+    produced by another caller's call are also appended to `shared`.
+    """
+    trivia, joined = await QUESTION_FLIGHTS.do(
+        _question_key(topic, subtopics, n, difficulty),
+        lambda: _generate_questions(topic, subtopics, n, difficulty, fallback),
+        TriviaGenerator,
+    )
+    if joined and shared is not None:
+        shared.extend(trivia.questions)
+    return trivia
+
+
+async def _generate_questions(
+    topic: str,
+    subtopics: list[str],
+    n: int,
+    difficulty: str,
+    fallback: Callable[[], Awaitable[TriviaGenerator]] | None = None,
 ) -> TriviaGenerator:
     logger.info(f"Generating questions for topic: {topic}")
-    if settings.ENABLE_OPENAI:
-        quiz_chain = (QUESTION_GENERATOR_PROMPT | QUESTION_LLM) | YamlOutputParser(
-            pydantic_object=TriviaGenerator
+    # Shuffle the subtopics randomly for variety
+    random.shuffle(subtopics)
+    counts = plan_question_batches(n)
+    if len(counts) > 1:
+        return await _generate_sharded_questions(
+            topic, subtopics, counts, difficulty, fallback
         )
-        # Shuffle the subtopics randomly for variety
-        random.shuffle(subtopics)
-        logger.info(f"Generating {n} questions for topic: {topic}")
-        questions = await quiz_chain.ainvoke(
-            {
-                "topic": topic,
-                "subtopics": subtopics,
-                "n": n,
-                "difficulty": difficulty,
-            }
-        )
-        logger.info(f"Generated {n} questions: {questions.questions}")
-        return questions
-    return TriviaGenerator(
-        thoughts="",
-        topic="Nepal",
-        difficulty="easy",
-        n=1,
-        questions=[
-            Question(
-                subtopic="Geography",
-                question="What is the capital of Nepal?",
-                answer="Kathmandu",
-                options=["Kathmandu", "Pokhara", "Bhaktapur", "Lalitpur"],
-            ),
-            Question(
-                subtopic="test2",
-                question="test2?",
-                answer="test2",
-                options=["test2", "Pokhara", "Bhaktapur", "Lalitpur"],
-            ),
-            Question(
-                subtopic="test3",
-                question="test3?",
-                answer="test3",
-                options=["test3", "Pokhara", "Bhaktapur", "Lalitpur"],
-            ),
-        ],
+    logger.info(f"Generating {n} questions for topic: {topic}")
+    questions = await _invoke_question_chain(topic, subtopics, n, difficulty, fallback)
+    logger.info(f"Generated {n} questions: {questions.questions}")
+    return questions
+
+
+async def generate_topic_and_questions(
+    topic: str,
+    n: int,
+    difficulty: str,
+    fallback: Callable[[], Awaitable[TriviaGenerator]] | None = None,
+) -> TriviaGenerator:
+    """Choose the subtopics and generate `n` questions in one LLM call.
+
+    Returns a `TopicTriviaGenerator`, or whatever `fallback` returns if the
+    LLM misses its deadline.
+    """
+    logger.info(f"Generating subtopics and {n} questions for topic: {topic}")
+    inputs = {"topic": topic, "n": n, "difficulty": difficulty}
+    requested_at = time.perf_counter()
+    return await call_with_policy(
+        QUESTION_POLICY,
+        lambda: _ainvoke_traced(
+            _lazy("COMBINED_CHAIN"),
+            inputs,
+            "combined",
+            _lazy("QUESTION_LLM"),
+            difficulty,
+            requested_at,
+            QUESTION_BUDGET,
+        ),
+        fallback,
+        admission=LLM_ADMISSION,
     )
 
 
+async def _stream_question_shard(
+    topic: str,
+    subtopics: list[str],
+    n: int,
+    difficulty: str,
+    deadline: float,
+    requested_at: float | None = None,
+    chosen_subtopics: list[str] | None = None,
+) -> AsyncIterator[Question]:
+    """Stream the questions of one LLM call.
+
+    With `chosen_subtopics` the combined prompt is used instead, and the
+    subtopics it chooses are added to that list before the first question.
+    """
+    from ai_quiz.instrumentation import trace_llm_call
+
+    fmt = _output_format()
+    parser = streaming_list_parser(Question, "questions", fmt)
+    inputs = {"topic": topic, "n": n, "difficulty": difficulty}
+    chain, name, subtopic_parser = "QUESTION_STREAM_CHAIN", "question_stream", None
+    if chosen_subtopics is None:
+        inputs["subtopics"] = subtopics
+    else:
+        chain, name = "COMBINED_STREAM_CHAIN", "combined_stream"
+        subtopic_parser = streaming_list_parser(Subtopic, "subtopics", fmt)
+        chosen_subtopics.clear()
+    count = 0
+    loop = asyncio.get_running_loop()
+    async with (
+        LLM_ADMISSION.slot(max(0, deadline - loop.time())),
+        QUESTION_BUDGET.slot(max(0, deadline - loop.time())),
+        trace_llm_call(
+            name, _lazy("QUESTION_LLM").model_name, difficulty, requested_at
+        ) as recorder,
+    ):
+        stream = _lazy(chain).astream(inputs, config={"callbacks": [recorder]})
+        try:
+            # aclosing stops the LLM stream as soon as we have enough questions
+            async with aclosing(stream):
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(
+                            anext(stream), max(0, deadline - loop.time())
+                        )
+                    except StopAsyncIteration:
+                        break
+                    if subtopic_parser is not None:
+                        # The subtopics list closes before the first question
+                        chosen_subtopics.extend(
+                            item.root for item in subtopic_parser.feed(chunk.content)
+                        )
+                    for question in parser.feed(chunk.content):
+                        yield question
+                        count += 1
+                        if count >= n:
+                            return
+            for question in parser.close()[: n - count]:
+                yield question
+        finally:
+            recorder.parse_failures = parser.failures
+            if chosen_subtopics is None and recorder.latency is not None:
+                QUESTION_LATENCY.observe(n, recorder.latency)
+    if parser.failures:
+        logger.warning(f"Dropped {parser.failures} malformed questions for: {topic}")
+
+
+async def _stream_shard_with_policy(
+    topic: str,
+    subtopics: list[str],
+    n: int,
+    difficulty: str,
+    requested_at: float | None = None,
+    chosen_subtopics: list[str] | None = None,
+) -> AsyncIterator[Question]:
+    """Stream one shard under the question deadline, retrying failed starts.
+
+    A stream that breaks after yielding questions is not retried, as the
+    retry would repeat them. `LLMUnavailableError` is raised once the shard
+    cannot produce any more questions.
+    """
+    policy = QUESTION_POLICY
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + policy.deadline
+    requested_at = requested_at or time.perf_counter()
+    error = None
+    for attempt in range(policy.max_retries + 1):
+        yielded = 0
+        try:
+            async for question in _stream_question_shard(
+                topic,
+                subtopics,
+                n,
+                difficulty,
+                deadline,
+                requested_at,
+                chosen_subtopics,
+            ):
+                yielded += 1
+                yield question
+        except asyncio.TimeoutError as e:
+            record_outcome(policy, "timeout")
+            error = e
+            break
+        except AdmissionRejected as e:
+            record_outcome(policy, "rejected")
+            error = e
+            break
+        except Exception as e:
+            record_outcome(policy, "error")
+            logger.warning(f"Question stream failed (attempt {attempt + 1}): {e!r}")
+            error = e
+            remaining = deadline - loop.time()
+            if yielded or remaining <= 0:
+                break
+            if attempt < policy.max_retries:
+                await asyncio.sleep(min(policy.backoff(attempt), remaining))
+            continue
+        record_outcome(policy, "success" if attempt == 0 else "retry_success")
+        return
+    record_outcome(policy, "failure")
+    raise LLMUnavailableError(f"Question stream failed: {error!r}") from error
+
+
+async def stream_questions(
+    topic: str,
+    subtopics: list[str],
+    n: int,
+    difficulty: str,
+    shared: list | None = None,
+    **kwargs,
+) -> AsyncIterator[Question]:
+    """Yield each question as soon as its item in the response is complete.
+
+    Large counts are split into shards that stream concurrently; their
+    questions are interleaved in arrival order and deduplicated. Raises
+    `LLMUnavailableError` when failed shards leave the stream short.
+    Concurrent calls with the same arguments share one stream; questions
+    produced for another caller are also appended to `shared`.
+    """
+    stream = QUESTION_STREAM_FLIGHTS.stream(
+        _question_key(topic, subtopics, n, difficulty),
+        lambda: _stream_questions(topic, subtopics, n, difficulty),
+        Question,
+        shared,
+    )
+    async with aclosing(stream):
+        async for question in stream:
+            yield question
+
+
+async def _stream_questions(
+    topic: str, subtopics: list[str], n: int, difficulty: str
+) -> AsyncIterator[Question]:
+    logger.info(f"Streaming {n} questions for topic: {topic}")
+    subtopics = random.sample(subtopics, len(subtopics))
+    shards = assign_subtopics(subtopics, plan_question_batches(n))
+    if len(shards) == 1:
+        async for question in _stream_shard_with_policy(
+            topic, subtopics, n, difficulty
+        ):
+            yield question
+        return
+
+    queue: asyncio.Queue = asyncio.Queue()
+    semaphore = asyncio.Semaphore(settings.QUESTION_SHARD_CONCURRENCY)
+    failures = []
+
+    async def run_shard(shard_subtopics: list[str], shard_n: int):
+        requested_at = time.perf_counter()
+        try:
+            async with semaphore:
+                async for question in _stream_shard_with_policy(
+                    topic, shard_subtopics, shard_n, difficulty, requested_at
+                ):
+                    await queue.put(question)
+        except Exception as e:
+            logger.warning(f"Question shard failed for topic {topic}: {e!r}")
+            failures.append(e)
+        finally:
+            # None marks the end of one shard
+            await queue.put(None)
+
+    tasks = [asyncio.create_task(run_shard(s, count)) for s, count in shards]
+    remaining = len(tasks)
+    seen = set()
+    try:
+        while remaining and len(seen) < n:
+            question = await queue.get()
+            if question is None:
+                remaining -= 1
+                continue
+            text = normalize_text(question.question)
+            if text not in seen:
+                seen.add(text)
+                yield question
+    finally:
+        for task in tasks:
+            task.cancel()
+    if failures and len(seen) < n:
+        raise LLMUnavailableError(
+            f"{len(failures)} question shards failed for topic {topic}"
+        ) from failures[0]
+
+
+async def stream_topic_and_questions(
+    topic: str,
+    n: int,
+    difficulty: str,
+    subtopics: list[str],
+    **kwargs,
+) -> AsyncIterator[Question]:
+    """Stream `n` questions from one LLM call that also chooses the subtopics.
+
+    The chosen subtopics are added to `subtopics` before the first question
+    is yielded. Raises `LLMUnavailableError` like `stream_questions`.
+    """
+    logger.info(f"Streaming subtopics and {n} questions for topic: {topic}")
+    async for question in _stream_shard_with_policy(
+        topic, [], n, difficulty, chosen_subtopics=subtopics
+    ):
+        yield question
+
+
 if __name__ == "__main__":
     import asyncio
 
@@ -0,0 +1,127 @@
+import asyncio
+import math
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager
+
+# Used until calls of two different sizes have been timed
+PRIOR_CALL_OVERHEAD = 2.0
+PRIOR_SECONDS_PER_QUESTION = 0.6
+
+
+def balanced_counts(n: int, calls: int) -> list[int]:
+    """Split `n` into `calls` counts that differ by at most one."""
+    calls = max(1, calls)
+    base, extra = divmod(n, calls)
+    return [base + (1 if i < extra else 0) for i in range(calls)]
+
+
+class BatchLatencyModel:
+    """Rolling estimate of how long one LLM call takes for a batch size.
+
+    A call costs a fixed overhead (prompt processing and time to the first
+    token) plus a number of seconds per generated question, which follows the
+    provider's output-token rate. Both are fitted by least squares over the
+    last `window` completed calls. While every call seen has the same size,
+    the priors are scaled to match the observed latency instead.
+    """
+
+    def __init__(
+        self,
+        window: int = 100,
+        overhead: float = PRIOR_CALL_OVERHEAD,
+        per_question: float = PRIOR_SECONDS_PER_QUESTION,
+    ):
+        self.prior = (overhead, per_question)
+        self._samples: deque[tuple[int, float]] = deque(maxlen=window)
+
+    def observe(self, size: int, seconds: float):
+        if size > 0 and seconds > 0:
+            self._samples.append((size, seconds))
+
+    def coefficients(self) -> tuple[float, float]:
+        """Return `(overhead, seconds_per_question)`."""
+        if not self._samples:
+            return self.prior
+        count = len(self._samples)
+        mean_size = sum(size for size, _ in self._samples) / count
+        mean_seconds = sum(seconds for _, seconds in self._samples) / count
+        variance = sum((size - mean_size) ** 2 for size, _ in self._samples)
+        if variance:
+            covariance = sum(
+                (size - mean_size) * (seconds - mean_seconds)
+                for size, seconds in self._samples
+            )
+            per_question = covariance / variance
+            overhead = mean_seconds - per_question * mean_size
+            if per_question > 0 and overhead >= 0:
+                return overhead, per_question
+        # Too little spread or too noisy to fit: keep the priors' proportions
+        overhead, per_question = self.prior
+        scale = mean_seconds / (overhead + per_question * mean_size)
+        return overhead * scale, per_question * scale
+
+    def estimate(self, size: int) -> float:
+        overhead, per_question = self.coefficients()
+        return overhead + per_question * size
+
+    def __len__(self):
+        return len(self._samples)
+
+
+def plan_batches(
+    n: int,
+    model: BatchLatencyModel,
+    concurrency: int,
+    min_size: int,
+    max_size: int,
+) -> list[int]:
+    """Return the per-call batch sizes that get `n` questions soonest.
+
+    Calls beyond `concurrency` wait for a free slot, so they add whole rounds
+    of latency. Of plans estimated to finish at the same time, the one with
+    the fewest calls wins.
+    """
+    if n <= 0:
+        return []
+    concurrency = max(1, concurrency)
+    fewest = math.ceil(n / max(1, max_size))
+    most = max(fewest, math.ceil(n / max(1, min_size)))
+    best = None
+    for calls in range(fewest, most + 1):
+        rounds = math.ceil(calls / concurrency)
+        seconds = rounds * model.estimate(math.ceil(n / calls))
+        if best is None or seconds < best[0] - 1e-9:
+            best = (seconds, calls)
+    return balanced_counts(n, best[1])
+
+
+class ConcurrencyBudget:
+    """Process-wide limit on concurrent LLM calls, shared by every request.
+
+    asyncio semaphores belong to one event loop, so each loop gets its own.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._in_flight: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def available(self) -> int:
+        loop = asyncio.get_running_loop()
+        return max(0, self.limit - self._in_flight.get(loop, 0))
+
+    @asynccontextmanager
+    async def slot(self, timeout: float | None = None):
+        """Hold one call slot, raising `TimeoutError` after waiting `timeout`."""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.limit)
+        await asyncio.wait_for(semaphore.acquire(), timeout)
+        self._in_flight[loop] = self._in_flight.get(loop, 0) + 1
+        try:
+            yield
+        finally:
+            self._in_flight[loop] -= 1
+            semaphore.release()
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Hashable
+
+from ai_quiz import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Coalescer:
+    """Merge items added under the same key within a time window.
+
+    The first item for a key starts a window of `window()` seconds; items
+    added meanwhile join it, and `flush(key, items)` runs once when it
+    closes. A window of 0 flushes every item on its own, at once.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        flush: Callable[[Hashable, list], Awaitable],
+        window: Callable[[], float],
+    ):
+        self.name = name
+        self._flush = flush
+        self._window = window
+        self._batches: dict[tuple, list] = {}
+        self._tasks: dict[tuple, asyncio.Task] = {}
+
+    async def add(self, key: Hashable, item):
+        window = self._window()
+        if window <= 0:
+            await self._run(key, [item])
+            return
+        local_key = (asyncio.get_running_loop(), key)
+        batch = self._batches.get(local_key)
+        if batch is not None:
+            batch.append(item)
+            return
+        self._batches[local_key] = [item]
+        self._tasks[local_key] = asyncio.ensure_future(
+            self._flush_later(local_key, window)
+        )
+
+    async def drain(self):
+        """Wait for every open window of the running loop to be flushed."""
+        loop = asyncio.get_running_loop()
+        tasks = [task for (owner, _), task in self._tasks.items() if owner is loop]
+        await asyncio.gather(*tasks)
+
+    async def _flush_later(self, local_key: tuple, window: float):
+        await asyncio.sleep(window)
+        items = self._batches.pop(local_key)
+        del self._tasks[local_key]
+        await self._run(local_key[1], items)
+
+    async def _run(self, key: Hashable, items: list):
+        metrics.observe("coalesced_batch_size", len(items), coalescer=self.name)
+        try:
+            await self._flush(key, items)
+        except Exception:
+            logger.exception(f"Flushing {len(items)} {self.name} items failed")
@@ -17,7 +17,8 @@ from ai_quiz.consumers.event_handlers import (
     PlayerWaitingEventHandler,
     QuestionAnsweredEventHandler,
 )
-from ai_quiz.models import Participant, Room
+from ai_quiz.game_preparation import resume_stale_jobs
+from ai_quiz.models import Game, Participant, Room
 
 logger = logging.getLogger(__name__)
 
@@ -55,6 +56,14 @@ class RoomConsumer(AsyncWebsocketConsumer):
         await self.channel_layer.group_add(self.room_code, self.channel_name)
         await self.accept()
         logger.info(f"Connection established for {self.channel_name}")
+        # Players joining a game in progress start from a full leaderboard
+        game = await Game.aget_current_game_for_room(self.room_code)
+        if game and game.status == "in_progress":
+            await self.event_handlers["send_leaderboard_update"].send_snapshot_to_user(
+                game, self
+            )
+        # Pick up question generation left behind by a restarted worker
+        await resume_stale_jobs(self.room_code)
 
     async def disconnect_user(self, username):
         await self.send_data_to_room(
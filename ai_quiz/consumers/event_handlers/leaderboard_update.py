@@ -1,6 +1,8 @@
 from typing import TYPE_CHECKING
 
-from ai_quiz.models import Game, Leaderboard
+from ai_quiz import leaderboard
+from ai_quiz.leaderboard import AnswerResult, Snapshot, protocol
+from ai_quiz.models import Game
 
 from .base import BaseEventHandler
 
@@ -9,24 +11,28 @@ if TYPE_CHECKING:
 
 
 class LeaderboardUpdateEventHandler(BaseEventHandler):
-    event_type: str = "leaderboard_update"
-
-    async def send_leaderboard_update(self, leaderboard, consumer: "RoomConsumer"):
-        return await consumer.send_data_to_room(
-            {
-                "type": self.event_type,
-                "payload": [
-                    {"username": username, **value}
-                    for username, value in leaderboard.data.items()
-                ],
-            }
-        )
+    """Sends leaderboards as described in `ai_quiz.leaderboard.protocol`."""
+
+    event_type: str = protocol.SNAPSHOT_EVENT_TYPE
+
+    async def send_leaderboard_update(
+        self, leaderboard: Snapshot, consumer: "RoomConsumer"
+    ):
+        return await consumer.send_data_to_room(protocol.snapshot_message(leaderboard))
+
+    async def send_leaderboard_delta(
+        self, results: list[AnswerResult], consumer: "RoomConsumer"
+    ):
+        return await consumer.send_data_to_room(protocol.delta_message(results))
+
+    async def send_snapshot_to_user(self, game: Game, consumer: "RoomConsumer"):
+        snapshot = await leaderboard.get_snapshot(game)
+        return await consumer.send_data_to_user(protocol.snapshot_message(snapshot))
 
     async def handle(self, event, consumer: "RoomConsumer"):
+        # A client resyncing after missing a delta
         game = await Game.aget_current_game_for_room(consumer.room_code)
-        try:
-            leaderboard = await Leaderboard.objects.aget(game=game)
-        except Leaderboard.DoesNotExist:
+        if not game:
             await consumer.send_error("Leaderboard not found.")
             return
-        await self.send_leaderboard_update(leaderboard, consumer)
+        await self.send_snapshot_to_user(game, consumer)
@@ -1,5 +1,6 @@
 from typing import TYPE_CHECKING
 
+from ai_quiz import leaderboard
 from ai_quiz.models import Game
 from ai_quiz.serializers import QuestionSerializer
 from users.authenticators import aget_authenticated_user
@@ -17,6 +18,9 @@ class NextQuestionEventHandler(BaseEventHandler):
         game: Game = await Game.aget_current_game_for_room(room_code)
         if not game:
             raise ValueError("No game found for the room.")
+        if game.current_question:
+            # The current question closes
+            await leaderboard.close_question(game, game.current_question - 1)
         game.status = "in_progress"
         await game.asave()
 
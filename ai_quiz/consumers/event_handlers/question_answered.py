@@ -1,10 +1,15 @@
 import logging
+from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
+import quizio.settings as settings
+from ai_quiz import leaderboard
+from ai_quiz.coalescer import Coalescer
 from ai_quiz.consumers.event_handlers.leaderboard_update import (
     LeaderboardUpdateEventHandler,
 )
-from ai_quiz.models import Game, Leaderboard, Participant, Question
+from ai_quiz.leaderboard import AnswerResult
+from ai_quiz.models import Answer, Game, Participant, Question
 
 from .base import BaseEventHandler
 
@@ -14,6 +19,47 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class RecordedAnswer:
+    game: Game
+    question_id: str
+    result: AnswerResult
+    consumer: "RoomConsumer"
+    # Not saved yet; journaled with the rest of the window
+    journal: Answer
+
+
+async def broadcast_answers(game_id, answers: list[RecordedAnswer]):
+    """Tell the room about `answers`, which were recorded within one
+    coalescing window, and journal them. The leaderboard is persisted, and
+    its timeline frame logged, when a question closes; otherwise it is
+    persisted at most every `LEADERBOARD_CHECKPOINT_INTERVAL` seconds."""
+    last = answers[-1]
+    closing = next((a for a in answers if a.result.all_answered), None)
+    question_closed = closing is not None
+    if question_closed:
+        await QuestionAnsweredEventHandler().send_all_players_answered(last.consumer)
+    results = sorted((answer.result for answer in answers), key=lambda r: r.version)
+    await LeaderboardUpdateEventHandler().send_leaderboard_delta(
+        results=results, consumer=last.consumer
+    )
+    await leaderboard.log_answers([answer.journal for answer in answers])
+    if question_closed:
+        await leaderboard.close_question(
+            closing.game,
+            await leaderboard.question_ordinal(game_id, closing.question_id),
+        )
+    else:
+        await leaderboard.checkpoint_if_due(game_id)
+
+
+# One leaderboard broadcast and write per room and window, however many
+# answers arrive; each player's answer_validation is still sent at once
+ANSWER_UPDATES = Coalescer(
+    "leaderboard", broadcast_answers, lambda: settings.LEADERBOARD_COALESCE_WINDOW
+)
+
+
 class QuestionAnsweredEventHandler(BaseEventHandler):
     event_type: str = "question_answered"
 
@@ -35,67 +81,48 @@ class QuestionAnsweredEventHandler(BaseEventHandler):
             }
         )
 
-    async def send_all_players_answered(
-        self, consumer: "RoomConsumer", leaderboard: Leaderboard, question_id: str
-    ):
-        all_players_answered = all(
-            question_id in data.get("answered_questions", [])
-            for data in leaderboard.data.values()
+    async def send_all_players_answered(self, consumer: "RoomConsumer"):
+        await consumer.send_data_to_room(
+            {"type": "all_players_answered", "payload": {}}
         )
 
-        if all_players_answered:
-            await consumer.send_data_to_room(
-                {"type": "all_players_answered", "payload": {}}
-            )
-
     async def _handle_leaderboard_update(
         self,
         question_id: str,
         answer: str,
         consumer: "RoomConsumer",
         current_question: Question,
-        leaderboard: Leaderboard,
+        game: Game,
         timestamp: int,
-    ):
+        participant: Participant | None = None,
+    ) -> AnswerResult | None:
         username = consumer.username
-        user_data = leaderboard.data.get(username)
-        is_correct = False
-        user_data["answered_questions"] = user_data.get("answered_questions", []) + [
-            question_id
-        ]
-        if not answer:
-            # User skipped the question means the answer field will be null
-            user_data["skipped_questions"] = user_data.get("skipped_questions", 0) + 1
-        elif current_question.correct_answer == answer:
-            # User answered correctly
-            user_data["correct_answers"] = user_data.get("correct_answers", 0) + 1
-            # Calculate score based on timestamp
-            response_time = max(
-                0, timestamp / 1000 - current_question.updated_at.timestamp()
-            )
-
-            user_data["score"] = user_data.get("score", 0) + int(
-                max(
-                    0,  # Min score
-                    100  # Max score
-                    * (1 - (response_time / current_question.time_per_question)),
-                )
-            )
-            # IMPORTANT: Set is_correct to True
-            is_correct = True
-        else:
-            # User answered incorrectly
-            user_data["wrong_answers"] = user_data.get("wrong_answers", 0) + 1
-        await leaderboard.asave()
+        outcome, points = leaderboard.score_answer(current_question, answer, timestamp)
+        result = await leaderboard.record_answer(
+            game, username, question_id, outcome, points
+        )
+        if result is None:
+            await consumer.send_error("Question already answered.")
+            return None
         await self.send_answer_validation_event(
             consumer=consumer,
             answer=answer,
             correct_answer=current_question.correct_answer,
-            is_correct=is_correct,
+            is_correct=outcome == "correct",
         )
-        await self.send_all_players_answered(
-            consumer=consumer, leaderboard=leaderboard, question_id=question_id
+        journal = Answer(
+            question=current_question,
+            user_id=participant.user_id if participant else None,
+            guest_user_id=participant.guest_user_id if participant else None,
+            answer=(answer or "")[: Answer._meta.get_field("answer").max_length],
+            is_correct=None if outcome == "skipped" else outcome == "correct",
+            username=username,
+            points=points,
         )
+        await ANSWER_UPDATES.add(
+            game.id, RecordedAnswer(game, str(question_id), result, consumer, journal)
+        )
+        return result
 
     async def handle(self, data, consumer: "RoomConsumer"):
         username = consumer.username
@@ -128,17 +155,12 @@ class QuestionAnsweredEventHandler(BaseEventHandler):
         if not participant:
             await consumer.send_error("Participant not found.")
             return
-        leaderboard, _ = await Leaderboard.objects.aget_or_create(game=game)
-
         await self._handle_leaderboard_update(
             question_id=question_id,
             answer=answer,
             consumer=consumer,
             current_question=current_question,
-            leaderboard=leaderboard,
+            game=game,
             timestamp=timestamp,
-        )
-
-        await LeaderboardUpdateEventHandler().send_leaderboard_update(
-            leaderboard=leaderboard, consumer=consumer
+            participant=participant,
         )
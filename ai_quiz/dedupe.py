@@ -0,0 +1,161 @@
+import logging
+import re
+import zlib
+from collections import defaultdict
+
+from channels.db import database_sync_to_async
+
+import quizio.settings as settings
+from ai_quiz.models import Question, SinglePlayerQuestion
+from quizio.utils import TTLCache, normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Words that rewording adds or drops without changing what is asked
+STOPWORDS = frozenset(
+    "a an and are as at be by did do does for from in is it of on or the "
+    "to was were what when where which who whom whose with".split()
+)
+SIGNATURE_SIZE = 32
+BANDS = 16
+_ROWS = SIGNATURE_SIZE // BANDS
+_EMPTY = 1 << 32
+
+
+def shingles(text: str) -> frozenset[str]:
+    """Character trigrams of every content word, so word order is ignored."""
+    words = [w for w in re.findall(r"[a-z0-9]+", text.lower()) if w not in STOPWORDS]
+    grams = set()
+    for word in words:
+        padded = f" {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def signature(grams: frozenset[str]) -> tuple[int, ...]:
+    """One-permutation MinHash: hash once, keep the minimum per bin.
+
+    Empty bins borrow the next non-empty bin's value so short questions
+    still produce comparable bands.
+    """
+    bins = [_EMPTY] * SIGNATURE_SIZE
+    for gram in grams:
+        value = zlib.crc32(gram.encode())
+        index = value % SIGNATURE_SIZE
+        if value < bins[index]:
+            bins[index] = value
+    if all(value == _EMPTY for value in bins):
+        return tuple(bins)
+    for i in range(SIGNATURE_SIZE):
+        step = 1
+        while bins[i] == _EMPTY:
+            borrowed = bins[(i + step) % SIGNATURE_SIZE]
+            if borrowed != _EMPTY:
+                bins[i] = borrowed + step * _EMPTY
+            step += 1
+    return tuple(bins)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _same_answer(a: str, b: str) -> bool:
+    words_a, words_b = set(a.split()), set(b.split())
+    return bool(words_a and words_b) and (words_a <= words_b or words_b <= words_a)
+
+
+class NearDuplicateIndex:
+    """In-memory LSH index of question texts for one topic.
+
+    Two questions are near-duplicates when their shingle sets overlap by at
+    least `threshold` and their answers match, so "largest planet" and
+    "smallest planet" stay distinct. LSH bands only pick the candidates; the
+    decision is made on the exact shingle sets.
+    """
+
+    def __init__(self, threshold: float | None = None):
+        self.threshold = settings.DEDUPE_THRESHOLD if threshold is None else threshold
+        self._buckets: dict[tuple, list[int]] = defaultdict(list)
+        self._entries: list[tuple[str, frozenset[str], str]] = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _bands(self, grams: frozenset[str]):
+        sig = signature(grams)
+        for band in range(BANDS):
+            yield (band, sig[band * _ROWS : (band + 1) * _ROWS])
+
+    def find(self, question: str, answer: str) -> str | None:
+        """Return the stored question `question` duplicates, if any."""
+        grams = shingles(question)
+        answer = normalize_text(answer)
+        checked = set()
+        for key in self._bands(grams):
+            for entry_id in self._buckets.get(key, ()):
+                if entry_id in checked:
+                    continue
+                checked.add(entry_id)
+                text, other_grams, other_answer = self._entries[entry_id]
+                if _same_answer(answer, other_answer) and (
+                    jaccard(grams, other_grams) >= self.threshold
+                ):
+                    return text
+        return None
+
+    def add(self, question: str, answer: str):
+        grams = shingles(question)
+        entry_id = len(self._entries)
+        self._entries.append((question, grams, normalize_text(answer)))
+        for key in self._bands(grams):
+            self._buckets[key].append(entry_id)
+
+    def add_if_new(self, question: str, answer: str) -> bool:
+        """Index the question unless it duplicates one already indexed."""
+        duplicate = self.find(question, answer)
+        if duplicate is not None:
+            logger.info(f"Near-duplicate question: {question!r} ~ {duplicate!r}")
+            return False
+        self.add(question, answer)
+        return True
+
+
+_indexes = TTLCache(
+    maxsize=settings.DEDUPE_INDEX_TOPICS,
+    ttl=settings.DEDUPE_INDEX_TTL.total_seconds(),
+)
+
+
+def load_index(topic: str) -> NearDuplicateIndex:
+    """Build the index for a topic from the newest stored questions."""
+    index = NearDuplicateIndex()
+    normalized = normalize_text(topic)
+    for model in (Question, SinglePlayerQuestion):
+        rows = (
+            model.objects.filter(topic__normalized_name=normalized)
+            .order_by("-created_at")
+            .values_list("question", "correct_answer")[
+                : settings.DEDUPE_INDEX_MAX_QUESTIONS
+            ]
+        )
+        for question, answer in rows:
+            index.add(question, answer)
+    logger.info(f"Loaded {len(index)} questions into the dedupe index for: {topic}")
+    return index
+
+
+async def aget_index(topic: str) -> NearDuplicateIndex:
+    """Return the topic's index, loading it from the database on first use.
+
+    Accepted questions are added to the cached index in place, so the table
+    is only read again once the entry expires.
+    """
+    key = normalize_text(topic)
+    index = _indexes.get(key)
+    if index is None:
+        index = await database_sync_to_async(load_index)(topic)
+        _indexes.set(key, index)
+    return index
@@ -0,0 +1,203 @@
+import ast
+import asyncio
+import itertools
+import json
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Iterator
+
+import yaml
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.messages.ai import UsageMetadata
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+ASPECTS = [
+    "History",
+    "Geography",
+    "Culture",
+    "People",
+    "Language",
+    "Science",
+    "Economy",
+    "Art",
+    "Sports",
+    "Records",
+]
+
+
+def _prompt_field(prompt: str, name: str) -> str | None:
+    """Read a `- name: value` line from the prompt's data section."""
+    # The prompt's glossary uses the same layout, so the data is the last match
+    matches = re.findall(rf"^- {name}: (.*)$", prompt, re.MULTILINE)
+    return matches[-1].strip() if matches else None
+
+
+class FakeQuizChatModel(BaseChatModel):
+    """Chat model that answers the quiz prompts offline with valid JSON or YAML.
+
+    Answers the topic prompt with subtopics, the question prompt with `n`
+    questions and the combined prompt with both, in the format the prompt
+    shows, so every chain, parser and caller runs unchanged. Content and
+    timing are drawn from a generator seeded with `seed`, the prompt and the
+    call index, so a run is reproducible. The first token arrives after
+    `latency` seconds scaled by a log-normal factor with sigma
+    `latency_jitter`; the rest stream at about `tokens_per_second` words per
+    second, scaled the same way by `throughput_jitter`. Zero disables waiting.
+    """
+
+    model_name: str = "fake-quiz"
+    seed: int = 0
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    tokens_per_second: float = 0.0
+    throughput_jitter: float = 0.0
+
+    _calls: Iterator[int] = PrivateAttr(default_factory=itertools.count)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-quiz"
+
+    def _rng(self, prompt: str) -> random.Random:
+        return random.Random(f"{self.seed}:{next(self._calls)}:{prompt}")
+
+    def _usage(self, messages: list[BaseMessage], tokens: list) -> UsageMetadata:
+        """Count words as tokens so token metrics have plausible values."""
+        prompt_tokens = len(messages[-1].content.split())
+        return UsageMetadata(
+            input_tokens=prompt_tokens,
+            output_tokens=len(tokens),
+            total_tokens=prompt_tokens + len(tokens),
+        )
+
+    def _respond(self, messages: list[BaseMessage]) -> tuple[str, list[tuple]]:
+        """Return the response text and its tokens, each with a delay before it."""
+        prompt = messages[-1].content
+        rng = self._rng(prompt)
+        if _prompt_field(prompt, "n") is None:
+            data = self._subtopics(prompt)
+        elif _prompt_field(prompt, "subtopics") is None:
+            # The combined prompt asks for subtopics and questions together
+            data = self._topic_and_questions(prompt, rng)
+        else:
+            data = self._questions(prompt, rng)
+        if "```json" in prompt:
+            text = "```json\n" + json.dumps(data, indent=2) + "\n```"
+        else:
+            text = "```yaml\n" + yaml.safe_dump(data, sort_keys=False) + "```"
+        tokens = re.findall(r"\s*\S+", text)
+        first = self.latency * rng.lognormvariate(0, self.latency_jitter)
+        gap = 0.0
+        if self.tokens_per_second > 0:
+            rate = self.tokens_per_second * rng.lognormvariate(
+                0, self.throughput_jitter
+            )
+            gap = 1 / rate
+        return text, [
+            (token, first if i == 0 else gap) for i, token in enumerate(tokens)
+        ]
+
+    def _subtopics(self, prompt: str) -> dict:
+        match = re.search(r"The topic is: (.*)\.\s*$", prompt, re.MULTILINE)
+        topic = match.group(1) if match else "Trivia"
+        return {
+            "thoughts": "",
+            "topic": topic,
+            "subtopics": [f"{topic} {aspect}" for aspect in ASPECTS],
+        }
+
+    def _topic_and_questions(self, prompt: str, rng: random.Random) -> dict:
+        topic = _prompt_field(prompt, "topic") or "Trivia"
+        subtopics = [f"{topic} {aspect}" for aspect in ASPECTS]
+        data = self._questions(prompt, rng, subtopics)
+        questions = data.pop("questions")
+        return {
+            "thoughts": "",
+            "topic": topic,
+            "subtopics": subtopics,
+            **data,
+            "questions": questions,
+        }
+
+    def _questions(
+        self, prompt: str, rng: random.Random, subtopics: list[str] | None = None
+    ) -> dict:
+        topic = _prompt_field(prompt, "topic") or "Trivia"
+        difficulty = _prompt_field(prompt, "difficulty") or "easy"
+        n = int(_prompt_field(prompt, "n") or 1)
+        if subtopics is None:
+            try:
+                subtopics = ast.literal_eval(_prompt_field(prompt, "subtopics") or "[]")
+            except (ValueError, SyntaxError):
+                subtopics = []
+        questions = []
+        for _ in range(n):
+            subtopic = rng.choice(subtopics) if subtopics else topic
+            fact = rng.randrange(10**6)
+            options = [f"Fact {fact}"] + [
+                f"Fact {rng.randrange(10**6)}" for _ in range(3)
+            ]
+            answer = options[0]
+            rng.shuffle(options)
+            questions.append(
+                {
+                    "subtopic": subtopic,
+                    "question": f"Which {difficulty} fact #{fact} is about {subtopic}?",
+                    "answer": answer,
+                    "options": options,
+                }
+            )
+        return {
+            "thoughts": "",
+            "topic": topic,
+            "difficulty": difficulty,
+            "n": n,
+            "questions": questions,
+        }
+
+    def _generate(
+        self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        text, tokens = self._respond(messages)
+        time.sleep(sum(delay for _, delay in tokens))
+        message = AIMessage(content=text, usage_metadata=self._usage(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        text, tokens = self._respond(messages)
+        await asyncio.sleep(sum(delay for _, delay in tokens))
+        message = AIMessage(content=text, usage_metadata=self._usage(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        _, tokens = self._respond(messages)
+        for token, delay in tokens:
+            if delay:
+                time.sleep(delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(
+                content="", usage_metadata=self._usage(messages, tokens)
+            )
+        )
+
+    async def _astream(
+        self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        _, tokens = self._respond(messages)
+        for token, delay in tokens:
+            if delay:
+                await asyncio.sleep(delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(
+                content="", usage_metadata=self._usage(messages, tokens)
+            )
+        )
@@ -0,0 +1,318 @@
+import asyncio
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+import quizio.settings as settings
+from ai_quiz import admission
+from ai_quiz.models import Game, GamePreparationJob, Question, Topic
+from ai_quiz.question_bank import generate_questions, make_bank_key, stream_questions
+from ai_quiz.question_pools import claim_pool, pool_questions
+from ai_quiz.topic_cache import (
+    generate_subtopics,
+    get_cached_subtopics,
+    remember_subtopics,
+)
+from quizio.utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Keep references so background jobs are not garbage collected mid-flight
+_background_tasks: set[asyncio.Task] = set()
+
+
+async def send_room_event(room_code: str, event_type: str, payload: dict):
+    """Push an event to everyone in the room through the channel layer."""
+    try:
+        await get_channel_layer().group_send(
+            room_code,
+            {"type": "room_message", "event": {"type": event_type, "payload": payload}},
+        )
+    except Exception as e:
+        logger.warning(f"Could not send {event_type} to room {room_code}: {e!r}")
+
+
+async def create_job(
+    game: Game,
+    topic: str,
+    n: int,
+    difficulty: str,
+    time_per_question: int = 30,
+    subtopics: list[str] | None = None,
+) -> GamePreparationJob:
+    """Create the job; subtopics chosen by the host are used as they are."""
+    return await GamePreparationJob.objects.acreate(
+        game=game,
+        topic=topic,
+        subtopics=subtopics or [],
+        n=n,
+        difficulty=difficulty,
+        time_per_question=time_per_question,
+        attempts=1,
+    )
+
+
+def create_job_from_pool(
+    game: Game,
+    topic: str,
+    n: int,
+    difficulty: str,
+    time_per_question: int = 30,
+    subtopics: list[str] | None = None,
+) -> GamePreparationJob | None:
+    """Fill the game from a pre-warmed pool; None when no pool is available."""
+    with transaction.atomic():
+        pool = claim_pool(topic, difficulty, n, subtopics)
+        if pool is None:
+            return None
+        job = GamePreparationJob.objects.create(
+            game=game,
+            topic=topic,
+            subtopics=pool.subtopics,
+            n=n,
+            difficulty=difficulty,
+            time_per_question=time_per_question,
+            status="ready",
+            questions_ready=n,
+            attempts=1,
+        )
+        bank_key = make_bank_key(topic, difficulty, pool.subtopics)
+        Question.objects.bulk_create(
+            [
+                _build_question(job, question, pool.topic, bank_key)
+                for question in pool_questions(pool, n)
+            ]
+        )
+    logger.info(f"Game {game.id} was filled from question pool {pool.pk}")
+    return job
+
+
+async def acreate_job_from_pool(
+    game: Game,
+    topic: str,
+    n: int,
+    difficulty: str,
+    time_per_question: int = 30,
+    subtopics: list[str] | None = None,
+) -> GamePreparationJob | None:
+    return await database_sync_to_async(create_job_from_pool)(
+        game, topic, n, difficulty, time_per_question, subtopics
+    )
+
+
+def start_job(job_id: int) -> asyncio.Task:
+    """Run the job on the current event loop without waiting for it."""
+    task = asyncio.create_task(run_job(job_id))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def run_job(job_id: int):
+    job = await GamePreparationJob.objects.select_related("game__room").aget(pk=job_id)
+    room_code = job.game.room.room_code
+    # The job's LLM calls queue fairly against other hosts' games
+    admission.current_host.set(str(job.game.room.host_id))
+    heartbeat = asyncio.create_task(_keep_alive(job.pk))
+    try:
+        await _prepare_game(job, room_code)
+    except Exception as e:
+        logger.exception(f"Preparing game {job.game_id} failed")
+        job.status = "failed"
+        job.error = str(e)
+        await job.asave(update_fields=["status", "error", "updated_at"])
+        await send_room_event(
+            room_code,
+            "game_preparation_failed",
+            {"gameId": str(job.game_id), "error": str(e)},
+        )
+    finally:
+        heartbeat.cancel()
+
+
+async def _keep_alive(job_id: int):
+    interval = settings.GAME_PREPARATION_STALE_AFTER.total_seconds() / 3
+    while True:
+        await asyncio.sleep(interval)
+        await GamePreparationJob.objects.filter(pk=job_id).aupdate(
+            heartbeat_at=timezone.now()
+        )
+
+
+def _build_question(job: GamePreparationJob, question, topic: Topic, bank_key: str):
+    return Question(
+        game_id=job.game_id,
+        subtopic=question.subtopic,
+        question=question.question,
+        correct_answer=question.answer,
+        options=question.options,
+        topic=topic,
+        difficulty=job.difficulty,
+        bank_key=bank_key,
+        time_per_question=job.time_per_question,
+    )
+
+
+def _combines_generation(job: GamePreparationJob) -> bool:
+    """Whether one LLM call should choose the subtopics and write the questions.
+
+    Larger games are sharded across calls that each need the subtopics.
+    """
+    return (
+        settings.COMBINED_GENERATION_ENABLED and job.n <= settings.QUESTION_SHARD_SIZE
+    )
+
+
+async def _prepare_game(job: GamePreparationJob, room_code: str):
+    game_id = str(job.game_id)
+    if not job.subtopics:
+        if _combines_generation(job):
+            cached = await get_cached_subtopics(job.topic)
+            # Left empty, the subtopics are chosen with the first questions
+            job.subtopics = cached.subtopics if cached is not None else []
+        else:
+            job.subtopics = (await generate_subtopics(job.topic)).subtopics
+        if job.subtopics:
+            await job.asave(update_fields=["subtopics", "updated_at"])
+    announced = bool(job.subtopics)
+    if announced:
+        await send_room_event(
+            room_code,
+            "subtopics_ready",
+            {"gameId": game_id, "subtopics": job.subtopics},
+        )
+    topic = await Topic.aget_or_create_by_name(job.topic, job.subtopics)
+
+    # Questions stored before a worker restart are kept, not generated again
+    existing = Question.objects.filter(game_id=job.game_id)
+    seen = {
+        normalize_text(text)
+        async for text in existing.values_list("question", flat=True)
+    }
+    stored = len(seen)
+    remaining = job.n - stored
+
+    async def store(batch):
+        nonlocal stored, announced
+        if not announced:
+            # Chosen by the combined call before its first question
+            announced = True
+            if job.subtopics:
+                await job.asave(update_fields=["subtopics", "updated_at"])
+                await remember_subtopics(job.topic, job.subtopics)
+            await send_room_event(
+                room_code,
+                "subtopics_ready",
+                {"gameId": game_id, "subtopics": job.subtopics},
+            )
+        bank_key = make_bank_key(job.topic, job.difficulty, job.subtopics)
+        await Question.objects.abulk_create(
+            [_build_question(job, question, topic, bank_key) for question in batch]
+        )
+        stored += len(batch)
+        job.questions_ready = stored
+        job.heartbeat_at = timezone.now()
+        await job.asave(update_fields=["questions_ready", "heartbeat_at", "updated_at"])
+        await send_room_event(
+            room_code,
+            "questions_progress",
+            {"gameId": game_id, "ready": stored, "total": job.n},
+        )
+
+    def is_new(question) -> bool:
+        text = normalize_text(question.question)
+        if text in seen:
+            return False
+        seen.add(text)
+        return True
+
+    if remaining > 0 and settings.QUESTION_STREAMING_ENABLED:
+        batch = []
+        try:
+            async for question in stream_questions(
+                topic=job.topic,
+                subtopics=job.subtopics,
+                n=remaining,
+                difficulty=job.difficulty,
+            ):
+                if not is_new(question):
+                    continue
+                batch.append(question)
+                # The first question is written alone so the game is startable early
+                if stored == 0 or len(batch) >= settings.QUESTION_STREAM_BATCH_SIZE:
+                    await store(batch)
+                    batch = []
+        except Exception as e:
+            if not stored and not batch:
+                raise
+            # The game is playable with the questions received so far
+            logger.warning(f"Question stream for {game_id} stopped early: {e!r}")
+        finally:
+            if batch:
+                await store(batch)
+    elif remaining > 0:
+        trivia = await generate_questions(
+            topic=job.topic,
+            subtopics=job.subtopics,
+            n=remaining,
+            difficulty=job.difficulty,
+        )
+        batch = [question for question in trivia.questions if is_new(question)]
+        if batch:
+            await store(batch)
+
+    if stored == 0:
+        raise ValueError("No questions could be generated.")
+    if stored < job.n:
+        logger.warning(f"Only {stored}/{job.n} questions were generated for {game_id}")
+    job.status = "ready"
+    job.questions_ready = stored
+    await job.asave(update_fields=["status", "questions_ready", "updated_at"])
+    await send_room_event(
+        room_code, "game_ready", {"gameId": game_id, "questions": stored}
+    )
+
+
+def claim_stale_jobs(room_code: str | None = None) -> list[int]:
+    """Take over preparing jobs whose worker stopped heartbeating."""
+    now = timezone.now()
+    jobs = GamePreparationJob.objects.select_related("game__room").filter(
+        status="preparing",
+        heartbeat_at__lt=now - settings.GAME_PREPARATION_STALE_AFTER,
+    )
+    if room_code is not None:
+        jobs = jobs.filter(game__room__room_code=room_code)
+    claimed = []
+    for job in jobs:
+        if job.attempts >= settings.GAME_PREPARATION_MAX_ATTEMPTS:
+            error = "Gave up after repeated worker failures."
+            failed = GamePreparationJob.objects.filter(
+                pk=job.pk, status="preparing"
+            ).update(status="failed", error=error, updated_at=now)
+            if failed:
+                # Told like a failure of run_job, once
+                async_to_sync(send_room_event)(
+                    job.game.room.room_code,
+                    "game_preparation_failed",
+                    {"gameId": str(job.game_id), "error": error},
+                )
+            continue
+        # Compare-and-set on the heartbeat so only one worker resumes the job
+        updated = GamePreparationJob.objects.filter(
+            pk=job.pk, status="preparing", heartbeat_at=job.heartbeat_at
+        ).update(heartbeat_at=now, attempts=F("attempts") + 1, updated_at=now)
+        if updated:
+            claimed.append(job.pk)
+    return claimed
+
+
+async def resume_stale_jobs(room_code: str | None = None) -> list[asyncio.Task]:
+    job_ids = await database_sync_to_async(claim_stale_jobs)(room_code)
+    for job_id in job_ids:
+        logger.info(f"Resuming game preparation job {job_id}")
+    return [start_job(job_id) for job_id in job_ids]
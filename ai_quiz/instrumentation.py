@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from django.utils import timezone
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.exceptions import OutputParserException
+
+import quizio.settings as settings
+from ai_quiz import metrics
+from ai_quiz.models import LLMCallRecord
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCallRecorder(AsyncCallbackHandler):
+    """Callback handler collecting the timings and token counts of one call.
+
+    `requested_at` is when the caller asked for the call, so time spent
+    waiting on shard semaphores or retry backoff shows up as queue wait.
+    """
+
+    def __init__(
+        self,
+        chain: str,
+        model: str,
+        difficulty: str = "",
+        requested_at: float | None = None,
+    ):
+        super().__init__()
+        self.chain = chain
+        self.model = model
+        self.difficulty = difficulty
+        self.requested_at = requested_at or time.perf_counter()
+        self.started_at: float | None = None
+        self.first_token_at: float | None = None
+        self.ended_at: float | None = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.parse_failures = 0
+        self.outcome = "success"
+
+    async def on_chat_model_start(self, serialized, messages, **kwargs):
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+
+    async def on_llm_new_token(self, token: str, **kwargs):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    async def on_llm_end(self, response, **kwargs):
+        self.ended_at = time.perf_counter()
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if usage:
+                    self.prompt_tokens += usage.get("input_tokens", 0)
+                    self.completion_tokens += usage.get("output_tokens", 0)
+
+    async def on_chain_error(self, error: BaseException, **kwargs):
+        # The parser's error is reported again by every enclosing chain
+        if isinstance(error, OutputParserException):
+            self.parse_failures = 1
+
+    @property
+    def queue_wait(self) -> float:
+        return (self.started_at or time.perf_counter()) - self.requested_at
+
+    @property
+    def latency(self) -> float | None:
+        if self.started_at is None or self.ended_at is None:
+            return None
+        return self.ended_at - self.started_at
+
+    @property
+    def time_to_first_token(self) -> float | None:
+        """Without streaming the first token arrives with the whole response."""
+        if self.started_at is None:
+            return None
+        if self.first_token_at is None:
+            return self.latency
+        return self.first_token_at - self.started_at
+
+    @property
+    def tags(self) -> dict:
+        return {"chain": self.chain, "model": self.model, "difficulty": self.difficulty}
+
+
+def record(recorder: LLMCallRecorder):
+    """Export the call to the in-process metrics."""
+    tags = recorder.tags
+    metrics.increment("llm_chain_calls", outcome=recorder.outcome, **tags)
+    metrics.observe("llm_queue_wait_seconds", recorder.queue_wait, **tags)
+    if recorder.time_to_first_token is not None:
+        metrics.observe(
+            "llm_time_to_first_token_seconds", recorder.time_to_first_token, **tags
+        )
+    if recorder.latency is not None:
+        metrics.observe("llm_latency_seconds", recorder.latency, **tags)
+    metrics.increment("llm_prompt_tokens", recorder.prompt_tokens, **tags)
+    metrics.increment("llm_completion_tokens", recorder.completion_tokens, **tags)
+    if recorder.parse_failures:
+        metrics.increment("llm_parse_failures", recorder.parse_failures, **tags)
+
+
+async def persist(recorder: LLMCallRecorder):
+    if not settings.LLM_METRICS_PERSIST:
+        return
+    try:
+        await LLMCallRecord.objects.acreate(
+            **recorder.tags,
+            outcome=recorder.outcome,
+            queue_wait=recorder.queue_wait,
+            time_to_first_token=recorder.time_to_first_token,
+            latency=recorder.latency,
+            prompt_tokens=recorder.prompt_tokens,
+            completion_tokens=recorder.completion_tokens,
+            parse_failures=recorder.parse_failures,
+        )
+    except Exception as e:
+        logger.warning(f"Could not store LLM call record: {e!r}")
+
+
+def prune_records() -> int:
+    """Delete stored LLM calls older than `LLM_CALL_RECORD_RETENTION`.
+    Returns how many were deleted."""
+    cutoff = timezone.now() - settings.LLM_CALL_RECORD_RETENTION
+    deleted, _ = LLMCallRecord.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+@asynccontextmanager
+async def trace_llm_call(
+    chain: str,
+    model: str,
+    difficulty: str = "",
+    requested_at: float | None = None,
+):
+    """Yield a recorder to pass as a callback and record the call on exit.
+
+    Cancelled calls, such as the losing side of a hedge, are counted but not
+    stored.
+    """
+    recorder = LLMCallRecorder(chain, model, difficulty, requested_at)
+    try:
+        yield recorder
+    except asyncio.CancelledError:
+        recorder.outcome = "cancelled"
+        record(recorder)
+        raise
+    except GeneratorExit:
+        # A stream whose consumer stopped reading before it ended
+        record(recorder)
+        raise
+    except Exception:
+        recorder.outcome = "error"
+        record(recorder)
+        await persist(recorder)
+        raise
+    record(recorder)
+    await persist(recorder)
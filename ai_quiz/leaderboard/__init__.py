@@ -0,0 +1,24 @@
+from .engine import (
+    AnswerResult,
+    GameNotLoaded,
+    InMemoryLeaderboardEngine,
+    LeaderboardEngine,
+    Snapshot,
+    get_engine,
+)
+from .global_board import rank_of, top
+from .scoring import score_answer
+from .timeline import get_timeline
+from .store import (
+    checkpoint,
+    close_question,
+    checkpoint_if_due,
+    finish,
+    forget,
+    get_snapshot,
+    load,
+    log_answers,
+    persist_snapshot,
+    question_ordinal,
+    record_answer,
+)
@@ -0,0 +1,41 @@
+from typing import Iterable, Iterator
+
+# The questions a player answered, as a bitset indexed by each question's
+# ordinal in its game (see `store.question_ordinal`). In memory it is an int
+# whose bit i is ordinal i; stored, it is the hex of the bytes of a Redis
+# bitmap, where ordinal 0 is the high bit of the first byte, so the engines
+# exchange it with Redis as is. Ten questions take four characters where a
+# list of ids took about ten per question.
+
+# Each byte with its bits in reverse order
+_REVERSED = bytes(int(f"{b:08b}"[::-1], 2) for b in range(256))
+
+
+def encode(mask: int) -> str:
+    if not mask:
+        return ""
+    raw = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    return raw.translate(_REVERSED).hex()
+
+
+def decode(value: str | None) -> int:
+    if not value:
+        return 0
+    return int.from_bytes(bytes.fromhex(value).translate(_REVERSED), "little")
+
+
+def from_ordinals(ordinals: Iterable[int]) -> int:
+    mask = 0
+    for ordinal in ordinals:
+        mask |= 1 << ordinal
+    return mask
+
+
+def ordinals(mask: int) -> Iterator[int]:
+    """The ordinals set in `mask`, in ascending order."""
+    ordinal = 0
+    while mask:
+        if mask & 1:
+            yield ordinal
+        mask >>= 1
+        ordinal += 1
@@ -0,0 +1,228 @@
+import functools
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field
+from typing import Iterable
+
+import quizio.settings as settings
+from ai_quiz.leaderboard import bitset
+
+# Counters kept per player; every other field of an entry is profile data
+# (avatar and the like) passed through unchanged
+COUNTERS = ("score", "correct_answers", "wrong_answers", "skipped_questions")
+# The counter each answer outcome increments
+OUTCOME_COUNTERS = {
+    "correct": "correct_answers",
+    "wrong": "wrong_answers",
+    "skipped": "skipped_questions",
+}
+# Fields derived by the engine, never stored as profile data
+DERIVED_FIELDS = ("answered", "rank")
+
+
+class GameNotLoaded(Exception):
+    """The engine holds no leaderboard for the game; load it first."""
+
+
+@dataclass(frozen=True)
+class AnswerResult:
+    """The outcome of recording one answer."""
+
+    username: str
+    # Version of the game's leaderboard after the answer
+    version: int
+    # The player's entry after the answer
+    entry: dict
+    # 1-based ranks before and after the answer; None for a new player
+    old_rank: int | None
+    rank: int
+    # Players who have answered the question, this one included, and
+    # players on the leaderboard
+    question_answers: int = 0
+    players: int = 0
+
+    @property
+    def all_answered(self) -> bool:
+        """Whether this answer was the last one the question was waiting for."""
+        return self.question_answers >= self.players
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """A consistent view of a game's leaderboard."""
+
+    version: int
+    # Entries by username, best first, each with its 1-based "rank"
+    data: dict = field(default_factory=dict)
+
+
+def split_entry(value) -> tuple[dict, dict, int]:
+    """Split a stored leaderboard entry into profile, counters and the
+    bitset of answered question ordinals."""
+    if not isinstance(value, dict):
+        value = {}
+    profile = {
+        k: v for k, v in value.items() if k not in COUNTERS and k not in DERIVED_FIELDS
+    }
+    counters = {name: int(value.get(name) or 0) for name in COUNTERS}
+    return profile, counters, bitset.decode(value.get("answered"))
+
+
+def make_entry(profile: dict, counters: dict, answered: int, rank: int) -> dict:
+    return {**profile, **counters, "answered": bitset.encode(answered), "rank": rank}
+
+
+class LeaderboardEngine(ABC):
+    """Live leaderboards of games in progress.
+
+    Questions are identified by their ordinal in the game. Each answer is
+    recorded in one atomic step, so concurrent answers never overwrite each
+    other, and a question counts once per player. Answers
+    are also counted per question, so the answer completing a question is
+    known without looking at the other players. Players are ranked by
+    score, ties by username in reverse order (the order of a Redis sorted
+    set). Every change bumps the game's version, which orders the snapshots
+    persisted to the `Leaderboard` model.
+    """
+
+    @abstractmethod
+    async def load(
+        self, game_id, data: dict, version: int = 0, answers: Iterable[tuple] = ()
+    ) -> bool:
+        """Seed the game's leaderboard from persisted `data` and replay
+        `answers`, `(username, question, outcome, points)` tuples the
+        data may not include yet, unless it is already loaded. Returns
+        whether it was seeded."""
+
+    @abstractmethod
+    async def record_answer(
+        self, game_id, username: str, question: int, outcome: str, points: int
+    ) -> AnswerResult | None:
+        """Count an answer with `outcome` ("correct", "wrong" or "skipped")
+        worth `points`. Returns None if the player already answered the
+        question and raises `GameNotLoaded` if the game is not loaded."""
+
+    @abstractmethod
+    async def snapshot(self, game_id) -> Snapshot:
+        """Return the game's leaderboard, raising `GameNotLoaded` if it is
+        not loaded."""
+
+    @abstractmethod
+    async def clear(self, game_id):
+        """Forget the game's leaderboard."""
+
+
+class _MemoryBoard:
+    def __init__(self, version: int):
+        self.version = version
+        self.profiles: dict[str, dict] = {}
+        self.counters: dict[str, dict] = {}
+        # Bitsets of answered question ordinals
+        self.answered: dict[str, int] = {}
+        # (score, username) ascending, so the best player is last
+        self.ranking: list[tuple[int, str]] = []
+        # Players who answered each question
+        self.question_answers: dict[int, int] = {}
+
+    def add_player(self, username: str, profile: dict, counters: dict, answered: int):
+        self.profiles[username] = profile
+        self.counters[username] = counters
+        self.answered[username] = answered
+        insort(self.ranking, (counters["score"], username))
+        for question in bitset.ordinals(answered):
+            self.question_answers[question] = self.question_answers.get(question, 0) + 1
+
+    def rank(self, username: str) -> int:
+        index = bisect_left(self.ranking, (self.counters[username]["score"], username))
+        return len(self.ranking) - index
+
+    def record(
+        self, username: str, question: int, outcome: str, points: int
+    ) -> AnswerResult | None:
+        old_rank = None
+        if username not in self.counters:
+            self.add_player(username, {}, dict.fromkeys(COUNTERS, 0), 0)
+        elif self.answered[username] >> question & 1:
+            return None
+        else:
+            old_rank = self.rank(username)
+        counters = self.counters[username]
+        self.ranking.remove((counters["score"], username))
+        counters[OUTCOME_COUNTERS[outcome]] += 1
+        counters["score"] += points
+        insort(self.ranking, (counters["score"], username))
+        self.answered[username] |= 1 << question
+        self.question_answers[question] = self.question_answers.get(question, 0) + 1
+        self.version += 1
+        rank = self.rank(username)
+        return AnswerResult(
+            username=username,
+            version=self.version,
+            entry=self.entry(username, rank),
+            old_rank=old_rank,
+            rank=rank,
+            question_answers=self.question_answers[question],
+            players=len(self.ranking),
+        )
+
+    def entry(self, username: str, rank: int) -> dict:
+        return make_entry(
+            self.profiles[username],
+            dict(self.counters[username]),
+            self.answered[username],
+            rank,
+        )
+
+
+class InMemoryLeaderboardEngine(LeaderboardEngine):
+    """Leaderboards in this process. Each method runs without awaiting, so
+    it is atomic on the event loop; only correct with a single worker."""
+
+    def __init__(self):
+        self._boards: dict[str, _MemoryBoard] = {}
+
+    def _board(self, game_id) -> _MemoryBoard:
+        board = self._boards.get(str(game_id))
+        if board is None:
+            raise GameNotLoaded(str(game_id))
+        return board
+
+    async def load(
+        self, game_id, data: dict, version: int = 0, answers: Iterable[tuple] = ()
+    ) -> bool:
+        if str(game_id) in self._boards:
+            return False
+        board = _MemoryBoard(version)
+        for username, value in (data or {}).items():
+            board.add_player(username, *split_entry(value))
+        for answer in answers:
+            board.record(*answer)
+        self._boards[str(game_id)] = board
+        return True
+
+    async def record_answer(
+        self, game_id, username: str, question: int, outcome: str, points: int
+    ) -> AnswerResult | None:
+        return self._board(game_id).record(username, question, outcome, points)
+
+    async def snapshot(self, game_id) -> Snapshot:
+        board = self._board(game_id)
+        data = {
+            username: board.entry(username, rank)
+            for rank, (_, username) in enumerate(reversed(board.ranking), start=1)
+        }
+        return Snapshot(version=board.version, data=data)
+
+    async def clear(self, game_id):
+        self._boards.pop(str(game_id), None)
+
+
+@functools.cache
+def get_engine() -> LeaderboardEngine:
+    """The engine shared by this process: Redis when `LEADERBOARD_REDIS_URL`
+    is set, so every worker sees the same leaderboards."""
+    if settings.LEADERBOARD_REDIS_URL:
+        from ai_quiz.leaderboard.redis_engine import RedisLeaderboardEngine
+
+        return RedisLeaderboardEngine(settings.LEADERBOARD_REDIS_URL)
+    return InMemoryLeaderboardEngine()
@@ -0,0 +1,146 @@
+from datetime import datetime
+
+from channels.db import database_sync_to_async
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ai_quiz.models import (
+    Game,
+    GlobalLeaderboardEntry,
+    Leaderboard,
+    Participant,
+    Question,
+)
+
+# Cross-game leaderboards of registered users, one per scope (every game, or
+# the games on one topic) and period (all time, or the month or ISO week the
+# games ended in). Each finished game adds its final leaderboard to the
+# entries of its players on every board it belongs to, in a handful of
+# queries however many players it had, so a board is always ready to read
+# through the (scope, period, -score, user) index.
+
+ALL = "all"
+# Time windows a board can cover besides all time
+WINDOWS = ("week", "month")
+# Leaderboard entry counters summed into `GlobalLeaderboardEntry`
+TOTALS = ("score", "correct_answers", "wrong_answers", "skipped_questions")
+
+
+def scope_key(topic_id=None) -> str:
+    return ALL if topic_id is None else f"topic:{topic_id}"
+
+
+def period_key(window: str, when: datetime) -> str:
+    """The period of `window` ("all", "week" or "month") containing `when`."""
+    if window == ALL:
+        return ALL
+    if window == "week":
+        year, week, _ = when.isocalendar()
+        return f"week:{year}-W{week:02d}"
+    if window == "month":
+        return f"month:{when:%Y-%m}"
+    raise ValueError(f"Unknown leaderboard window: {window}")
+
+
+def board_keys(topic_id, when: datetime) -> list[tuple[str, str]]:
+    """The (scope, period) of every board a game on `topic_id` that ended
+    at `when` counts towards."""
+    scopes = [scope_key()]
+    if topic_id is not None:
+        scopes.append(scope_key(topic_id))
+    periods = [period_key(window, when) for window in (ALL, *WINDOWS)]
+    return [(scope, period) for scope in scopes for period in periods]
+
+
+def record_game(game: Game, data: dict) -> bool:
+    """Add the final leaderboard `data` of the finished game to the global
+    leaderboards, once. Returns whether it was added now."""
+    with transaction.atomic():
+        claimed = Leaderboard.objects.filter(
+            game=game, aggregated_at__isnull=True
+        ).update(aggregated_at=timezone.now())
+        if not claimed:
+            return False
+        user_ids = dict(
+            Participant.objects.filter(
+                room_id=game.room_id, user__isnull=False
+            ).values_list("user__username", "user_id")
+        )
+        results = {
+            user_ids[username]: entry
+            for username, entry in data.items()
+            if username in user_ids and isinstance(entry, dict)
+        }
+        if not results:
+            return True
+        topic_id = (
+            Question.objects.filter(game=game, topic__isnull=False)
+            .values_list("topic_id", flat=True)
+            .first()
+        )
+        boards = board_keys(topic_id, game.ended_at or timezone.now())
+        # Create the missing entries, then add to all of them under row locks
+        # so games finishing together do not overwrite each other's totals
+        GlobalLeaderboardEntry.objects.bulk_create(
+            [
+                GlobalLeaderboardEntry(scope=scope, period=period, user_id=user_id)
+                for scope, period in boards
+                for user_id in results
+            ],
+            ignore_conflicts=True,
+        )
+        entries = list(
+            GlobalLeaderboardEntry.objects.select_for_update()
+            .filter(
+                scope__in={scope for scope, _ in boards},
+                period__in={period for _, period in boards},
+                user_id__in=results,
+            )
+            .order_by("id")
+        )
+        now = timezone.now()
+        for entry in entries:
+            result = results[entry.user_id]
+            entry.games_played += 1
+            entry.updated_at = now
+            for name in TOTALS:
+                setattr(entry, name, getattr(entry, name) + int(result.get(name) or 0))
+        GlobalLeaderboardEntry.objects.bulk_update(
+            entries, ["games_played", *TOTALS, "updated_at"]
+        )
+    return True
+
+
+async def arecord_game(game: Game, data: dict) -> bool:
+    return await database_sync_to_async(record_game)(game, data)
+
+
+def _board(scope: str, period: str):
+    return GlobalLeaderboardEntry.objects.filter(scope=scope, period=period)
+
+
+def top(scope: str = ALL, period: str = ALL, limit: int = 10) -> list:
+    """The best `limit` entries of the board, with their users. Ties are
+    ordered by user id, so ranks are stable."""
+    return list(
+        _board(scope, period)
+        .select_related("user")
+        .order_by("-score", "user_id")[:limit]
+    )
+
+
+def rank_of(
+    user_id, scope: str = ALL, period: str = ALL
+) -> tuple[GlobalLeaderboardEntry | None, int | None]:
+    """The user's entry on the board and its 1-based rank, ordered as `top`,
+    or (None, None) if they have none."""
+    entry = _board(scope, period).filter(user_id=user_id).first()
+    if entry is None:
+        return None, None
+    ahead = (
+        _board(scope, period)
+        .filter(Q(score__gt=entry.score) | Q(score=entry.score, user_id__lt=user_id))
+        .count()
+    )
+    return entry, ahead + 1
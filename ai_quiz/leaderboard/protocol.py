@@ -0,0 +1,73 @@
+from ai_quiz.leaderboard.engine import AnswerResult, Snapshot
+
+# Leaderboard messages sent to rooms.
+#
+# A client gets a full `leaderboard_update` when it joins a game in progress
+# and whenever it asks for one (`send_leaderboard_update`), and a
+# `leaderboard_delta` as answers come in. Both carry the leaderboard version
+# as `seq`; a delta also carries `prevSeq`, the version it builds on.
+#
+# A delta lists the entries that changed and the rank moves behind them,
+# each with the `seq` of the answer that caused it. A player moving from rank
+# `from` up to rank `to` takes rank `to` and pushes the other players ranked
+# `to` to `from - 1` down one place (`from` is null for a player new to the
+# leaderboard, who pushes everyone from `to` down). An entry holds its
+# player's rank as of its own `seq` only, since later moves may push it down.
+#
+# Moves are relative, so deltas apply in order: a client at version `prevSeq`
+# applies the moves and entries of a delta together in `seq` order and takes
+# the delta's `seq`. A delta building on a later version is held until the
+# ones before it arrive, and one at or below the client's version is dropped.
+# A gap in the versions that does not fill within a moment means a delta was
+# missed, and the client should ask for a snapshot.
+#
+# Broadcast entries leave out `answered`, the bitset of answered questions.
+
+SNAPSHOT_EVENT_TYPE = "leaderboard_update"
+DELTA_EVENT_TYPE = "leaderboard_delta"
+# Entry fields kept out of broadcasts
+PRIVATE_FIELDS = ("answered",)
+
+
+def public_entry(username: str, entry: dict, **extra) -> dict:
+    return {
+        "username": username,
+        **{k: v for k, v in entry.items() if k not in PRIVATE_FIELDS},
+        **extra,
+    }
+
+
+def snapshot_message(snapshot: Snapshot) -> dict:
+    return {
+        "type": SNAPSHOT_EVENT_TYPE,
+        "seq": snapshot.version,
+        "payload": [
+            public_entry(username, entry) for username, entry in snapshot.data.items()
+        ],
+    }
+
+
+def delta_message(results: list[AnswerResult]) -> dict:
+    """One delta for `results`, oldest first, keeping the latest entry of
+    each player and every move in order."""
+    entries = {}
+    moves = []
+    for result in results:
+        entries[result.username] = public_entry(
+            result.username, result.entry, seq=result.version
+        )
+        if result.old_rank != result.rank:
+            moves.append(
+                {
+                    "username": result.username,
+                    "seq": result.version,
+                    "from": result.old_rank,
+                    "to": result.rank,
+                }
+            )
+    return {
+        "type": DELTA_EVENT_TYPE,
+        "seq": results[-1].version,
+        "prevSeq": results[0].version - 1,
+        "payload": {"entries": list(entries.values()), "moves": moves},
+    }
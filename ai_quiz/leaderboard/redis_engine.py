@@ -0,0 +1,306 @@
+import asyncio
+import json
+import weakref
+from collections import Counter
+from typing import Iterable
+
+import redis.asyncio as redis
+
+import quizio.settings as settings
+from ai_quiz.leaderboard import bitset
+from ai_quiz.leaderboard.engine import (
+    COUNTERS,
+    OUTCOME_COUNTERS,
+    AnswerResult,
+    GameNotLoaded,
+    LeaderboardEngine,
+    Snapshot,
+    make_entry,
+    split_entry,
+)
+
+# Every key of a game shares the "{game_id}" hash tag, so the scripts below
+# touch a single cluster slot:
+#   meta           hash: version, and when every player's keys were last
+#                  refreshed (swept)
+#   rank           sorted set: username -> score
+#   profiles       hash: username -> profile JSON
+#   player:<u>     hash: counters
+#   answered:<u>   bitmap of answered question ordinals (see bitset)
+#   questions      hash: question ordinal -> players who answered it
+
+# Bitmaps cross the scripts as hex, since replies are decoded as UTF-8
+_HEX = """
+local function tohex(raw)
+  return (string.gsub(raw or '', '.', function(c)
+    return string.format('%02x', string.byte(c))
+  end))
+end
+local function fromhex(hex)
+  return (string.gsub(hex, '..', function(h)
+    return string.char(tonumber(h, 16))
+  end))
+end
+"""
+
+_SEED = (
+    _HEX
+    + """
+if redis.call('HSETNX', KEYS[1], 'version', ARGV[2]) == 0 then
+  return 0
+end
+local prefix, ttl = ARGV[1], ARGV[4]
+for username, player in pairs(cjson.decode(ARGV[3])) do
+  redis.call('HSET', KEYS[3], username, player.profile)
+  redis.call('ZADD', KEYS[2], player.counters.score, username)
+  local counters = prefix .. 'player:' .. username
+  for name, value in pairs(player.counters) do
+    redis.call('HSET', counters, name, value)
+  end
+  redis.call('EXPIRE', counters, ttl)
+  if player.answered ~= '' then
+    local answered = prefix .. 'answered:' .. username
+    redis.call('SET', answered, fromhex(player.answered), 'EX', ttl)
+  end
+end
+for question, count in pairs(cjson.decode(ARGV[6])) do
+  redis.call('HSET', KEYS[4], question, count)
+end
+for _, answer in ipairs(cjson.decode(ARGV[5])) do
+  local username, question = answer[1], answer[2]
+  local answered = prefix .. 'answered:' .. username
+  if redis.call('SETBIT', answered, question, 1) == 0 then
+    local counters = prefix .. 'player:' .. username
+    redis.call('HINCRBY', counters, answer[3], 1)
+    local score = redis.call('HINCRBY', counters, 'score', answer[4])
+    redis.call('ZADD', KEYS[2], score, username)
+    redis.call('HINCRBY', KEYS[1], 'version', 1)
+    redis.call('HINCRBY', KEYS[4], question, 1)
+    redis.call('EXPIRE', counters, ttl)
+    redis.call('EXPIRE', answered, ttl)
+  end
+end
+for i = 1, 4 do
+  redis.call('EXPIRE', KEYS[i], ttl)
+end
+return 1
+"""
+)
+
+_RECORD = (
+    _HEX
+    + """
+if redis.call('HEXISTS', KEYS[1], 'version') == 0 then
+  return false
+end
+local username, question, ttl = ARGV[1], ARGV[2], tonumber(ARGV[5])
+if redis.call('SETBIT', KEYS[4], question, 1) == 1 then
+  return {}
+end
+local old_rank = redis.call('ZREVRANK', KEYS[2], username)
+redis.call('HINCRBY', KEYS[3], ARGV[3], 1)
+local score = redis.call('HINCRBY', KEYS[3], 'score', ARGV[4])
+redis.call('ZADD', KEYS[2], score, username)
+local version = redis.call('HINCRBY', KEYS[1], 'version', 1)
+local answers = redis.call('HINCRBY', KEYS[6], question, 1)
+-- The game's keys outlive this answer by ttl. Players who stopped answering
+-- have their keys swept every ttl / 2, for long enough to do the same.
+local now = tonumber(redis.call('TIME')[1])
+if now - tonumber(redis.call('HGET', KEYS[1], 'swept') or 0) >= ttl / 2 then
+  local prefix, swept_ttl = ARGV[6], math.floor(ttl * 3 / 2)
+  for _, player in ipairs(redis.call('ZRANGE', KEYS[2], 0, -1)) do
+    redis.call('EXPIRE', prefix .. 'player:' .. player, swept_ttl)
+    redis.call('EXPIRE', prefix .. 'answered:' .. player, swept_ttl)
+  end
+  redis.call('HSET', KEYS[1], 'swept', now)
+end
+for i = 1, 6 do
+  redis.call('EXPIRE', KEYS[i], ttl)
+end
+return {
+  version,
+  old_rank or -1,
+  redis.call('ZREVRANK', KEYS[2], username),
+  redis.call('HGET', KEYS[5], username) or '{}',
+  redis.call('HGETALL', KEYS[3]),
+  tohex(redis.call('GET', KEYS[4])),
+  answers,
+  redis.call('ZCARD', KEYS[2]),
+}
+"""
+)
+
+_SNAPSHOT = (
+    _HEX
+    + """
+local version = redis.call('HGET', KEYS[1], 'version')
+if not version then
+  return false
+end
+local prefix = ARGV[1]
+local players = {}
+for i, username in ipairs(redis.call('ZREVRANGE', KEYS[2], 0, -1)) do
+  players[i] = {
+    username,
+    redis.call('HGET', KEYS[3], username) or '{}',
+    redis.call('HGETALL', prefix .. 'player:' .. username),
+    tohex(redis.call('GET', prefix .. 'answered:' .. username)),
+  }
+end
+return {version, players}
+"""
+)
+
+
+def _pairs(flat: list) -> dict:
+    return {flat[i]: flat[i + 1] for i in range(0, len(flat), 2)}
+
+
+def _counters(flat: list) -> dict:
+    values = _pairs(flat)
+    return {name: int(values.get(name, 0)) for name in COUNTERS}
+
+
+class RedisLeaderboardEngine(LeaderboardEngine):
+    """Leaderboards in Redis, shared by every worker. Each operation is one
+    Lua script, so it is atomic and takes a single round trip."""
+
+    def __init__(self, url: str):
+        self.url = url
+        # Connections belong to the event loop that opened them
+        self._clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def _scripts(self) -> dict:
+        loop = asyncio.get_running_loop()
+        scripts = self._clients.get(loop)
+        if scripts is None:
+            client = redis.from_url(self.url, decode_responses=True)
+            scripts = self._clients[loop] = {
+                name: client.register_script(source)
+                for name, source in [
+                    ("seed", _SEED),
+                    ("record", _RECORD),
+                    ("snapshot", _SNAPSHOT),
+                ]
+            }
+            scripts["client"] = client
+        return scripts
+
+    @staticmethod
+    def _prefix(game_id) -> str:
+        return f"leaderboard:{{{game_id}}}:"
+
+    def _keys(self, game_id) -> list[str]:
+        prefix = self._prefix(game_id)
+        return [
+            f"{prefix}meta",
+            f"{prefix}rank",
+            f"{prefix}profiles",
+            f"{prefix}questions",
+        ]
+
+    async def load(
+        self, game_id, data: dict, version: int = 0, answers: Iterable[tuple] = ()
+    ) -> bool:
+        players = {}
+        question_answers = Counter()
+        for username, value in (data or {}).items():
+            profile, counters, answered = split_entry(value)
+            players[username] = {
+                "profile": json.dumps(profile),
+                "counters": counters,
+                "answered": bitset.encode(answered),
+            }
+            question_answers.update(bitset.ordinals(answered))
+        seeded = await self._scripts()["seed"](
+            keys=self._keys(game_id),
+            args=[
+                self._prefix(game_id),
+                version,
+                json.dumps(players),
+                settings.LEADERBOARD_TTL,
+                json.dumps(
+                    [
+                        [username, question, OUTCOME_COUNTERS[outcome], points]
+                        for username, question, outcome, points in answers
+                    ]
+                ),
+                json.dumps(question_answers),
+            ],
+        )
+        return bool(seeded)
+
+    async def record_answer(
+        self, game_id, username: str, question: int, outcome: str, points: int
+    ) -> AnswerResult | None:
+        prefix = self._prefix(game_id)
+        meta, rank, profiles, questions = self._keys(game_id)
+        result = await self._scripts()["record"](
+            keys=[
+                meta,
+                rank,
+                f"{prefix}player:{username}",
+                f"{prefix}answered:{username}",
+                profiles,
+                questions,
+            ],
+            args=[
+                username,
+                question,
+                OUTCOME_COUNTERS[outcome],
+                points,
+                settings.LEADERBOARD_TTL,
+                prefix,
+            ],
+        )
+        if result is None:
+            raise GameNotLoaded(str(game_id))
+        if not result:
+            return None
+        (
+            version,
+            old_rank,
+            new_rank,
+            profile,
+            counters,
+            answered,
+            question_answers,
+            players,
+        ) = result
+        return AnswerResult(
+            username=username,
+            version=int(version),
+            entry=make_entry(
+                json.loads(profile),
+                _counters(counters),
+                bitset.decode(answered),
+                new_rank + 1,
+            ),
+            old_rank=None if old_rank < 0 else old_rank + 1,
+            rank=new_rank + 1,
+            question_answers=question_answers,
+            players=players,
+        )
+
+    async def snapshot(self, game_id) -> Snapshot:
+        result = await self._scripts()["snapshot"](
+            keys=self._keys(game_id), args=[self._prefix(game_id)]
+        )
+        if result is None:
+            raise GameNotLoaded(str(game_id))
+        version, players = result
+        data = {
+            username: make_entry(
+                json.loads(profile), _counters(counters), bitset.decode(answered), i
+            )
+            for i, (username, profile, counters, answered) in enumerate(
+                players, start=1
+            )
+        }
+        return Snapshot(version=int(version), data=data)
+
+    async def clear(self, game_id):
+        client = self._scripts()["client"]
+        keys = [key async for key in client.scan_iter(f"{self._prefix(game_id)}*")]
+        if keys:
+            await client.delete(*keys)
@@ -0,0 +1,20 @@
+from ai_quiz.models import Question
+
+# Points for a correct answer given at once; they fall linearly to 0 by the
+# end of the question's time
+MAX_POINTS = 100
+
+
+def score_answer(
+    question: Question, answer: str | None, timestamp: int
+) -> tuple[str, int]:
+    """Return the outcome of `answer` ("correct", "wrong" or "skipped") and
+    the points it earns when submitted at `timestamp` (milliseconds)."""
+    if not answer:
+        # User skipped the question means the answer field will be null
+        return "skipped", 0
+    if question.correct_answer != answer:
+        return "wrong", 0
+    response_time = max(0, timestamp / 1000 - question.updated_at.timestamp())
+    points = int(max(0, MAX_POINTS * (1 - response_time / question.time_per_question)))
+    return "correct", points
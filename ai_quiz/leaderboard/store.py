@@ -0,0 +1,176 @@
+import logging
+import time
+
+from django.utils import timezone
+
+import quizio.settings as settings
+
+from ai_quiz.leaderboard import global_board, timeline
+from ai_quiz.leaderboard.engine import (
+    AnswerResult,
+    GameNotLoaded,
+    Snapshot,
+    get_engine,
+)
+from ai_quiz.models import Answer, Game, Leaderboard, Question
+
+# When this worker last persisted each live leaderboard, by game id
+_checkpointed: dict[str, float] = {}
+# Ordinal of each question id, by game id
+_ordinals: dict[str, dict[int, int]] = {}
+
+logger = logging.getLogger(__name__)
+
+
+async def load(game: Game) -> bool:
+    """Seed the engine from the game's persisted leaderboard, creating the
+    row if needed, and replay the journaled answers. Answers the snapshot
+    already includes are skipped as repeats. Returns whether the engine was
+    seeded."""
+    leaderboard, _ = await Leaderboard.objects.aget_or_create(game=game)
+    ordinals = await _question_ordinals(game.id)
+    answers = [
+        (username, ordinals[question_id], _outcome(text, is_correct), points)
+        async for username, question_id, text, is_correct, points in Answer.objects.filter(
+            question__game_id=game.id
+        )
+        .exclude(username="")
+        .order_by("id")
+        .values_list("username", "question_id", "answer", "is_correct", "points")
+    ]
+    if answers:
+        logger.info(f"Replaying {len(answers)} answers into leaderboard of {game.id}")
+    return await get_engine().load(
+        game.id, leaderboard.data, leaderboard.version, answers
+    )
+
+
+async def _question_ordinals(game_id, refresh: bool = False) -> dict[int, int]:
+    ordinals = _ordinals.get(str(game_id))
+    if ordinals is None or refresh:
+        ids = [
+            question_id
+            async for question_id in Question.objects.filter(game_id=game_id)
+            .order_by("id")
+            .values_list("id", flat=True)
+        ]
+        ordinals = _ordinals[str(game_id)] = {
+            question_id: ordinal for ordinal, question_id in enumerate(ids)
+        }
+    return ordinals
+
+
+async def question_ordinal(game_id, question_id) -> int:
+    """The position of the question among the game's questions by id, which
+    indexes the engine's answered-question bitsets."""
+    ordinals = await _question_ordinals(game_id)
+    if int(question_id) not in ordinals:
+        # Questions added to the game since the ordinals were read
+        ordinals = await _question_ordinals(game_id, refresh=True)
+    return ordinals[int(question_id)]
+
+
+def _outcome(answer: str, is_correct: bool | None) -> str:
+    if not answer:
+        return "skipped"
+    return "correct" if is_correct else "wrong"
+
+
+async def log_answers(answers: list[Answer]):
+    """Journal recorded answers in one insert, so a live leaderboard lost
+    before its next checkpoint can be rebuilt by `load`."""
+    await Answer.objects.abulk_create(answers)
+
+
+async def record_answer(
+    game: Game, username: str, question_id, outcome: str, points: int
+) -> AnswerResult | None:
+    """Record an answer in the live leaderboard, loading it on first use.
+    Returns None if the player already answered the question."""
+    engine = get_engine()
+    question = await question_ordinal(game.id, question_id)
+    try:
+        return await engine.record_answer(game.id, username, question, outcome, points)
+    except GameNotLoaded:
+        await load(game)
+        return await engine.record_answer(game.id, username, question, outcome, points)
+
+
+async def get_snapshot(game: Game) -> Snapshot:
+    """Return the live leaderboard of `game`, loading it on first use."""
+    engine = get_engine()
+    try:
+        return await engine.snapshot(game.id)
+    except GameNotLoaded:
+        await load(game)
+        return await engine.snapshot(game.id)
+
+
+async def persist_snapshot(game_id, snapshot: Snapshot) -> bool:
+    """Write `snapshot` to the `Leaderboard` row unless a newer one is
+    already there. Returns whether the row was updated."""
+    updated = await Leaderboard.objects.filter(
+        game_id=game_id, version__lt=snapshot.version
+    ).aupdate(data=snapshot.data, version=snapshot.version, updated_at=timezone.now())
+    if not updated:
+        logger.debug(
+            f"Skipped stale leaderboard snapshot {snapshot.version} of {game_id}"
+        )
+    return bool(updated)
+
+
+async def checkpoint(game_id) -> bool:
+    """Persist the live leaderboard of the game, if it is loaded and newer
+    than the row. Returns whether the row was updated."""
+    try:
+        snapshot = await get_engine().snapshot(game_id)
+    except GameNotLoaded:
+        return False
+    _checkpointed[str(game_id)] = time.monotonic()
+    return await persist_snapshot(game_id, snapshot)
+
+
+async def checkpoint_if_due(game_id) -> bool:
+    """`checkpoint` the game if this worker has not persisted it for
+    `LEADERBOARD_CHECKPOINT_INTERVAL` seconds."""
+    last = _checkpointed.setdefault(str(game_id), time.monotonic())
+    if time.monotonic() - last < settings.LEADERBOARD_CHECKPOINT_INTERVAL:
+        return False
+    return await checkpoint(game_id)
+
+
+async def close_question(game: Game, question: int):
+    """Persist the live leaderboard as the question with ordinal `question`
+    closes, and log its timeline frame. A game that is no longer in
+    progress is left alone, since `finish` already did both and dropped it
+    from the engine."""
+    engine = get_engine()
+    try:
+        snapshot = await engine.snapshot(game.id)
+    except GameNotLoaded:
+        if not await Game.objects.filter(id=game.id, status="in_progress").aexists():
+            return
+        await load(game)
+        snapshot = await engine.snapshot(game.id)
+    _checkpointed[str(game.id)] = time.monotonic()
+    await persist_snapshot(game.id, snapshot)
+    await timeline.record_frame(game.id, question, snapshot)
+
+
+async def finish(game: Game):
+    """Persist the final leaderboard of an ended game, replaying journaled
+    answers if this worker lost it, log the frame of its last question, add
+    it to the global leaderboards and drop it from the engine."""
+    snapshot = await get_snapshot(game)
+    await persist_snapshot(game.id, snapshot)
+    if game.current_question:
+        await timeline.record_frame(game.id, game.current_question - 1, snapshot)
+    await global_board.arecord_game(game, snapshot.data)
+    await forget(game.id)
+
+
+async def forget(game_id):
+    """Drop the game's live leaderboard and this worker's state for it."""
+    await get_engine().clear(game_id)
+    _checkpointed.pop(str(game_id), None)
+    _ordinals.pop(str(game_id), None)
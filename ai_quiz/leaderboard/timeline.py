@@ -0,0 +1,81 @@
+from typing import Iterable
+
+from ai_quiz.leaderboard.engine import Snapshot
+from ai_quiz.models import LeaderboardFrame, Question
+
+# The leaderboard of a game over time, one `LeaderboardFrame` per question.
+#
+# A frame is logged as a question closes and never changes afterwards. It
+# holds `[score gained, rank]` for each player whose score or rank changed
+# since the frame before; a player missing from a frame kept both. Ranks
+# are absolute, since a player's first frame has no rank to change from.
+# Folding the frames in order gives the standings after each question.
+
+
+def fold(frames: Iterable[dict], standings: dict | None = None) -> dict:
+    """Apply the deltas of `frames` to `standings` (username -> `[score,
+    rank]`, empty by default) and return them."""
+    standings = {} if standings is None else standings
+    for deltas in frames:
+        for username, (gained, rank) in deltas.items():
+            score = standings.get(username, [0, None])[0]
+            standings[username] = [score + gained, rank]
+    return standings
+
+
+def frame_deltas(standings: dict, data: dict) -> dict:
+    """The deltas taking `standings` to the leaderboard `data`."""
+    deltas = {}
+    for username, entry in data.items():
+        score, rank = standings.get(username, [0, None])
+        if entry["score"] != score or entry["rank"] != rank:
+            deltas[username] = [entry["score"] - score, entry["rank"]]
+    return deltas
+
+
+async def record_frame(game_id, question: int, snapshot: Snapshot):
+    """Log the frame of `question` from the leaderboard `snapshot` taken as
+    it closed, unless the question already has one."""
+    frames = [
+        (closed, deltas)
+        async for closed, deltas in LeaderboardFrame.objects.filter(game_id=game_id)
+        .order_by("id")
+        .values_list("question", "deltas")
+    ]
+    if any(closed == question for closed, _ in frames):
+        return
+    standings = fold(deltas for _, deltas in frames)
+    await LeaderboardFrame.objects.abulk_create(
+        [
+            LeaderboardFrame(
+                game_id=game_id,
+                question=question,
+                version=snapshot.version,
+                deltas=frame_deltas(standings, snapshot.data),
+            )
+        ],
+        # Another worker closed the question at the same time
+        ignore_conflicts=True,
+    )
+
+
+def get_timeline(game_id) -> dict:
+    """The frames of the game in the order they were logged, with the ids
+    of its questions by ordinal, in two queries."""
+    question_ids = list(
+        Question.objects.filter(game_id=game_id)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    frames = [
+        {
+            "question": frame.question,
+            "questionId": question_ids[frame.question]
+            if frame.question < len(question_ids)
+            else None,
+            "seq": frame.version,
+            "deltas": frame.deltas,
+        }
+        for frame in LeaderboardFrame.objects.filter(game_id=game_id).order_by("id")
+    ]
+    return {"gameId": str(game_id), "frames": frames}
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Awaitable, Callable, TypeVar
+
+from ai_quiz import metrics
+
+if TYPE_CHECKING:
+    from ai_quiz.admission import AdmissionController
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LLMUnavailableError(Exception):
+    """Raised when an LLM call failed or missed its deadline with no fallback."""
+
+
+class AdmissionRejected(LLMUnavailableError):
+    """Raised when an LLM call would queue for longer than the latency SLO.
+
+    It is not retried, since a retry would join the same queue.
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies in seconds."""
+
+    def __init__(self, window: int = 200):
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, percentile: float) -> float | None:
+        return metrics.percentile(self._samples, percentile)
+
+    def __len__(self):
+        return len(self._samples)
+
+
+@dataclass
+class CallPolicy:
+    name: str
+    # Seconds allowed for the whole call, including retries and backoff
+    deadline: float
+    max_retries: int = 2
+    backoff_base: float = 0.5
+    backoff_max: float = 4.0
+    # Fire a second request once the first is slower than this percentile
+    hedge_percentile: float = 95.0
+    hedge_min_samples: int = 20
+    latencies: LatencyTracker = field(default_factory=LatencyTracker)
+
+    def hedge_delay(self) -> float | None:
+        if len(self.latencies) < self.hedge_min_samples:
+            return None
+        return self.latencies.percentile(self.hedge_percentile)
+
+    def backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+
+def record_outcome(policy: CallPolicy, outcome: str):
+    metrics.increment("llm_calls", chain=policy.name, outcome=outcome)
+
+
+async def _first_successful(tasks: list[asyncio.Task]):
+    """Return the first task result that is not an exception."""
+    pending = set(tasks)
+    error = None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None:
+                return task
+            error = task.exception()
+    raise error
+
+
+def _admitted(admission: "AdmissionController | None", timeout: float | None = None):
+    return admission.slot(timeout) if admission is not None else nullcontext()
+
+
+async def _hedged_call(
+    policy: CallPolicy,
+    fn: Callable[[], Awaitable[T]],
+    admission: "AdmissionController | None" = None,
+) -> T:
+    async def hedge():
+        async with _admitted(admission):
+            return await fn()
+
+    primary = asyncio.create_task(fn())
+    tasks = [primary]
+    try:
+        delay = policy.hedge_delay()
+        if delay is not None:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if not done and admission is not None and admission.queued():
+                # A hedge would wait behind calls already queued for admission
+                record_outcome(policy, "hedge_skipped")
+            elif not done:
+                record_outcome(policy, "hedged")
+                tasks.append(asyncio.create_task(hedge()))
+        winner = await _first_successful(tasks)
+        if winner is not primary:
+            record_outcome(policy, "hedge_won")
+        return winner.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def call_with_policy(
+    policy: CallPolicy,
+    fn: Callable[[], Awaitable[T]],
+    fallback: Callable[[], Awaitable[T]] | None = None,
+    admission: "AdmissionController | None" = None,
+) -> T:
+    """Run `fn` with a deadline, jittered retries and a hedged second request.
+
+    With `admission`, each attempt and hedge first waits for a slot of it;
+    latencies are timed from admission, so queueing does not raise the hedge
+    delay. When every attempt fails or the deadline passes, `fallback` is
+    awaited instead. Without a fallback `LLMUnavailableError` is raised.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + policy.deadline
+    error: BaseException | None = None
+    for attempt in range(policy.max_retries + 1):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            async with _admitted(admission, remaining):
+                started = time.perf_counter()
+                result = await asyncio.wait_for(
+                    _hedged_call(policy, fn, admission), deadline - loop.time()
+                )
+        except asyncio.TimeoutError as e:
+            record_outcome(policy, "timeout")
+            error = e
+            break
+        except AdmissionRejected as e:
+            record_outcome(policy, "rejected")
+            error = e
+            break
+        except Exception as e:
+            record_outcome(policy, "error")
+            logger.warning(f"{policy.name} call failed (attempt {attempt + 1}): {e!r}")
+            error = e
+            if attempt < policy.max_retries:
+                pause = min(policy.backoff(attempt), deadline - loop.time())
+                await asyncio.sleep(max(0, pause))
+            continue
+        policy.latencies.record(time.perf_counter() - started)
+        record_outcome(policy, "success" if attempt == 0 else "retry_success")
+        return result
+
+    if fallback is not None:
+        try:
+            result = await fallback()
+        except Exception as e:
+            logger.warning(f"{policy.name} fallback failed: {e!r}")
+        else:
+            record_outcome(policy, "fallback")
+            return result
+    record_outcome(policy, "failure")
+    raise LLMUnavailableError(f"{policy.name} call failed: {error!r}") from error
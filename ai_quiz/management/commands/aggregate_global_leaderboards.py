@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from ai_quiz.leaderboard import global_board
+from ai_quiz.models import Game
+
+
+class Command(BaseCommand):
+    help = (
+        "Add finished games not yet counted, such as games that ended before "
+        "the global leaderboards existed, to the global leaderboards."
+    )
+
+    def handle(self, *args, **options):
+        games = Game.objects.filter(
+            status="finished", leaderboard__aggregated_at__isnull=True
+        ).select_related("leaderboard")
+        added = sum(
+            global_board.record_game(game, game.leaderboard.data)
+            for game in games.iterator()
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Added {added} games to the global leaderboards.")
+        )
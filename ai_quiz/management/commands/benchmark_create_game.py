@@ -0,0 +1,137 @@
+import asyncio
+import time
+import uuid
+
+from channels.db import database_sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+
+import quizio.settings as settings
+from ai_quiz import ai
+from ai_quiz.fake_llm import FakeQuizChatModel
+from ai_quiz.game_preparation import create_job, run_job
+from ai_quiz.metrics import percentile
+from ai_quiz.models import Game, GamePreparationJob, Room, Topic
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark game creation end to end against the offline fake LLM. "
+        "Creates throwaway hosts, rooms and games and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--games", type=int, default=50)
+        parser.add_argument("--concurrency", type=int, default=10)
+        parser.add_argument("--questions", type=int, default=10)
+        parser.add_argument("--difficulty", default="easy")
+        parser.add_argument(
+            "--topics", type=int, default=5, help="Number of distinct topics."
+        )
+        parser.add_argument("--seed", type=int, default=settings.FAKE_LLM_SEED)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=settings.FAKE_LLM_LATENCY,
+            help="Median seconds before the first token.",
+        )
+        parser.add_argument(
+            "--latency-jitter", type=float, default=settings.FAKE_LLM_LATENCY_JITTER
+        )
+        parser.add_argument(
+            "--tokens-per-second",
+            type=float,
+            default=settings.FAKE_LLM_TOKENS_PER_SECOND,
+        )
+        parser.add_argument(
+            "--throughput-jitter",
+            type=float,
+            default=settings.FAKE_LLM_THROUGHPUT_JITTER,
+        )
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the benchmark data."
+        )
+
+    def handle(self, *args, **options):
+        if not isinstance(ai.QUESTION_LLM, FakeQuizChatModel):
+            raise CommandError("Disable ENABLE_OPENAI to benchmark with the fake LLM.")
+        for llm in (ai.TOPIC_LLM, ai.QUESTION_LLM):
+            llm.seed = options["seed"]
+            llm.latency = options["latency"]
+            llm.latency_jitter = options["latency_jitter"]
+            llm.tokens_per_second = options["tokens_per_second"]
+            llm.throughput_jitter = options["throughput_jitter"]
+
+        run_id = uuid.uuid4().hex[:8]
+        topics = [f"Benchmark {run_id} topic {i}" for i in range(options["topics"])]
+        rooms = self._create_rooms(run_id, options["games"])
+        try:
+            started = time.perf_counter()
+            job_ids = asyncio.run(self._run(rooms, topics, options))
+            elapsed = time.perf_counter() - started
+            self._report(job_ids, elapsed)
+        finally:
+            if not options["keep"]:
+                User.objects.filter(username__startswith=f"bench-{run_id}-").delete()
+                Topic.objects.filter(name__in=topics).delete()
+
+    def _create_rooms(self, run_id: str, count: int) -> list[Room]:
+        rooms = []
+        for i in range(count):
+            host = User.objects.create_user(
+                username=f"bench-{run_id}-{i}",
+                email=f"bench-{run_id}-{i}@example.com",
+            )
+            rooms.append(Room.objects.create(host=host))
+        return rooms
+
+    async def _run(self, rooms: list[Room], topics: list[str], options) -> list[int]:
+        semaphore = asyncio.Semaphore(options["concurrency"])
+
+        async def create_game(i: int, room: Room) -> int:
+            async with semaphore:
+                # Same steps as CreateGameView, but waits for the job to finish
+                game = await Game.objects.acreate(room=room, status="waiting")
+                await database_sync_to_async(game.create_leaderboard)()
+                job = await create_job(
+                    game=game,
+                    topic=topics[i % len(topics)],
+                    n=options["questions"],
+                    difficulty=options["difficulty"],
+                )
+                await run_job(job.pk)
+                return job.pk
+
+        return await asyncio.gather(
+            *(create_game(i, room) for i, room in enumerate(rooms))
+        )
+
+    def _report(self, job_ids: list[int], elapsed: float):
+        jobs = GamePreparationJob.objects.filter(pk__in=job_ids).annotate(
+            first_question_at=Min("game__questions__created_at")
+        )
+        first_question, ready, failed = [], [], 0
+        for job in jobs:
+            if job.status != "ready":
+                failed += 1
+                continue
+            ready.append((job.updated_at - job.created_at).total_seconds())
+            first_question.append(
+                (job.first_question_at - job.created_at).total_seconds()
+            )
+
+        self.stdout.write(
+            f"{len(job_ids)} games in {elapsed:.2f}s "
+            f"({len(job_ids) / elapsed:.2f} games/s), {failed} failed"
+        )
+        for name, values in (
+            ("first question", first_question),
+            ("game ready", ready),
+        ):
+            self.stdout.write(
+                f"{name:>15}: "
+                f"p50 {percentile(values, 50) or 0:.3f}s  "
+                f"p95 {percentile(values, 95) or 0:.3f}s  "
+                f"max {max(values, default=0):.3f}s"
+            )
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from ai_quiz.leaderboard import InMemoryLeaderboardEngine, bitset, protocol
+
+OUTCOMES = ("correct", "correct", "wrong", "skipped")
+
+
+def message_size(message: dict) -> int:
+    """Bytes of `message` as a consumer writes it to one websocket."""
+    return len(json.dumps({"message": message}).encode())
+
+
+def legacy_message(snapshot) -> dict:
+    """The full leaderboard broadcast after every answer before deltas."""
+    return {
+        "type": protocol.SNAPSHOT_EVENT_TYPE,
+        "payload": [
+            {"username": username, **{k: v for k, v in entry.items() if k != "rank"}}
+            for username, entry in snapshot.data.items()
+        ],
+    }
+
+
+async def _simulate(players: int, questions: int, seed: int) -> dict[str, int]:
+    engine = InMemoryLeaderboardEngine()
+    names = [f"player{i}" for i in range(players)]
+    await engine.load(
+        "benchmark",
+        {name: {"avatarStyle": "adventurer", "avatarSeed": name} for name in names},
+    )
+    rng = random.Random(seed)
+    sent = {"full (legacy)": 0, "full": 0, "delta": 0}
+    for question in range(questions):
+        for name in rng.sample(names, players):
+            outcome = rng.choice(OUTCOMES)
+            points = rng.randint(1, 100) if outcome == "correct" else 0
+            result = await engine.record_answer(
+                "benchmark", name, question, outcome, points
+            )
+            snapshot = await engine.snapshot("benchmark")
+            # Every message goes to every player in the room
+            sent["full (legacy)"] += message_size(legacy_message(snapshot)) * players
+            sent["full"] += message_size(protocol.snapshot_message(snapshot)) * players
+            sent["delta"] += message_size(protocol.delta_message([result])) * players
+    return sent
+
+
+def benchmark(
+    players: int = 50, questions: int = 10, seed: int = 0
+) -> dict[str, float]:
+    """Return the bytes sent to a room per question when every player
+    answers every question, for each kind of broadcast."""
+    sent = asyncio.run(_simulate(players, questions, seed))
+    return {mode: total / questions for mode, total in sent.items()}
+
+
+async def _time_completion_checks(players: int, questions: int, seed: int) -> dict:
+    engine = InMemoryLeaderboardEngine()
+    names = [f"player{i}" for i in range(players)]
+    await engine.load("benchmark", {name: {} for name in names})
+    rng = random.Random(seed)
+    spent = {"scan": 0.0, "counter": 0.0}
+    for question in range(questions):
+        for name in rng.sample(names, players):
+            result = await engine.record_answer(
+                "benchmark", name, question, "correct", 1
+            )
+            # What the handler did after every answer before the counters
+            started = time.perf_counter()
+            snapshot = await engine.snapshot("benchmark")
+            scanned = all(
+                bitset.decode(entry["answered"]) >> question & 1
+                for entry in snapshot.data.values()
+            )
+            spent["scan"] += time.perf_counter() - started
+
+            started = time.perf_counter()
+            counted = result.all_answered
+            spent["counter"] += time.perf_counter() - started
+            assert scanned == counted
+    return spent
+
+
+def benchmark_completion(
+    players: int = 1000, questions: int = 3, seed: int = 0
+) -> dict[str, float]:
+    """Return the seconds per question spent checking after each answer
+    whether every player has answered, by scanning a snapshot of the
+    leaderboard and by the per-question answer counter."""
+    spent = asyncio.run(_time_completion_checks(players, questions, seed))
+    return {mode: total / questions for mode, total in spent.items()}
+
+
+def _finished_game_data(players: int, questions: int, answered) -> dict:
+    return {
+        f"player{i}": {
+            "avatarStyle": "adventurer",
+            "avatarSeed": f"player{i}",
+            "score": 50 * questions,
+            "correct_answers": questions,
+            "wrong_answers": 0,
+            "skipped_questions": 0,
+            **answered,
+            "rank": i + 1,
+        }
+        for i in range(players)
+    }
+
+
+def benchmark_answered_encoding(
+    players: int = 50, questions: int = 20, rounds: int = 200
+) -> dict[str, dict[str, float]]:
+    """Return the size of a finished game's `Leaderboard.data` and the
+    seconds to serialize it once, with answered questions as a list of ids
+    and as a bitset of ordinals."""
+    # Question ids as a database in use hands them out
+    ids = [str(100_000 + i) for i in range(questions)]
+    encodings = {
+        "id list": {"answered_questions": ids},
+        "bitset": {"answered": bitset.encode(bitset.from_ordinals(range(questions)))},
+    }
+    results = {}
+    for encoding, answered in encodings.items():
+        data = _finished_game_data(players, questions, answered)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            serialized = json.dumps(data)
+        results[encoding] = {
+            "bytes": len(serialized.encode()),
+            "seconds": (time.perf_counter() - started) / rounds,
+        }
+    return results
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the bytes sent to a room per question by full leaderboard "
+        "broadcasts and by deltas, the cost of detecting that every player "
+        "has answered, and the size of answered-question tracking."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--players", type=int, default=50)
+        parser.add_argument("--questions", type=int, default=10)
+        parser.add_argument(
+            "--completion-players",
+            type=int,
+            default=1000,
+            help="Room size for the all-players-answered benchmark.",
+        )
+        parser.add_argument("--completion-questions", type=int, default=3)
+        parser.add_argument(
+            "--encoding-questions",
+            type=int,
+            default=20,
+            help="Questions in the game whose leaderboard row is measured.",
+        )
+
+    def handle(self, *args, **options):
+        results = benchmark(options["players"], options["questions"])
+        baseline = results["full (legacy)"]
+        self.stdout.write(
+            f"Bytes sent per question to a room of {options['players']} players "
+            f"over {options['questions']} questions:"
+        )
+        for mode, sent in results.items():
+            self.stdout.write(
+                f"  {mode:<15} {sent / 1024:10.1f} KiB  {baseline / sent:6.1f}x"
+            )
+
+        players = options["completion_players"]
+        checks = benchmark_completion(players, options["completion_questions"])
+        self.stdout.write(
+            f"All-players-answered checks per question in a room of {players} players:"
+        )
+        for mode, seconds in checks.items():
+            self.stdout.write(
+                f"  {mode:<15} {seconds * 1000:10.3f} ms  "
+                f"{checks['scan'] / seconds:8.0f}x"
+            )
+
+        encodings = benchmark_answered_encoding(
+            options["players"], options["encoding_questions"]
+        )
+        baseline = encodings["id list"]
+        self.stdout.write(
+            f"Leaderboard row of {options['players']} players after "
+            f"{options['encoding_questions']} questions, by answered-question encoding:"
+        )
+        for encoding, measured in encodings.items():
+            self.stdout.write(
+                f"  {encoding:<15} {measured['bytes']:10d} B  "
+                f"{baseline['bytes'] / measured['bytes']:6.1f}x  "
+                f"{measured['seconds'] * 1e6:10.1f} us to serialize  "
+                f"{baseline['seconds'] / measured['seconds']:6.1f}x"
+            )
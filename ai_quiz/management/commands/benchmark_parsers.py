@@ -0,0 +1,86 @@
+import re
+import time
+
+from django.core.management.base import BaseCommand
+from langchain.output_parsers import YamlOutputParser
+
+from ai_quiz import ai
+from ai_quiz.fake_llm import FakeQuizChatModel
+from ai_quiz.output_parsers import ItemValidatingOutputParser
+from ai_quiz.parsers import streaming_list_parser
+
+
+def sample_response(n: int, fmt: str) -> str:
+    """A response of `n` questions as the offline model writes it in `fmt`."""
+    prompt = ai._build_prompt(
+        ai.QUESTION_GENERATOR_TEMPLATE, ai.QUESTION_OUTPUT_FORMATS, fmt
+    )
+    text = prompt.format(
+        topic="Science", subtopics=["Physics", "Chemistry"], n=n, difficulty="easy"
+    )
+    return FakeQuizChatModel().invoke(text).content
+
+
+def _stream(text: str, fmt: str):
+    parser = streaming_list_parser(ai.Question, "questions", fmt)
+    for token in re.findall(r"\s*\S+", text):
+        parser.feed(token)
+    parser.close()
+
+
+def benchmark(n: int = 100, runs: int = 20) -> dict[str, float]:
+    """Return the best time over `runs` for each parser to parse `n`
+    questions, in seconds per 100 questions."""
+    responses = {fmt: sample_response(n, fmt) for fmt in ("json", "yaml")}
+    parsers = {
+        "yaml (YamlOutputParser)": (
+            YamlOutputParser(pydantic_object=ai.TriviaGenerator).parse,
+            responses["yaml"],
+        ),
+        "yaml (per item)": (
+            ItemValidatingOutputParser(
+                pydantic_object=ai.TriviaGenerator, format="yaml"
+            ).parse,
+            responses["yaml"],
+        ),
+        "json (per item)": (
+            ItemValidatingOutputParser(
+                pydantic_object=ai.TriviaGenerator, format="json"
+            ).parse,
+            responses["json"],
+        ),
+        "yaml stream": (lambda text: _stream(text, "yaml"), responses["yaml"]),
+        "json stream": (lambda text: _stream(text, "json"), responses["json"]),
+    }
+    results = {}
+    for name, (parse, text) in parsers.items():
+        best = float("inf")
+        for _ in range(runs):
+            started = time.perf_counter()
+            parse(text)
+            best = min(best, time.perf_counter() - started)
+        results[name] = best * 100 / n
+    return results
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the cost of parsing LLM question responses as YAML and JSON, "
+        "whole and streamed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--questions", type=int, default=100)
+        parser.add_argument("--runs", type=int, default=20)
+
+    def handle(self, *args, **options):
+        results = benchmark(options["questions"], options["runs"])
+        baseline = results["yaml (YamlOutputParser)"]
+        self.stdout.write(
+            f"Parse cost per 100 questions (best of {options['runs']} runs "
+            f"of {options['questions']} questions):"
+        )
+        for name, seconds in results.items():
+            self.stdout.write(
+                f"  {name:<25} {seconds * 1000:8.2f}ms  {baseline / seconds:5.1f}x"
+            )
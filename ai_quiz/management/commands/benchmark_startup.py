@@ -0,0 +1,97 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_quiz.metrics import percentile
+
+# Libraries that should only load on the first LLM call, never at startup
+DEFERRED_MODULES = ("langchain", "langchain_core", "langchain_openai", "openai")
+# Import nesting levels listed as the slowest imports
+IMPORT_DEPTH = 3
+
+_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - started
+print(json.dumps({{"seconds": seconds, "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure_cold_import(module: str = "quizio.asgi") -> dict:
+    """Import `module` in a fresh interpreter.
+
+    Returns the import time in seconds, the loaded modules and the imports
+    made on behalf of the top-level modules, slowest first, as
+    `(cumulative microseconds, name)` pairs.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _SCRIPT.format(module=module)],
+        cwd=settings.BASE_DIR,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    if result.returncode:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    measurement = json.loads(result.stdout.strip().splitlines()[-1])
+    slowest = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented two spaces per level under their importer
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if 1 <= depth <= IMPORT_DEPTH:
+            slowest.append((int(cumulative), name.strip()))
+    measurement["slowest"] = sorted(slowest, reverse=True)
+    return measurement
+
+
+def deferred_modules_loaded(modules: list[str]) -> list[str]:
+    return [m for m in modules if m.split(".")[0] in DEFERRED_MODULES]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the cold import time of the ASGI application in fresh "
+        "interpreters and list the slowest imports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--module", default="quizio.asgi")
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument(
+            "--top", type=int, default=10, help="Number of slowest imports to list."
+        )
+        parser.add_argument(
+            "--budget",
+            type=float,
+            help="Fail if the median import time exceeds this many seconds.",
+        )
+
+    def handle(self, *args, **options):
+        runs = [measure_cold_import(options["module"]) for _ in range(options["runs"])]
+        seconds = [run["seconds"] for run in runs]
+        median = percentile(seconds, 50)
+        self.stdout.write(
+            f"Cold import of {options['module']} over {len(runs)} runs: "
+            f"min {min(seconds):.3f}s, median {median:.3f}s, max {max(seconds):.3f}s"
+        )
+        self.stdout.write("Slowest imports (last run):")
+        for cumulative, name in runs[-1]["slowest"][: options["top"]]:
+            self.stdout.write(f"  {cumulative / 1e6:7.3f}s  {name}")
+        deferred = deferred_modules_loaded(runs[-1]["modules"])
+        if deferred:
+            self.stdout.write(
+                self.style.WARNING(f"Loaded at startup: {', '.join(deferred[:10])}")
+            )
+        if options["budget"] is not None and median > options["budget"]:
+            raise CommandError(
+                f"Median import time {median:.3f}s exceeds {options['budget']}s."
+            )
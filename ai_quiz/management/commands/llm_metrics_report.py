@@ -0,0 +1,62 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ai_quiz.metrics import percentile
+from ai_quiz.models import LLMCallRecord
+
+
+def _fmt(value: float | None) -> str:
+    return "-" if value is None else f"{value:.2f}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Summarise stored LLM calls per chain, model and difficulty: "
+        "error rate, queue wait, time to first token, latency and tokens."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=float,
+            default=24,
+            help="Only include calls from the last N hours.",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["hours"])
+        groups = defaultdict(list)
+        for record in LLMCallRecord.objects.filter(created_at__gte=cutoff):
+            groups[(record.chain, record.model, record.difficulty)].append(record)
+        if not groups:
+            self.stdout.write("No LLM calls recorded.")
+            return
+
+        self.stdout.write(
+            f"{'chain':<16} {'model':<16} {'difficulty':<10} {'calls':>6} "
+            f"{'errors':>7} {'wait p50/p95':>13} {'ttft p50/p95':>13} "
+            f"{'latency p50/p95':>16} {'tokens in/out':>14} {'parse fail':>10}"
+        )
+        for (chain, model, difficulty), records in sorted(groups.items()):
+            errors = sum(r.outcome == "error" for r in records)
+            waits = [r.queue_wait for r in records]
+            ttfts = [
+                r.time_to_first_token
+                for r in records
+                if r.time_to_first_token is not None
+            ]
+            latencies = [r.latency for r in records if r.latency is not None]
+            tokens_in = sum(r.prompt_tokens for r in records) / len(records)
+            tokens_out = sum(r.completion_tokens for r in records) / len(records)
+            self.stdout.write(
+                f"{chain:<16} {model:<16} {difficulty or '-':<10} {len(records):>6} "
+                f"{errors / len(records):>7.1%} "
+                f"{_fmt(percentile(waits, 50)) + '/' + _fmt(percentile(waits, 95)):>13} "
+                f"{_fmt(percentile(ttfts, 50)) + '/' + _fmt(percentile(ttfts, 95)):>13} "
+                f"{_fmt(percentile(latencies, 50)) + '/' + _fmt(percentile(latencies, 95)):>16} "
+                f"{f'{tokens_in:.0f}/{tokens_out:.0f}':>14} "
+                f"{sum(r.parse_failures for r in records):>10}"
+            )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ai_quiz.instrumentation import prune_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete stored LLM calls older than LLM_CALL_RECORD_RETENTION_DAYS. "
+        "Run it periodically so the table stays bounded."
+    )
+
+    def handle(self, *args, **options):
+        deleted = prune_records()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} LLM call records."))
@@ -0,0 +1,18 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from ai_quiz.game_preparation import resume_stale_jobs
+
+
+class Command(BaseCommand):
+    help = "Resume game preparation jobs whose worker stopped before finishing."
+
+    def handle(self, *args, **options):
+        resumed = asyncio.run(self._resume())
+        self.stdout.write(self.style.SUCCESS(f"Resumed {resumed} preparation jobs."))
+
+    async def _resume(self) -> int:
+        tasks = await resume_stale_jobs()
+        await asyncio.gather(*tasks)
+        return len(tasks)
@@ -0,0 +1,47 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+import quizio.settings as settings
+from ai_quiz.question_pools import warm_pools
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-generate question pools for the most played topics. "
+        "Run with --loop to keep the pools topped up periodically."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--topics",
+            type=int,
+            default=settings.QUESTION_POOL_TOPICS,
+            help="Number of popular topic/difficulty pairs to warm.",
+        )
+        parser.add_argument("--loop", action="store_true")
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=settings.QUESTION_POOL_WARM_INTERVAL,
+            help="Seconds between passes with --loop.",
+        )
+
+    def handle(self, *args, **options):
+        asyncio.run(self._warm(options))
+
+    async def _warm(self, options):
+        while True:
+            try:
+                created = await warm_pools(options["topics"])
+            except Exception as e:
+                if not options["loop"]:
+                    raise
+                self.stderr.write(f"Warming pass failed: {e!r}")
+            else:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Created {created} question pools.")
+                )
+            if not options["loop"]:
+                return
+            await asyncio.sleep(options["interval"])
@@ -0,0 +1,74 @@
+import threading
+from collections import Counter, deque
+
+_lock = threading.Lock()
+_counters: Counter = Counter()
+_histograms: dict[tuple, deque] = {}
+
+# Observations kept per histogram; percentiles cover this rolling window
+HISTOGRAM_WINDOW = 1000
+
+
+def _key(name: str, tags: dict) -> tuple:
+    return (name, tuple(sorted(tags.items())))
+
+
+def percentile(values, percentile: float) -> float | None:
+    """Nearest-rank percentile of `values`, or None when empty."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+
+def increment(name: str, value: int = 1, **tags):
+    """Add `value` to the counter identified by `name` and its tags."""
+    with _lock:
+        _counters[_key(name, tags)] += value
+
+
+def get_counter(name: str, **tags) -> int:
+    with _lock:
+        return _counters[_key(name, tags)]
+
+
+def observe(name: str, value: float, **tags):
+    """Record one observation, e.g. a latency, in a rolling histogram."""
+    with _lock:
+        key = _key(name, tags)
+        if key not in _histograms:
+            _histograms[key] = deque(maxlen=HISTOGRAM_WINDOW)
+        _histograms[key].append(value)
+
+
+def counters() -> list[dict]:
+    """Return every counter as a flat list of dicts."""
+    with _lock:
+        return [
+            {"name": name, "tags": dict(tags), "value": value}
+            for (name, tags), value in sorted(_counters.items())
+        ]
+
+
+def histograms() -> list[dict]:
+    """Return count and percentiles of every histogram."""
+    with _lock:
+        items = [(key, list(values)) for key, values in sorted(_histograms.items())]
+    return [
+        {
+            "name": name,
+            "tags": dict(tags),
+            "count": len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "max": max(values),
+        }
+        for (name, tags), values in items
+    ]
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
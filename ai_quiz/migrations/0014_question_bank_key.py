@@ -0,0 +1,22 @@
+# Generated by Django 5.1.15 on 2026-10-18 03:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ai_quiz", "0013_gamemessage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="question",
+            name="bank_key",
+            field=models.CharField(blank=True, db_index=True, max_length=40, null=True),
+        ),
+        migrations.AddField(
+            model_name="singleplayerquestion",
+            name="bank_key",
+            field=models.CharField(blank=True, db_index=True, max_length=40, null=True),
+        ),
+    ]
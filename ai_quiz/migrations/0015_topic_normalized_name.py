@@ -0,0 +1,57 @@
+# Generated by Django 5.1.15 on 2026-10-18 03:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+from quizio.utils import normalize_text
+
+
+def merge_duplicate_topics(apps, schema_editor):
+    """Fill normalized_name and fold duplicate topics into the oldest row."""
+    Topic = apps.get_model("ai_quiz", "Topic")
+    Question = apps.get_model("ai_quiz", "Question")
+    SinglePlayerQuestion = apps.get_model("ai_quiz", "SinglePlayerQuestion")
+
+    kept: dict[str, object] = {}
+    for topic in Topic.objects.order_by("id"):
+        key = normalize_text(topic.name)
+        original = kept.get(key)
+        if original is None:
+            topic.normalized_name = key
+            topic.save(update_fields=["normalized_name"])
+            kept[key] = topic
+            continue
+        Question.objects.filter(topic=topic).update(topic=original)
+        SinglePlayerQuestion.objects.filter(topic=topic).update(topic=original)
+        if topic.subtopics and not original.subtopics:
+            original.subtopics = topic.subtopics
+            original.save(update_fields=["subtopics"])
+        topic.delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ai_quiz", "0014_question_bank_key"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="topic",
+            name="normalized_name",
+            field=models.CharField(max_length=512, null=True),
+        ),
+        migrations.AddField(
+            model_name="topic",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(merge_duplicate_topics, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="topic",
+            name="normalized_name",
+            field=models.CharField(max_length=512, unique=True),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.15 on 2026-10-18 04:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ai_quiz", "0015_topic_normalized_name"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GamePreparationJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("preparing", "Preparing"),
+                            ("ready", "Ready"),
+                            ("failed", "Failed"),
+                        ],
+                        default="preparing",
+                        max_length=10,
+                    ),
+                ),
+                ("topic", models.CharField(max_length=512)),
+                ("subtopics", models.JSONField(blank=True, default=list)),
+                ("n", models.IntegerField()),
+                ("difficulty", models.CharField(default="easy", max_length=10)),
+                ("time_per_question", models.IntegerField(default=30)),
+                ("questions_ready", models.IntegerField(default=0)),
+                ("attempts", models.IntegerField(default=0)),
+                ("error", models.TextField(blank=True, null=True)),
+                (
+                    "heartbeat_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "game",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="preparation_job",
+                        to="ai_quiz.game",
+                    ),
+                ),
+            ],
+        ),
+    ]
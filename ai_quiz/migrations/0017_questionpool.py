@@ -0,0 +1,57 @@
+# Generated by Django 5.1.15 on 2026-10-18 03:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ai_quiz", "0016_gamepreparationjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QuestionPool",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("difficulty", models.CharField(default="easy", max_length=10)),
+                ("subtopics", models.JSONField(blank=True, default=list)),
+                ("questions", models.JSONField(default=list)),
+                ("n", models.IntegerField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("available", "Available"), ("claimed", "Claimed")],
+                        default="available",
+                        max_length=10,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("claimed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "topic",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="question_pools",
+                        to="ai_quiz.topic",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["topic", "difficulty", "status"],
+                        name="ai_quiz_que_topic_i_a89b84_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.15 on 2026-10-18 03:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ai_quiz", "0017_questionpool"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LLMCallRecord",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("chain", models.CharField(max_length=32)),
+                ("model", models.CharField(max_length=64)),
+                ("difficulty", models.CharField(blank=True, default="", max_length=10)),
+                ("outcome", models.CharField(max_length=16)),
+                ("queue_wait", models.FloatField()),
+                ("time_to_first_token", models.FloatField(blank=True, null=True)),
+                ("latency", models.FloatField(blank=True, null=True)),
+                ("prompt_tokens", models.IntegerField(default=0)),
+                ("completion_tokens", models.IntegerField(default=0)),
+                ("parse_failures", models.IntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
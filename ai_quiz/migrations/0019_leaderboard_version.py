@@ -0,0 +1,22 @@
+# Generated by Django 5.1.15 on 2026-10-18 04:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ai_quiz", "0018_llmcallrecord"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="leaderboard",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="leaderboard",
+            name="version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.15 on 2026-10-18 04:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ai_quiz", "0019_leaderboard_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="answer",
+            name="points",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="answer",
+            name="username",
+            field=models.CharField(blank=True, default="", max_length=150),
+        ),
+    ]
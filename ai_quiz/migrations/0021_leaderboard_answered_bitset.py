@@ -0,0 +1,84 @@
+# Generated by Django 5.1.15 on 2026-10-18 06:10
+
+from django.db import migrations
+
+# Copies of ai_quiz.leaderboard.bitset, frozen here so the migration does not
+# import the leaderboard package or change with it. The bitset is the hex of
+# a Redis bitmap: ordinal 0 is the high bit of the first byte.
+_REVERSED = bytes(int(f"{b:08b}"[::-1], 2) for b in range(256))
+
+
+def _encode(ordinals) -> str:
+    mask = 0
+    for ordinal in ordinals:
+        mask |= 1 << ordinal
+    if not mask:
+        return ""
+    raw = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    return raw.translate(_REVERSED).hex()
+
+
+def _decode(value) -> list[int]:
+    if not value:
+        return []
+    mask = int.from_bytes(bytes.fromhex(value).translate(_REVERSED), "little")
+    return [ordinal for ordinal in range(mask.bit_length()) if mask >> ordinal & 1]
+
+
+def _question_ids(Question, game_id) -> list[str]:
+    return [
+        str(question_id)
+        for question_id in Question.objects.filter(game_id=game_id)
+        .order_by("id")
+        .values_list("id", flat=True)
+    ]
+
+
+def encode_answered_questions(apps, schema_editor):
+    """Replace each entry's list of answered question ids with the bitset of
+    their ordinals in the game."""
+    Leaderboard = apps.get_model("ai_quiz", "Leaderboard")
+    Question = apps.get_model("ai_quiz", "Question")
+    for leaderboard in Leaderboard.objects.iterator():
+        entries = [e for e in leaderboard.data.values() if isinstance(e, dict)]
+        if not any("answered_questions" in entry for entry in entries):
+            continue
+        ordinals = {
+            question_id: ordinal
+            for ordinal, question_id in enumerate(
+                _question_ids(Question, leaderboard.game_id)
+            )
+        }
+        for entry in entries:
+            answered = entry.pop("answered_questions", None) or []
+            entry["answered"] = _encode(
+                ordinals[str(q)] for q in answered if str(q) in ordinals
+            )
+        leaderboard.save(update_fields=["data"])
+
+
+def decode_answered_questions(apps, schema_editor):
+    Leaderboard = apps.get_model("ai_quiz", "Leaderboard")
+    Question = apps.get_model("ai_quiz", "Question")
+    for leaderboard in Leaderboard.objects.iterator():
+        entries = [e for e in leaderboard.data.values() if isinstance(e, dict)]
+        if not any("answered" in entry for entry in entries):
+            continue
+        question_ids = _question_ids(Question, leaderboard.game_id)
+        for entry in entries:
+            entry["answered_questions"] = [
+                question_ids[ordinal]
+                for ordinal in _decode(entry.pop("answered", None))
+                if ordinal < len(question_ids)
+            ]
+        leaderboard.save(update_fields=["data"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ai_quiz", "0020_answer_journal"),
+    ]
+
+    operations = [
+        migrations.RunPython(encode_answered_questions, decode_answered_questions),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.15 on 2026-10-18 04:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ai_quiz", "0021_leaderboard_answered_bitset"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeaderboardFrame",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("question", models.PositiveIntegerField()),
+                ("version", models.PositiveIntegerField()),
+                ("deltas", models.JSONField(default=dict)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "game",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="leaderboard_frames",
+                        to="ai_quiz.game",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("game", "question"), name="unique_leaderboard_frame"
+                    )
+                ],
+            },
+        ),
+    ]
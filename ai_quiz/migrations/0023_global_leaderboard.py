@@ -0,0 +1,64 @@
+# Generated by Django 5.1.15 on 2026-10-18 04:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ai_quiz", "0022_leaderboardframe"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="leaderboard",
+            name="aggregated_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="GlobalLeaderboardEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("scope", models.CharField(max_length=32)),
+                ("period", models.CharField(max_length=16)),
+                ("score", models.BigIntegerField(default=0)),
+                ("games_played", models.PositiveIntegerField(default=0)),
+                ("correct_answers", models.PositiveIntegerField(default=0)),
+                ("wrong_answers", models.PositiveIntegerField(default=0)),
+                ("skipped_questions", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="global_leaderboard_entries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["scope", "period", "-score", "user"],
+                        name="global_leaderboard_rank",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("scope", "period", "user"),
+                        name="unique_global_leaderboard_entry",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -2,6 +2,7 @@ import random
 import string
 import uuid
 
+from asgiref.sync import async_to_sync
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
 from django.db import models
@@ -9,6 +10,7 @@ from django.db.models import Q
 from django.utils import timezone
 from django.utils.timezone import now
 
+from quizio.utils import normalize_text
 from users.models import GuestUser
 
 User = get_user_model()
@@ -42,14 +44,19 @@ class Room(models.Model):
     def ahost_name(self):
         return self.host.username
 
-    def end_all_games(self):
+    def end_all_games(self, keep: "Game | None" = None):
+        from ai_quiz import leaderboard
+
         games = self.games.filter(Q(status="in_progress") | Q(status="waiting"))
+        if keep is not None:
+            games = games.exclude(pk=keep.pk)
         for game in games:
             game.status = "aborted"
             game.save()
+            async_to_sync(leaderboard.forget)(game.id)
 
-    async def aend_all_games(self):
-        return await database_sync_to_async(self.end_all_games)()
+    async def aend_all_games(self, keep: "Game | None" = None):
+        return await database_sync_to_async(self.end_all_games)(keep)
 
     def get_current_game(self):
         try:
@@ -127,7 +134,9 @@ class Game(models.Model):
         return leaderboard
 
     def get_next_question(self):
-        questions = self.questions.all()
+        # Served by id, the order leaderboard question ordinals refer to;
+        # without an order the database may return rows as they were updated
+        questions = self.questions.order_by("id")
         len_questions = len(questions)
         is_last_question = False
         if not len_questions:
@@ -145,14 +154,20 @@ class Game(models.Model):
         return None, is_last_question
 
     def end_game(self):
+        from ai_quiz import leaderboard
+
         self.status = "finished"
         self.ended_at = timezone.now()
         self.save()
+        async_to_sync(leaderboard.finish)(self)
 
     async def aend_game(self):
+        from ai_quiz import leaderboard
+
         self.status = "finished"
         self.ended_at = timezone.now()
         await self.asave()
+        await leaderboard.finish(self)
 
     async def aget_next_question(self):
         return await database_sync_to_async(self.get_next_question)()
@@ -176,6 +191,37 @@ class Game(models.Model):
         return None
 
 
+class GamePreparationJob(models.Model):
+    """Persisted state of the background job that fills a game with questions."""
+
+    STATUS_CHOICES = [
+        ("preparing", "Preparing"),
+        ("ready", "Ready"),
+        ("failed", "Failed"),
+    ]
+    game = models.OneToOneField(
+        Game, on_delete=models.CASCADE, related_name="preparation_job"
+    )
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default="preparing"
+    )
+    topic = models.CharField(max_length=512)
+    subtopics = models.JSONField(default=list, blank=True)
+    n = models.IntegerField()
+    difficulty = models.CharField(max_length=10, default="easy")
+    time_per_question = models.IntegerField(default=30)
+    questions_ready = models.IntegerField(default=0)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+    # Refreshed while a worker runs the job; a stale heartbeat means it died
+    heartbeat_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.game_id}-{self.status}"
+
+
 class Participant(models.Model):
     STATUS_CHOICES = [
         ("waiting", "Waiting"),
@@ -298,20 +344,143 @@ class Leaderboard(models.Model):
         Game, on_delete=models.CASCADE, related_name="leaderboard"
     )
     data = models.JSONField(default=dict)  # A dictionary to store rankings
+    # Version of the live leaderboard (ai_quiz.leaderboard) `data` is a snapshot of
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    # When the final `data` was added to the global leaderboards
+    aggregated_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"Leaderboard: {self.game.room.room_code}"
 
 
+class LeaderboardFrame(models.Model):
+    """The leaderboard as one question of a game closed, logged as changes
+    from the frame before (ai_quiz.leaderboard.timeline)."""
+
+    game = models.ForeignKey(
+        Game, on_delete=models.CASCADE, related_name="leaderboard_frames"
+    )
+    # Ordinal of the question in the game
+    question = models.PositiveIntegerField()
+    # Version of the live leaderboard when the question closed
+    version = models.PositiveIntegerField()
+    # Username -> [score gained, rank] of the players whose score or rank changed
+    deltas = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["game", "question"], name="unique_leaderboard_frame"
+            )
+        ]
+
+    def __str__(self):
+        return f"Leaderboard frame {self.question} of {self.game_id}"
+
+
+class GlobalLeaderboardEntry(models.Model):
+    """A registered user's totals over the finished games of one global
+    leaderboard, added to as games finish (ai_quiz.leaderboard.global_board)."""
+
+    # "all", or "topic:<topic id>" for the games on one topic
+    scope = models.CharField(max_length=32)
+    # "all", or the month ("month:2026-10") or ISO week ("week:2026-W42") the
+    # games ended in
+    period = models.CharField(max_length=16)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="global_leaderboard_entries"
+    )
+    score = models.BigIntegerField(default=0)
+    games_played = models.PositiveIntegerField(default=0)
+    correct_answers = models.PositiveIntegerField(default=0)
+    wrong_answers = models.PositiveIntegerField(default=0)
+    skipped_questions = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["scope", "period", "user"],
+                name="unique_global_leaderboard_entry",
+            )
+        ]
+        indexes = [
+            # Top-K scans and rank counts of a board
+            models.Index(
+                fields=["scope", "period", "-score", "user"],
+                name="global_leaderboard_rank",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} on {self.scope}/{self.period}: {self.score}"
+
+
 class Topic(models.Model):
     name = models.CharField(max_length=512, unique=False)
+    # Lowercased, whitespace-collapsed name used to deduplicate topics
+    normalized_name = models.CharField(max_length=512, unique=True)
     subtopics = models.JSONField(
         default=list, null=True, blank=True
     )  # Store subtopics as a JSON list
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if not self.normalized_name:
+            self.normalized_name = normalize_text(self.name)
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def get_or_create_by_name(name: str, subtopics: list[str] | None = None):
+        """Return the topic for `name`, creating it on first use."""
+        topic, created = Topic.objects.get_or_create(
+            normalized_name=normalize_text(name),
+            defaults={"name": name, "subtopics": subtopics or []},
+        )
+        if not created and subtopics and not topic.subtopics:
+            topic.subtopics = subtopics
+            topic.save(update_fields=["subtopics", "updated_at"])
+        return topic
+
+    @staticmethod
+    async def aget_or_create_by_name(name: str, subtopics: list[str] | None = None):
+        return await database_sync_to_async(Topic.get_or_create_by_name)(
+            name, subtopics
+        )
+
+
+class QuestionPool(models.Model):
+    """A pre-generated question set for a popular topic, claimed by one game."""
+
+    STATUS_CHOICES = [
+        ("available", "Available"),
+        ("claimed", "Claimed"),
+    ]
+    topic = models.ForeignKey(
+        Topic, on_delete=models.CASCADE, related_name="question_pools"
+    )
+    difficulty = models.CharField(max_length=10, default="easy")
+    subtopics = models.JSONField(default=list, blank=True)
+    # Serialized questions: subtopic, question, answer and options
+    questions = models.JSONField(default=list)
+    n = models.IntegerField()
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default="available"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["topic", "difficulty", "status"])]
+
+    def __str__(self):
+        return f"{self.topic.name}-{self.difficulty}-{self.status}"
+
 
 # Question model to define the trivia questions for each room
 class Question(models.Model):
@@ -328,6 +497,8 @@ class Question(models.Model):
     options = models.JSONField()  # Store options as a JSON list
     difficulty = models.CharField(max_length=10, default="easy")
     correct_answer = models.CharField(max_length=512)
+    # Hash of the normalized topic, difficulty and subtopics used by the question bank
+    bank_key = models.CharField(max_length=40, null=True, blank=True, db_index=True)
     time_per_question = models.IntegerField(
         default=30
     )  # Time limit for each question in seconds
@@ -372,6 +543,10 @@ class Answer(models.Model):
     answer = models.CharField(max_length=512)
     is_correct = models.BooleanField(default=None, null=True, blank=True)
     submitted_at = models.DateTimeField(default=timezone.now)
+    # Leaderboard name of the player and the points earned; live leaderboards
+    # lost before being persisted are rebuilt from these (ai_quiz.leaderboard)
+    username = models.CharField(max_length=150, blank=True, default="")
+    points = models.IntegerField(default=0)
 
     def __str__(self):
         return f"Answer by {self.user.username if self.user else self.guest_user.userName} to {self.question.text} - Correct: {self.is_correct}"
@@ -441,6 +616,8 @@ class SinglePlayerQuestion(models.Model):
     difficulty = models.CharField(max_length=10, default="easy")
     options = models.JSONField()  # Store options as a JSON list
     correct_answer = models.CharField(max_length=512)
+    # Hash of the normalized topic, difficulty and subtopics used by the question bank
+    bank_key = models.CharField(max_length=40, null=True, blank=True, db_index=True)
     timer = models.IntegerField(default=30)  # Time limit for each question in seconds
     created_at = models.DateTimeField(auto_now_add=True)
     answered = models.BooleanField(default=False)
@@ -493,3 +670,23 @@ class SinglePlayerAnswer(models.Model):
         # Automatically determine if the answer is correct
         self.is_correct = self.answer == self.question.correct_answer
         super().save(*args, **kwargs)
+
+
+class LLMCallRecord(models.Model):
+    """Timings and token counts of one LLM chain call."""
+
+    chain = models.CharField(max_length=32)
+    model = models.CharField(max_length=64)
+    difficulty = models.CharField(max_length=10, blank=True, default="")
+    outcome = models.CharField(max_length=16)
+    # Seconds between asking for the call and the model request going out
+    queue_wait = models.FloatField()
+    time_to_first_token = models.FloatField(null=True, blank=True)
+    latency = models.FloatField(null=True, blank=True)
+    prompt_tokens = models.IntegerField(default=0)
+    completion_tokens = models.IntegerField(default=0)
+    parse_failures = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.chain}-{self.model}-{self.outcome}"
@@ -0,0 +1,38 @@
+import logging
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import BaseOutputParser
+from pydantic import BaseModel
+
+from ai_quiz import metrics
+from ai_quiz.parsers import parse_structured
+
+logger = logging.getLogger(__name__)
+
+
+class ItemValidatingOutputParser(BaseOutputParser[BaseModel]):
+    """Chain step parsing a JSON or YAML response into `pydantic_object`.
+
+    Unlike `YamlOutputParser`, a malformed question only drops that question;
+    dropped items are counted in the `llm_dropped_items` metric.
+    """
+
+    pydantic_object: type[BaseModel]
+    format: str = "json"
+
+    def parse(self, text: str) -> BaseModel:
+        name = self.pydantic_object.__name__
+        try:
+            result, failures = parse_structured(text, self.pydantic_object, self.format)
+        except ValueError as e:
+            raise OutputParserException(
+                f"Failed to parse {name} from completion: {e}", llm_output=text
+            ) from e
+        if failures:
+            logger.warning(f"Dropped {failures} invalid items parsing {name}")
+            metrics.increment("llm_dropped_items", failures, parser=name)
+        return result
+
+    @property
+    def _type(self) -> str:
+        return "item_validating"
@@ -0,0 +1,246 @@
+import functools
+import json
+import logging
+import re
+import textwrap
+import typing
+
+import yaml
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+logger = logging.getLogger(__name__)
+
+M = typing.TypeVar("M", bound=BaseModel)
+
+OUTPUT_FORMATS = ("json", "yaml")
+
+_FENCE = re.compile(r"```[a-zA-Z]*[ \t]*\n?(.*?)(?:```|$)", re.DOTALL)
+# libyaml's loader is several times faster than the pure Python one
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def strip_code_fence(text: str) -> str:
+    """Return the body of the first fenced block, or the whole text."""
+    match = _FENCE.search(text)
+    return (match.group(1) if match else text).strip()
+
+
+@functools.cache
+def _item_adapters(pydantic_object: type[BaseModel]) -> dict[str, TypeAdapter]:
+    """Validators for the items of each list field of `pydantic_object`."""
+    adapters = {}
+    for name, field in pydantic_object.model_fields.items():
+        if typing.get_origin(field.annotation) is list:
+            (item_type,) = typing.get_args(field.annotation)
+            adapters[name] = TypeAdapter(item_type)
+    return adapters
+
+
+def parse_structured(
+    text: str, pydantic_object: type[M], fmt: str = "json"
+) -> tuple[M, int]:
+    """Parse a whole JSON or YAML response into `pydantic_object`.
+
+    The items of list fields are validated one by one: malformed items are
+    dropped and counted instead of failing the whole response. Returns the
+    model and the number of dropped items; raises `ValueError` when the
+    document itself cannot be parsed or its other fields are invalid.
+    """
+    document = strip_code_fence(text)
+    try:
+        if fmt == "json":
+            data = json.loads(document)
+        else:
+            data = yaml.load(document, Loader=_YAML_LOADER)
+    except (ValueError, yaml.YAMLError) as e:
+        raise ValueError(f"Invalid {fmt.upper()} document: {e}") from e
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected a {fmt.upper()} object, got: {document[:100]!r}")
+    failures = 0
+    for key, adapter in _item_adapters(pydantic_object).items():
+        items = data.get(key)
+        if not isinstance(items, list):
+            continue
+        valid = []
+        for item in items:
+            try:
+                valid.append(adapter.validate_python(item))
+            except ValidationError as e:
+                failures += 1
+                logger.warning(f"Skipping invalid item of {key}: {e}")
+        data[key] = valid
+    return pydantic_object.model_validate(data), failures
+
+
+def streaming_list_parser(
+    pydantic_object: type[BaseModel], list_key: str = "questions", fmt: str = "json"
+):
+    """Return the streaming list parser for responses in `fmt`."""
+    if fmt == "json":
+        return StreamingJsonListParser(pydantic_object, list_key)
+    return StreamingYamlListParser(pydantic_object, list_key)
+
+
+class StreamingYamlListParser:
+    """Incrementally parse a YAML list out of an LLM token stream.
+
+    Feed raw text chunks with `feed`; every call returns the items of
+    `list_key` that closed in that chunk, validated as `pydantic_object`.
+    Call `close` once the stream ends to flush the last item. Items that fail
+    to parse or validate are skipped and counted in `failures`.
+    """
+
+    def __init__(self, pydantic_object: type[BaseModel], list_key: str = "questions"):
+        self.pydantic_object = pydantic_object
+        self._list_key = re.compile(rf"^\s*{re.escape(list_key)}:\s*$")
+        self._partial_line = ""
+        self._in_list = False
+        self._done = False
+        self._item_indent: int | None = None
+        self._item_lines: list[str] = []
+        self.failures = 0
+
+    def feed(self, chunk: str) -> list[BaseModel]:
+        *lines, self._partial_line = (self._partial_line + chunk).split("\n")
+        return [item for item in map(self._consume_line, lines) if item is not None]
+
+    def close(self) -> list[BaseModel]:
+        items = self.feed("\n")
+        item = self._flush_item()
+        if item is not None:
+            items.append(item)
+        self._done = True
+        return items
+
+    def _consume_line(self, line: str) -> BaseModel | None:
+        if self._done:
+            return None
+        stripped = line.strip()
+        if not self._in_list:
+            self._in_list = bool(self._list_key.match(line))
+            return None
+        if not stripped:
+            return None
+        if stripped.startswith("```"):
+            # End of the fenced YAML document
+            self._done = True
+            return self._flush_item()
+        indent = len(line) - len(line.lstrip())
+        starts_item = stripped == "-" or stripped.startswith("- ")
+        if starts_item and (self._item_indent is None or indent <= self._item_indent):
+            item = self._flush_item()
+            self._item_indent = indent
+            self._item_lines = [line]
+            return item
+        if self._item_indent is None or indent <= self._item_indent:
+            # A sibling key of the list closes it
+            self._done = True
+            return self._flush_item()
+        self._item_lines.append(line)
+        return None
+
+    def _flush_item(self) -> BaseModel | None:
+        lines, self._item_lines = self._item_lines, []
+        if not lines:
+            return None
+        first = lines[0].strip()[1:].strip()
+        rest = lines[1:]
+        # Align the key after "- " with the keys on the following lines
+        body_indent = len(rest[0]) - len(rest[0].lstrip()) if rest else 0
+        text = textwrap.dedent("\n".join([" " * body_indent + first, *rest]))
+        try:
+            return self.pydantic_object.model_validate(
+                yaml.load(text, Loader=_YAML_LOADER)
+            )
+        except (yaml.YAMLError, ValidationError) as e:
+            self.failures += 1
+            logger.warning(f"Skipping unparseable {self.pydantic_object.__name__}: {e}")
+            return None
+
+
+class StreamingJsonListParser:
+    """Incrementally parse a JSON array out of an LLM token stream.
+
+    Has the same interface as `StreamingYamlListParser`. The text after the
+    `list_key` member is scanned once, tracking strings and nesting, so every
+    item is decoded and validated as soon as its closing comma or bracket
+    arrives.
+    """
+
+    def __init__(self, pydantic_object: type[BaseModel], list_key: str = "questions"):
+        self.pydantic_object = pydantic_object
+        self._list_start = re.compile(rf'"{re.escape(list_key)}"\s*:\s*\[')
+        self._buffer = ""
+        self._scanned = 0
+        self._in_list = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._item_start: int | None = None
+        self.failures = 0
+
+    def feed(self, chunk: str) -> list[BaseModel]:
+        if self._done:
+            return []
+        self._buffer += chunk
+        if not self._in_list:
+            match = self._list_start.search(self._buffer)
+            if match is None:
+                return []
+            self._in_list = True
+            self._buffer = self._buffer[match.end() :]
+        items = []
+        buffer, position = self._buffer, self._scanned
+        while position < len(buffer):
+            char = buffer[position]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == "," and not self._depth:
+                items.append(self._flush_item(buffer, position))
+            elif char in "]}" and not self._depth:
+                # The closing bracket of the list itself
+                items.append(self._flush_item(buffer, position))
+                self._done = True
+                break
+            elif not char.isspace():
+                if self._item_start is None:
+                    self._item_start = position
+                if char == '"':
+                    self._in_string = True
+                elif char in "[{":
+                    self._depth += 1
+                elif char in "]}":
+                    self._depth -= 1
+            position += 1
+        # Keep only the unfinished item so the buffer stays small
+        keep = position if self._item_start is None else self._item_start
+        self._buffer = buffer[keep:]
+        self._scanned = position - keep
+        if self._item_start is not None:
+            self._item_start -= keep
+        return [item for item in items if item is not None]
+
+    def close(self) -> list[BaseModel]:
+        item = None
+        if self._in_list and not self._done:
+            # A truncated stream leaves the last item unfinished
+            item = self._flush_item(self._buffer, len(self._buffer))
+        self._done = True
+        return [] if item is None else [item]
+
+    def _flush_item(self, buffer: str, end: int) -> BaseModel | None:
+        start, self._item_start = self._item_start, None
+        if start is None:
+            return None
+        try:
+            return self.pydantic_object.model_validate(json.loads(buffer[start:end]))
+        except (ValueError, ValidationError) as e:
+            self.failures += 1
+            logger.warning(f"Skipping unparseable {self.pydantic_object.__name__}: {e}")
+            return None
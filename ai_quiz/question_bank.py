@@ -0,0 +1,321 @@
+import hashlib
+import logging
+import random
+from typing import AsyncIterator
+
+from channels.db import database_sync_to_async
+from django.utils import timezone
+
+import quizio.settings as settings
+from ai_quiz import ai, dedupe, metrics
+from ai_quiz.ai import Question, TopicTriviaGenerator, TriviaGenerator
+from ai_quiz.llm_policy import LLMUnavailableError, record_outcome
+from ai_quiz.models import Question as QuestionModel
+from ai_quiz.models import SinglePlayerQuestion
+from quizio.utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+def make_bank_key(topic: str, difficulty: str, subtopics: list[str] | None) -> str:
+    """Build the bank key from the normalized topic, difficulty and subtopic set."""
+    normalized_subtopics = sorted({normalize_text(s) for s in subtopics or []})
+    raw = "|".join(
+        [
+            normalize_text(topic),
+            normalize_text(difficulty),
+            ",".join(normalized_subtopics),
+        ]
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def get_bank_questions(
+    bank_key: str,
+    n: int,
+    max_age=None,
+    max_reuse: int | None = None,
+) -> list[Question]:
+    """Return up to `n` banked questions for the key, least used first.
+
+    Every stored row with the key counts as one use of its question text, so a
+    question is eligible while it has been stored at most `max_reuse + 1` times.
+    """
+    if n <= 0:
+        return []
+    max_age = settings.QUESTION_BANK_MAX_AGE if max_age is None else max_age
+    max_reuse = settings.QUESTION_BANK_MAX_REUSE if max_reuse is None else max_reuse
+    cutoff = timezone.now() - max_age
+    fields = ("question", "subtopic", "correct_answer", "options")
+
+    candidates: dict[str, dict] = {}
+    for model in (QuestionModel, SinglePlayerQuestion):
+        rows = (
+            model.objects.filter(bank_key=bank_key, created_at__gte=cutoff)
+            .order_by("-created_at")
+            .values(*fields)[: settings.QUESTION_BANK_SCAN_LIMIT]
+        )
+        for row in rows:
+            text = normalize_text(row["question"])
+            if text in candidates:
+                candidates[text]["uses"] += 1
+            else:
+                candidates[text] = {**row, "uses": 1}
+
+    eligible = [c for c in candidates.values() if c["uses"] <= max_reuse + 1]
+    # Shuffle first so that ties on usage are broken randomly
+    random.shuffle(eligible)
+    eligible.sort(key=lambda c: c["uses"])
+    return [
+        Question(
+            subtopic=c["subtopic"] or "",
+            question=c["question"],
+            answer=c["correct_answer"],
+            options=c["options"],
+        )
+        for c in eligible[:n]
+    ]
+
+
+async def aget_bank_questions(bank_key: str, n: int, **kwargs) -> list[Question]:
+    return await database_sync_to_async(get_bank_questions)(bank_key, n, **kwargs)
+
+
+def get_fallback_questions(
+    topic: str, difficulty: str, n: int, exclude=()
+) -> list[Question]:
+    """Return up to `n` stored questions on the topic for when the LLM is down.
+
+    Unlike `get_bank_questions` this ignores age, reuse and the subtopic set:
+    any question ever asked on the topic at this difficulty will do.
+    """
+    if n <= 0:
+        return []
+    excluded = {normalize_text(text) for text in exclude}
+    fields = ("question", "subtopic", "correct_answer", "options")
+    candidates: dict[str, dict] = {}
+    for model in (QuestionModel, SinglePlayerQuestion):
+        rows = (
+            model.objects.filter(
+                topic__normalized_name=normalize_text(topic), difficulty=difficulty
+            )
+            .order_by("-created_at")
+            .values(*fields)[: settings.QUESTION_BANK_SCAN_LIMIT]
+        )
+        for row in rows:
+            text = normalize_text(row["question"])
+            if text not in excluded:
+                candidates.setdefault(text, row)
+    picked = random.sample(list(candidates.values()), min(n, len(candidates)))
+    return [
+        Question(
+            subtopic=c["subtopic"] or "",
+            question=c["question"],
+            answer=c["correct_answer"],
+            options=c["options"],
+        )
+        for c in picked
+    ]
+
+
+async def aget_fallback_questions(
+    topic: str, difficulty: str, n: int, exclude=()
+) -> list[Question]:
+    return await database_sync_to_async(get_fallback_questions)(
+        topic, difficulty, n, exclude
+    )
+
+
+def _fallback_for(topic: str, difficulty: str, n: int, exclude=(), served=None):
+    """Build the fallback passed to `ai.generate_questions`.
+
+    Questions it serves are also appended to `served`, if given.
+    """
+
+    async def fallback() -> TriviaGenerator:
+        questions = await aget_fallback_questions(topic, difficulty, n, exclude)
+        if not questions:
+            raise LLMUnavailableError(f"No stored questions to fall back on: {topic}")
+        logger.warning(f"Serving {len(questions)} stored questions for: {topic}")
+        if served is not None:
+            served.extend(questions)
+        return TriviaGenerator(
+            thoughts="",
+            topic=topic,
+            difficulty=difficulty,
+            n=len(questions),
+            questions=questions,
+        )
+
+    return fallback
+
+
+async def _get_dedupe_index(topic: str) -> dedupe.NearDuplicateIndex | None:
+    if not settings.DEDUPE_ENABLED:
+        return None
+    return await dedupe.aget_index(topic)
+
+
+def _subtopics_of(generated: TriviaGenerator) -> list[str]:
+    """Subtopics chosen by the combined prompt, or those of fallback questions."""
+    if isinstance(generated, TopicTriviaGenerator):
+        return generated.subtopics
+    return list(dict.fromkeys(question.subtopic for question in generated.questions))
+
+
+def _record_rejected(topic: str, rejected: int):
+    logger.info(f"Rejected {rejected} near-duplicate questions for: {topic}")
+    metrics.increment("near_duplicate_questions", rejected)
+
+
+async def generate_questions(
+    topic: str,
+    subtopics: list[str],
+    n: int,
+    difficulty: str,
+    **kwargs,
+) -> TriviaGenerator:
+    """Serve questions from the bank and ask the LLM only for the shortfall.
+
+    Drop-in replacement for `ai.generate_questions`. Callers should store the
+    returned questions with `make_bank_key(topic, difficulty, subtopics)` so
+    they can be served again later. LLM questions that reword one already
+    asked on the topic are rejected and regenerated. If the LLM fails or
+    misses its deadline, any stored questions on the topic are served instead.
+    When `subtopics` is empty, the first LLM call also chooses them and adds
+    them to the list.
+    """
+    banked = []
+    if settings.QUESTION_BANK_ENABLED:
+        bank_key = make_bank_key(topic, difficulty, subtopics)
+        banked = await aget_bank_questions(bank_key, n)
+        logger.info(f"Question bank served {len(banked)}/{n} questions for: {topic}")
+    questions = list(banked)
+    seen = {normalize_text(q.question) for q in banked}
+    index = await _get_dedupe_index(topic)
+    thoughts = ""
+    for _ in range(settings.DEDUPE_REGENERATE_ROUNDS + 1):
+        missing = n - len(questions)
+        if missing <= 0:
+            break
+        served = []
+        shared = []
+        fallback = _fallback_for(topic, difficulty, missing, seen, served)
+        if subtopics:
+            generated = await ai.generate_questions(
+                topic=topic,
+                # generate_questions shuffles the list in place
+                subtopics=list(subtopics),
+                n=missing,
+                difficulty=difficulty,
+                fallback=fallback,
+                shared=shared,
+                **kwargs,
+            )
+        else:
+            generated = await ai.generate_topic_and_questions(
+                topic=topic, n=missing, difficulty=difficulty, fallback=fallback
+            )
+            subtopics.extend(_subtopics_of(generated))
+        thoughts = thoughts or generated.thoughts
+        # Stored questions served as a fallback are in the index already, and
+        # questions shared with a concurrent identical call are indexed by it
+        from_store = {normalize_text(q.question) for q in served + shared}
+        rejected = 0
+        for question in generated.questions:
+            text = normalize_text(question.question)
+            if text in seen:
+                continue
+            if (
+                index is not None
+                and text not in from_store
+                and not index.add_if_new(question.question, question.answer)
+            ):
+                rejected += 1
+                continue
+            seen.add(text)
+            questions.append(question)
+        if not rejected:
+            break
+        _record_rejected(topic, rejected)
+    return TriviaGenerator(
+        thoughts=thoughts,
+        topic=topic,
+        difficulty=difficulty,
+        n=len(questions),
+        questions=questions,
+    )
+
+
+async def stream_questions(
+    topic: str,
+    subtopics: list[str],
+    n: int,
+    difficulty: str,
+    **kwargs,
+) -> AsyncIterator[Question]:
+    """Yield banked questions first, then stream the shortfall from the LLM.
+
+    Near-duplicates of questions already asked on the topic are dropped and
+    regenerated. Whatever the LLM could not deliver is topped up from stored
+    questions. When `subtopics` is empty, the first LLM call also chooses
+    them and adds them to the list before its first question is yielded.
+    """
+    banked = []
+    if settings.QUESTION_BANK_ENABLED:
+        banked = await aget_bank_questions(
+            make_bank_key(topic, difficulty, subtopics), n
+        )
+    seen = set()
+    for question in banked:
+        seen.add(normalize_text(question.question))
+        yield question
+    index = await _get_dedupe_index(topic)
+    try:
+        for _ in range(settings.DEDUPE_REGENERATE_ROUNDS + 1):
+            missing = n - len(seen)
+            if missing <= 0:
+                return
+            rejected = 0
+            shared = []
+            if subtopics:
+                questions = ai.stream_questions(
+                    topic=topic,
+                    subtopics=list(subtopics),
+                    n=missing,
+                    difficulty=difficulty,
+                    shared=shared,
+                    **kwargs,
+                )
+            else:
+                questions = ai.stream_topic_and_questions(
+                    topic=topic, n=missing, difficulty=difficulty, subtopics=subtopics
+                )
+            async for question in questions:
+                text = normalize_text(question.question)
+                if text in seen:
+                    continue
+                # Questions shared with a concurrent identical call are indexed by it
+                if (
+                    index is not None
+                    and question not in shared
+                    and not index.add_if_new(question.question, question.answer)
+                ):
+                    rejected += 1
+                    continue
+                seen.add(text)
+                yield question
+            if not rejected:
+                return
+            _record_rejected(topic, rejected)
+    except LLMUnavailableError as e:
+        missing = n - len(seen)
+        logger.warning(f"Falling back to stored questions for {topic}: {e}")
+        fallback = await aget_fallback_questions(topic, difficulty, missing, seen)
+        if not fallback and not seen:
+            raise
+        if not subtopics:
+            subtopics.extend(dict.fromkeys(question.subtopic for question in fallback))
+        record_outcome(ai.QUESTION_POLICY, "fallback")
+        for question in fallback:
+            yield question
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from collections import Counter
+
+from channels.db import database_sync_to_async
+from django.db.models import Count
+from django.utils import timezone
+
+import quizio.settings as settings
+from ai_quiz.ai import Question
+from ai_quiz.models import Question as QuestionModel
+from ai_quiz.models import QuestionPool, SinglePlayerQuestion, Topic
+from ai_quiz.question_bank import generate_questions
+from ai_quiz.topic_cache import generate_subtopics
+from quizio.utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+def popular_topics(limit: int | None = None) -> list[tuple[Topic, str]]:
+    """Return the most played (topic, difficulty) pairs, most games first."""
+    limit = settings.QUESTION_POOL_TOPICS if limit is None else limit
+    cutoff = timezone.now() - settings.QUESTION_POOL_POPULARITY_WINDOW
+    games = Counter()
+    for model in (QuestionModel, SinglePlayerQuestion):
+        rows = (
+            model.objects.filter(created_at__gte=cutoff, topic__isnull=False)
+            .values("topic_id", "difficulty")
+            .annotate(games=Count("game", distinct=True))
+        )
+        for row in rows:
+            games[(row["topic_id"], row["difficulty"])] += row["games"]
+    ranked = games.most_common(limit)
+    topics = Topic.objects.in_bulk([topic_id for (topic_id, _), _ in ranked])
+    return [
+        (topics[topic_id], difficulty)
+        for (topic_id, difficulty), _ in ranked
+        if topic_id in topics
+    ]
+
+
+def pool_deficits(limit: int | None = None) -> list[tuple[Topic, str, int]]:
+    """Return how many pools each popular topic is short of the target depth."""
+    cutoff = timezone.now() - settings.QUESTION_POOL_MAX_AGE
+    deficits = []
+    for topic, difficulty in popular_topics(limit):
+        available = QuestionPool.objects.filter(
+            topic=topic,
+            difficulty=difficulty,
+            status="available",
+            created_at__gte=cutoff,
+        ).count()
+        if available < settings.QUESTION_POOL_DEPTH:
+            deficits.append(
+                (topic, difficulty, settings.QUESTION_POOL_DEPTH - available)
+            )
+    return deficits
+
+
+def discard_expired_pools() -> int:
+    cutoff = timezone.now() - settings.QUESTION_POOL_MAX_AGE
+    deleted, _ = QuestionPool.objects.filter(
+        status="available", created_at__lt=cutoff
+    ).delete()
+    return deleted
+
+
+async def fill_pool(topic: Topic, difficulty: str) -> QuestionPool | None:
+    subtopics = (await generate_subtopics(topic.name)).subtopics
+    trivia = await generate_questions(
+        topic=topic.name,
+        subtopics=subtopics,
+        n=settings.QUESTION_POOL_SET_SIZE,
+        difficulty=difficulty,
+    )
+    if not trivia.questions:
+        return None
+    return await QuestionPool.objects.acreate(
+        topic=topic,
+        difficulty=difficulty,
+        subtopics=subtopics,
+        questions=[question.model_dump() for question in trivia.questions],
+        n=len(trivia.questions),
+    )
+
+
+async def warm_pools(limit: int | None = None) -> int:
+    """Top up the pools of popular topics to the target depth.
+
+    Returns the number of pools created.
+    """
+    await database_sync_to_async(discard_expired_pools)()
+    deficits = await database_sync_to_async(pool_deficits)(limit)
+    semaphore = asyncio.Semaphore(settings.QUESTION_POOL_WARM_CONCURRENCY)
+
+    async def fill(topic: Topic, difficulty: str):
+        async with semaphore:
+            return await fill_pool(topic, difficulty)
+
+    results = await asyncio.gather(
+        *(
+            fill(topic, difficulty)
+            for topic, difficulty, missing in deficits
+            for _ in range(missing)
+        ),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            logger.warning(f"Could not fill a question pool: {result!r}")
+    created = sum(isinstance(result, QuestionPool) for result in results)
+    logger.info(f"Created {created} question pools for {len(deficits)} topics")
+    return created
+
+
+def _same_subtopics(a: list[str], b: list[str]) -> bool:
+    return {normalize_text(s) for s in a} == {normalize_text(s) for s in b}
+
+
+def claim_pool(
+    topic: str, difficulty: str, n: int, subtopics: list[str] | None = None
+) -> QuestionPool | None:
+    """Atomically take an available pool with at least `n` questions.
+
+    When `subtopics` are given, only a pool generated for the same subtopics
+    is taken.
+    """
+    if not settings.QUESTION_POOL_ENABLED:
+        return None
+    cutoff = timezone.now() - settings.QUESTION_POOL_MAX_AGE
+    candidates = QuestionPool.objects.filter(
+        topic__normalized_name=normalize_text(topic),
+        difficulty=difficulty,
+        status="available",
+        n__gte=n,
+        created_at__gte=cutoff,
+    ).order_by("n", "created_at")
+    if subtopics:
+        candidates = [
+            pool
+            for pool in candidates[:20]
+            if _same_subtopics(pool.subtopics, subtopics)
+        ]
+    for pool in candidates[:5]:
+        # Compare-and-set on the status so concurrent games never share a pool
+        claimed = QuestionPool.objects.filter(pk=pool.pk, status="available").update(
+            status="claimed", claimed_at=timezone.now()
+        )
+        if claimed:
+            return pool
+    return None
+
+
+def pool_questions(pool: QuestionPool, n: int) -> list[Question]:
+    return [Question.model_validate(question) for question in pool.questions[:n]]
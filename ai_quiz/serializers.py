@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
 from ai_quiz.models import Question
+from quizio.utils import normalize_text
 
 
 class ErrorSerializer(serializers.Serializer):
@@ -56,14 +57,31 @@ class JoinRoomResponseSerializer(serializers.Serializer):
 class CreateGameRequestSerializer(serializers.Serializer):
     roomCode = serializers.CharField(max_length=8)
     topic = serializers.CharField(max_length=100)
-    subtopics = serializers.ListField(child=serializers.CharField(max_length=100))
+    # Subtopics the host picked are used as they are instead of being generated
+    subtopics = serializers.ListField(
+        child=serializers.CharField(max_length=100),
+        required=False,
+        default=list,
+        max_length=20,
+    )
     n = serializers.IntegerField()
     difficulty = serializers.CharField(max_length=10)
     timePerQuestion = serializers.IntegerField()
 
+    def validate_subtopics(self, value):
+        """Drop repeated subtopics, keeping the host's order."""
+        unique = {}
+        for subtopic in value:
+            unique.setdefault(normalize_text(subtopic), subtopic.strip())
+        return list(unique.values())
+
 
 class CreateGameResponseSerializer(serializers.Serializer):
     gameId = serializers.CharField(max_length=100)
+    status = serializers.CharField(max_length=10)
+    # LLM calls queued ahead of this game's and the expected wait in seconds
+    queuePosition = serializers.IntegerField()
+    estimatedWait = serializers.FloatField()
 
 
 class StartGameRequestSerializer(serializers.Serializer):
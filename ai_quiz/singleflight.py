@@ -0,0 +1,253 @@
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import uuid
+from typing import AsyncIterator, Awaitable, Callable, TypeVar
+
+from django.core.cache import cache
+from pydantic import BaseModel
+
+import quizio.settings as settings
+from ai_quiz import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+M = TypeVar("M", bound=BaseModel)
+
+
+def make_key(*parts) -> str:
+    """Hash the normalized call arguments into a short cache-safe key."""
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+class _Stream:
+    """Items produced so far by one shared stream."""
+
+    def __init__(self):
+        self.items: list = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.remote = False
+        self.consumers = 0
+        self.task: asyncio.Task | None = None
+        self._changed = asyncio.Event()
+
+    def push(self, item):
+        self.items.append(item)
+        self._notify()
+
+    def finish(self, error: BaseException | None = None):
+        self.done = True
+        self.error = error
+        self._notify()
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait(self, index: int):
+        while index >= len(self.items) and not self.done:
+            await self._changed.wait()
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution.
+
+    Callers in the same process await one shared task. Across workers, a lock
+    in the Django cache (Redis when `REDIS_CACHE_URL` is set) picks the worker
+    that makes the call; the others poll for the result it publishes and make
+    the call themselves if it releases the lock without one.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[tuple, asyncio.Task] = {}
+        self._streams: dict[tuple, _Stream] = {}
+
+    def _count(self, outcome: str):
+        metrics.increment("single_flight", flight=self.name, outcome=outcome)
+
+    def _lock_key(self, key: str) -> str:
+        return f"singleflight:{self.name}:{key}"
+
+    async def do(
+        self, key: str, fn: Callable[[], Awaitable[M]], model: type[M]
+    ) -> tuple[M, bool]:
+        """Return the call's result and whether it was shared with another call.
+
+        Shared results are deep copies, so callers may mutate what they get.
+        """
+        if not settings.SINGLE_FLIGHT_ENABLED:
+            return await fn(), False
+        local_key = (asyncio.get_running_loop(), key)
+        task = self._calls.get(local_key)
+        joined = task is not None
+        if joined:
+            self._count("coalesced")
+        else:
+            task = asyncio.ensure_future(
+                self._run(key, fn, lambda result: result.model_dump())
+            )
+            self._calls[local_key] = task
+            task.add_done_callback(lambda t: self._forget(self._calls, local_key, t))
+        # Shielded so a caller going away does not cancel the others' call
+        result, stored = await asyncio.shield(task)
+        if stored is not None:
+            return model.model_validate(stored), True
+        return (copy.deepcopy(result) if joined else result), joined
+
+    async def stream(
+        self,
+        key: str,
+        fn: Callable[[], AsyncIterator[M]],
+        model: type[M],
+        shared: list | None = None,
+    ) -> AsyncIterator[M]:
+        """Yield the items of one shared stream, appending any produced for
+        another caller to `shared`.
+
+        Callers in the same process get each item as it is produced; callers
+        in other workers get them all once the stream is complete. The stream
+        is cancelled when its last consumer stops reading.
+        """
+        if not settings.SINGLE_FLIGHT_ENABLED:
+            async for item in fn():
+                yield item
+            return
+        local_key = (asyncio.get_running_loop(), key)
+        flight = self._streams.get(local_key)
+        joined = flight is not None
+        if joined:
+            self._count("coalesced")
+        else:
+            flight = _Stream()
+            flight.task = asyncio.ensure_future(
+                self._run_stream(flight, key, fn, model)
+            )
+            self._streams[local_key] = flight
+            flight.task.add_done_callback(
+                lambda t: self._forget(self._streams, local_key, flight)
+            )
+        flight.consumers += 1
+        index = 0
+        try:
+            while True:
+                await flight.wait(index)
+                if index < len(flight.items):
+                    item = flight.items[index]
+                    index += 1
+                    if joined or flight.remote:
+                        item = copy.deepcopy(item)
+                        if shared is not None:
+                            shared.append(item)
+                    yield item
+                elif flight.error is not None:
+                    raise flight.error
+                else:
+                    return
+        finally:
+            flight.consumers -= 1
+            if not flight.consumers and not flight.task.done():
+                self._forget(self._streams, local_key, flight)
+                flight.task.cancel()
+
+    async def _run_stream(self, flight: _Stream, key: str, fn, model):
+        async def produce():
+            async for item in fn():
+                flight.push(item)
+            return flight.items
+
+        try:
+            _, stored = await self._run(
+                key, produce, lambda items: [item.model_dump() for item in items]
+            )
+            if stored is not None:
+                flight.remote = True
+                for item in stored:
+                    flight.push(model.model_validate(item))
+        except BaseException as e:
+            flight.finish(e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        else:
+            flight.finish()
+
+    @staticmethod
+    def _forget(registry: dict, local_key: tuple, value):
+        if registry.get(local_key) is value:
+            del registry[local_key]
+        if isinstance(value, asyncio.Task) and not value.cancelled():
+            # Mark the error as retrieved when every caller has gone away
+            value.exception()
+
+    async def _run(self, key: str, fn, dump) -> tuple:
+        """Make the call, or wait for the worker holding the lock to make it.
+
+        Returns `(result, None)` when the call ran here and `(None, stored)`
+        with the published result when another worker made it.
+        """
+        loop = asyncio.get_running_loop()
+        lock_key = self._lock_key(key)
+        token = uuid.uuid4().hex
+        deadline = loop.time() + settings.SINGLE_FLIGHT_LOCK_TTL
+        while True:
+            if await self._acquire(lock_key, token):
+                self._count("leader")
+                try:
+                    result = await fn()
+                    await self._publish(f"{lock_key}:{token}", dump(result))
+                    return result, None
+                finally:
+                    await self._release(lock_key, token)
+            stored = await self._wait_for_leader(lock_key, deadline)
+            if stored is not None:
+                self._count("coalesced_remote")
+                return None, stored
+            if loop.time() >= deadline:
+                logger.warning(f"Gave up waiting on another worker for: {lock_key}")
+                return await fn(), None
+
+    async def _acquire(self, lock_key: str, token: str) -> bool:
+        try:
+            return await cache.aadd(
+                lock_key, token, timeout=settings.SINGLE_FLIGHT_LOCK_TTL
+            )
+        except Exception as e:
+            # Without the cache every worker simply makes its own call
+            logger.warning(f"Single-flight lock unavailable: {e!r}")
+            return True
+
+    async def _publish(self, result_key: str, value):
+        try:
+            await cache.aset(
+                result_key, value, timeout=settings.SINGLE_FLIGHT_RESULT_TTL
+            )
+        except Exception as e:
+            logger.warning(f"Could not publish single-flight result: {e!r}")
+
+    async def _release(self, lock_key: str, token: str):
+        try:
+            if await cache.aget(lock_key) == token:
+                await cache.adelete(lock_key)
+        except Exception as e:
+            logger.warning(f"Could not release single-flight lock: {e!r}")
+
+    async def _wait_for_leader(self, lock_key: str, deadline: float):
+        """Poll for the result of the lock holder, or None once it is gone."""
+        loop = asyncio.get_running_loop()
+        try:
+            leader = await cache.aget(lock_key)
+            while leader is not None and loop.time() < deadline:
+                await asyncio.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+                stored = await cache.aget(f"{lock_key}:{leader}")
+                if stored is not None:
+                    return stored
+                if await cache.aget(lock_key) != leader:
+                    return None
+        except Exception as e:
+            logger.warning(f"Could not poll single-flight result: {e!r}")
+        return None
@@ -0,0 +1,273 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ai_quiz.admission import AdmissionController, FairQueue, current_host
+from ai_quiz.llm_policy import AdmissionRejected, CallPolicy, call_with_policy
+from ai_quiz.models import Game, Room
+from users.models import User
+
+
+class FairQueueTest(IsolatedAsyncioTestCase):
+    def test_serves_hosts_round_robin(self):
+        queue = FairQueue()
+        for waiter in ["a1", "a2", "a3"]:
+            queue.push(waiter, "a")
+        queue.push("b1", "b")
+        self.assertEqual([queue.pop() for _ in range(4)], ["a1", "b1", "a2", "a3"])
+        self.assertIsNone(queue.head())
+
+    def test_position_counts_one_call_per_host_and_round(self):
+        queue = FairQueue()
+        for waiter in ["a1", "a2", "a3"]:
+            queue.push(waiter, "a")
+        queue.push("b1", "b")
+        # A new call from b follows a1, b1 and a2; one from a follows everything
+        self.assertEqual(queue.position("b"), 3)
+        self.assertEqual(queue.position("a"), 4)
+        self.assertEqual(queue.position("c"), 2)
+
+
+class AdmissionControllerTest(IsolatedAsyncioTestCase):
+    def setUp(self):
+        cache.clear()
+        self.controller = AdmissionController("test")
+        # Started here so the tests' own patches take precedence
+        defaults = {
+            "ADMISSION_POLL_INTERVAL": 0.01,
+            "ADMISSION_MAX_QUEUE_WAIT": 60,
+            "ADMISSION_RATE": 100,
+            "ADMISSION_CONCURRENCY": 2,
+        }
+        for name, value in defaults.items():
+            patcher = patch(f"ai_quiz.admission.settings.{name}", value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def _call(self, controller, host="", seconds=0.02, log=None):
+        current_host.set(host)
+        async with controller.slot():
+            if log is not None:
+                log.append(host)
+            await asyncio.sleep(seconds)
+
+    async def _until_admitted(self):
+        loop = asyncio.get_running_loop()
+        while not self.controller._in_flight.get(loop):
+            await asyncio.sleep(0.001)
+
+    async def test_limits_calls_across_workers(self):
+        # Another worker shares the slots through the cache
+        other = AdmissionController("test")
+        in_flight = []
+        peak = 0
+
+        async def call(controller):
+            nonlocal peak
+            async with controller.slot():
+                in_flight.append(1)
+                peak = max(peak, len(in_flight))
+                await asyncio.sleep(0.02)
+                in_flight.pop()
+
+        await asyncio.gather(
+            *(call(c) for c in [self.controller, other] * 3),
+        )
+        self.assertEqual(peak, 2)
+
+    @patch("ai_quiz.admission.time.time", return_value=1000.0)
+    @patch("ai_quiz.admission.settings.ADMISSION_RATE", 2)
+    async def test_token_bucket_limits_call_rate(self, mock_time):
+        admitted = []
+
+        async def call():
+            try:
+                async with self.controller.slot(timeout=0.1):
+                    admitted.append(1)
+            except asyncio.TimeoutError:
+                pass
+
+        await asyncio.gather(*(call() for _ in range(3)))
+        self.assertEqual(len(admitted), 2)
+
+    @patch("ai_quiz.admission.settings.ADMISSION_CONCURRENCY", 1)
+    async def test_hosts_are_served_fairly(self):
+        log = []
+        first = asyncio.create_task(self._call(self.controller, "a", 0.05, log))
+        await self._until_admitted()
+        waiting = [
+            asyncio.create_task(self._call(self.controller, host, 0, log))
+            for host in ["a", "a", "a", "b"]
+        ]
+        await asyncio.gather(first, *waiting)
+        self.assertEqual(log, ["a", "a", "b", "a", "a"])
+
+    @patch("ai_quiz.admission.settings.ADMISSION_CONCURRENCY", 1)
+    @patch("ai_quiz.admission.settings.ADMISSION_MAX_QUEUE_WAIT", 1)
+    async def test_rejects_calls_over_the_slo(self):
+        self.controller._hold = 2.0
+        holder = asyncio.create_task(self._call(self.controller, "a", 0.05))
+        await self._until_admitted()
+        position, wait = self.controller.estimate("b")
+        self.assertEqual(position, 0)
+        self.assertEqual(wait, 2.0)
+        with self.assertRaises(AdmissionRejected) as raised:
+            async with self.controller.slot():
+                pass
+        self.assertEqual(raised.exception.retry_after, 2.0)
+        await holder
+
+    @patch("ai_quiz.admission.settings.ADMISSION_CONCURRENCY", 1)
+    async def test_times_out_waiting(self):
+        holder = asyncio.create_task(self._call(self.controller, "a", 0.1))
+        await self._until_admitted()
+        with self.assertRaises(asyncio.TimeoutError):
+            async with self.controller.slot(timeout=0.02):
+                pass
+        await holder
+        self.assertEqual(len(self.controller._queue()), 0)
+
+    async def test_admits_without_the_cache(self):
+        with patch("ai_quiz.admission.cache.aadd", side_effect=ConnectionError):
+            async with self.controller.slot():
+                pass
+
+    async def test_frees_the_slot_when_the_cache_fails_midway(self):
+        with patch.object(self.controller, "_take_token", side_effect=ConnectionError):
+            key, _ = await self.controller._try_acquire()
+        self.assertEqual(key, "")
+        slots = [f"admission:test:slot:{i}" for i in range(2)]
+        self.assertEqual(await cache.aget_many(slots), {})
+        self.assertEqual(await cache.aget("admission:test:in_use"), 0)
+
+    async def test_polls_without_scanning_slots_while_all_are_taken(self):
+        leases = [await self.controller._try_acquire() for _ in range(2)]
+        with patch("ai_quiz.admission.cache.aadd") as aadd:
+            self.assertIsNone(await self.controller._try_acquire())
+        aadd.assert_not_called()
+        await self.controller._release(*leases[0])
+        self.assertIsNotNone(await self.controller._try_acquire())
+
+    @patch("ai_quiz.admission.settings.ADMISSION_ENABLED", False)
+    @patch("ai_quiz.admission.settings.ADMISSION_CONCURRENCY", 1)
+    async def test_can_be_disabled(self):
+        in_flight = []
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            async with self.controller.slot():
+                in_flight.append(1)
+                peak = max(peak, len(in_flight))
+                await asyncio.sleep(0.01)
+                in_flight.pop()
+
+        await asyncio.gather(call(), call())
+        self.assertEqual(peak, 2)
+
+    async def test_rejected_calls_are_not_retried(self):
+        calls = 0
+
+        async def rejected():
+            nonlocal calls
+            calls += 1
+            raise AdmissionRejected("busy", retry_after=5)
+
+        async def fallback():
+            return "fallback"
+
+        policy = CallPolicy(name="test", deadline=5, max_retries=2)
+        self.assertEqual(await call_with_policy(policy, rejected, fallback), "fallback")
+        self.assertEqual(calls, 1)
+
+    @patch("ai_quiz.admission.settings.ADMISSION_CONCURRENCY", 1)
+    async def test_queue_wait_is_not_call_latency(self):
+        holder = asyncio.create_task(self._call(self.controller, "a", 0.1))
+        await self._until_admitted()
+
+        async def call():
+            return "ok"
+
+        policy = CallPolicy(name="test", deadline=5)
+        result = await call_with_policy(policy, call, admission=self.controller)
+        self.assertEqual(result, "ok")
+        self.assertLess(policy.latencies.percentile(100), 0.05)
+        await holder
+
+    @patch("ai_quiz.admission.settings.ADMISSION_CONCURRENCY", 1)
+    async def test_does_not_hedge_while_calls_queue(self):
+        policy = CallPolicy(name="test", deadline=5, hedge_min_samples=1)
+        policy.latencies.record(0.01)
+        calls = []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        primary = asyncio.create_task(
+            call_with_policy(policy, call, admission=self.controller)
+        )
+        await self._until_admitted()
+        waiting = asyncio.create_task(self._call(self.controller, "b", 0))
+        self.assertEqual(await primary, "ok")
+        await waiting
+        self.assertEqual(len(calls), 1)
+
+
+class CreateGameAdmissionTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="password123"
+        )
+        self.room = Room.objects.create(host=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.data = {
+            "roomCode": self.room.room_code,
+            "topic": "Science",
+            "n": 5,
+            "difficulty": "easy",
+            "timePerQuestion": 30,
+        }
+
+    @patch("ai_quiz.views.games.start_job")
+    @patch("ai_quiz.views.games.LLM_ADMISSION.check", return_value=(3, 4.5))
+    def test_returns_queue_position(self, mock_check, mock_start_job):
+        response = self.client.post(reverse("create_game"), self.data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["queuePosition"], 3)
+        self.assertEqual(response.data["estimatedWait"], 4.5)
+        mock_check.assert_called_once_with(str(self.user.pk))
+
+    @patch("ai_quiz.views.games.start_job")
+    @patch(
+        "ai_quiz.views.games.LLM_ADMISSION.check",
+        side_effect=AdmissionRejected("busy", retry_after=12.2),
+    )
+    def test_rejects_when_queue_is_too_long(self, mock_check, mock_start_job):
+        response = self.client.post(reverse("create_game"), self.data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response["Retry-After"], "13")
+        self.assertEqual(response.data["retryAfter"], 13)
+        mock_start_job.assert_not_called()
+        self.assertFalse(self.room.games.exists())
+
+    @patch("ai_quiz.views.games.start_job")
+    @patch(
+        "ai_quiz.views.games.LLM_ADMISSION.check",
+        side_effect=AdmissionRejected("busy", retry_after=12.2),
+    )
+    def test_rejection_leaves_the_current_game(self, mock_check, mock_start_job):
+        game = Game.objects.create(room=self.room, status="waiting")
+        response = self.client.post(reverse("create_game"), self.data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(list(self.room.games.all()), [game])
+        game.refresh_from_db()
+        self.assertEqual(game.status, "waiting")
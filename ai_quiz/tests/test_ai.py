@@ -0,0 +1,185 @@
+import asyncio
+import time
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from channels.layers import InMemoryChannelLayer
+from langchain.output_parsers import YamlOutputParser
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.runnables import RunnableLambda
+
+from ai_quiz import ai
+
+TOPIC_YAML = """
+thoughts: ""
+topic: "Science"
+subtopics:
+  - "Physics"
+  - "Chemistry"
+"""
+
+LLM_LATENCY = 0.3
+
+
+class TestGenerateSubtopicsNonBlocking(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.calls = 0
+        slow_chain = (
+            ai.TOPIC_GENERATOR_PROMPT
+            | RunnableLambda(self._count_call)
+            | FakeListChatModel(responses=[TOPIC_YAML], sleep=LLM_LATENCY)
+            | YamlOutputParser(pydantic_object=ai.TopicGenerator)
+        )
+        patchers = [
+            patch.object(ai, "TOPIC_CHAIN", slow_chain),
+            patch.object(ai.settings, "ENABLE_OPENAI", True),
+            # Each request makes its own slow call instead of sharing one
+            patch.object(ai.settings, "SINGLE_FLIGHT_ENABLED", False),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _count_call(self, prompt):
+        self.calls += 1
+        return prompt
+
+    async def _measure_room_event_latency(self, stop: asyncio.Event) -> float:
+        """Round-trip room events through a channel layer until stopped."""
+        layer = InMemoryChannelLayer()
+        channel = await layer.new_channel()
+        await layer.group_add("room", channel)
+        worst = 0.0
+        while not stop.is_set():
+            started = time.perf_counter()
+            await layer.group_send("room", {"type": "room_message", "event": {}})
+            await layer.receive(channel)
+            worst = max(worst, time.perf_counter() - started)
+            await asyncio.sleep(0.01)
+        return worst
+
+    async def test_concurrent_requests_do_not_block_websocket_events(self):
+        stop = asyncio.Event()
+        probe = asyncio.create_task(self._measure_room_event_latency(stop))
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(ai.generate_subtopics("Science") for _ in range(5))
+        )
+        elapsed = time.perf_counter() - started
+        stop.set()
+        worst_latency = await probe
+
+        self.assertTrue(all(r.subtopics == ["Physics", "Chemistry"] for r in results))
+        self.assertEqual(self.calls, 5)
+        # Calls overlap instead of running back to back
+        self.assertLess(elapsed, 2 * LLM_LATENCY)
+        # A blocking invoke would hold room events for the full LLM latency
+        self.assertLess(worst_latency, LLM_LATENCY / 3)
+
+
+class TestShardedQuestionGeneration(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = []
+        patchers = [
+            patch.object(ai, "QUESTION_CHAIN", RunnableLambda(self._fake_chain)),
+            patch.object(ai.settings, "ENABLE_OPENAI", True),
+            patch.object(ai.settings, "QUESTION_SHARD_SIZE", 10),
+            patch.object(ai.settings, "QUESTION_SHARD_CONCURRENCY", 2),
+            # Fixed-size shards; adaptive sizing is covered in test_batching
+            patch.object(ai.settings, "ADAPTIVE_BATCHING_ENABLED", False),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def _fake_chain(self, inputs):
+        self.calls.append(inputs)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.05)
+        self.in_flight -= 1
+        questions = [
+            ai.Question(
+                subtopic=inputs["subtopics"][0],
+                question=f"{inputs['subtopics'][0]} question {i}?",
+                answer="a",
+                options=["a", "b", "c", "d"],
+            )
+            for i in range(inputs["n"])
+        ]
+        # Every shard repeats the same question, which must be deduplicated
+        questions[0] = ai.Question(
+            subtopic="Shared", question="Shared question?", answer="a", options=["a"]
+        )
+        return ai.TriviaGenerator(
+            thoughts="",
+            topic=inputs["topic"],
+            difficulty="easy",
+            n=1,
+            questions=questions,
+        )
+
+    def test_split_into_shards(self):
+        shards = ai.split_into_shards(["a", "b", "c", "d", "e"], 25, 10)
+        self.assertEqual([count for _, count in shards], [9, 8, 8])
+        self.assertEqual([s for s, _ in shards], [["a", "d"], ["b", "e"], ["c"]])
+        self.assertEqual(ai.split_into_shards(["a"], 15, 10), [(["a"], 8), (["a"], 7)])
+
+    async def test_large_requests_are_sharded(self):
+        subtopics = [f"Subtopic {i}" for i in range(8)]
+        trivia = await ai.generate_questions("Science", subtopics, 35, "easy")
+
+        self.assertIsInstance(trivia, ai.TriviaGenerator)
+        self.assertEqual(len(self.calls), 4)
+        self.assertEqual(sum(call["n"] for call in self.calls), 35)
+        self.assertLessEqual(self.max_in_flight, 2)
+        texts = [q.question for q in trivia.questions]
+        self.assertEqual(len(texts), len(set(texts)))
+        self.assertEqual(texts.count("Shared question?"), 1)
+        self.assertEqual(trivia.n, len(trivia.questions))
+
+    async def test_failed_shards_are_topped_up_from_the_fallback(self):
+        fake_chain = self._fake_chain
+
+        async def failing_chain(inputs):
+            if "Subtopic 0" in inputs["subtopics"]:
+                raise RuntimeError("shard failed")
+            return await fake_chain(inputs)
+
+        async def fallback():
+            return ai.TriviaGenerator(
+                thoughts="",
+                topic="Science",
+                difficulty="easy",
+                n=35,
+                questions=[
+                    ai.Question(
+                        subtopic="Stored",
+                        question=f"Stored question {i}?",
+                        answer="a",
+                        options=["a", "b"],
+                    )
+                    for i in range(35)
+                ],
+            )
+
+        subtopics = [f"Subtopic {i}" for i in range(8)]
+        with (
+            patch.object(ai, "QUESTION_CHAIN", RunnableLambda(failing_chain)),
+            patch.object(ai.QUESTION_POLICY, "max_retries", 0),
+        ):
+            trivia = await ai.generate_questions(
+                "Science", subtopics, 35, "easy", fallback=fallback
+            )
+
+        self.assertEqual(len(trivia.questions), 35)
+        self.assertEqual(trivia.n, 35)
+        texts = [q.question for q in trivia.questions]
+        self.assertIn("Stored question 0?", texts)
+        self.assertEqual(len(texts), len(set(texts)))
+
+    async def test_small_requests_use_a_single_call(self):
+        await ai.generate_questions("Science", ["Physics"], 5, "easy")
+        self.assertEqual(len(self.calls), 1)
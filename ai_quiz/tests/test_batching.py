@@ -0,0 +1,156 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from langchain_core.runnables import RunnableLambda
+
+from ai_quiz import ai
+from ai_quiz.fake_llm import FakeQuizChatModel
+from ai_quiz.output_parsers import ItemValidatingOutputParser
+from ai_quiz.batching import (
+    BatchLatencyModel,
+    ConcurrencyBudget,
+    balanced_counts,
+    plan_batches,
+)
+
+
+def model_with(overhead, per_question, sizes=(2, 5, 10)):
+    model = BatchLatencyModel()
+    for size in sizes:
+        model.observe(size, overhead + per_question * size)
+    return model
+
+
+class BatchLatencyModelTest(SimpleTestCase):
+    def test_uses_priors_without_samples(self):
+        self.assertEqual(BatchLatencyModel(overhead=1, per_question=2).estimate(3), 7)
+
+    def test_fits_overhead_and_rate(self):
+        overhead, per_question = model_with(3.0, 0.5).coefficients()
+        self.assertAlmostEqual(overhead, 3.0)
+        self.assertAlmostEqual(per_question, 0.5)
+
+    def test_scales_priors_to_a_single_size(self):
+        model = BatchLatencyModel(overhead=1, per_question=1)
+        model.observe(4, 10)
+        self.assertAlmostEqual(model.estimate(4), 10)
+        self.assertAlmostEqual(model.estimate(9), 20)
+
+    def test_keeps_a_rolling_window(self):
+        model = BatchLatencyModel(window=3)
+        for size in range(1, 6):
+            model.observe(size, 1 + size)
+        self.assertEqual(len(model), 3)
+
+
+class PlanBatchesTest(SimpleTestCase):
+    def test_counts_are_balanced(self):
+        self.assertEqual(balanced_counts(10, 3), [4, 3, 3])
+
+    def test_slow_generation_spreads_across_calls(self):
+        plan = plan_batches(20, model_with(0.5, 1.0), 8, 2, 10)
+        # Eight calls would not make the largest batch any smaller
+        self.assertEqual(plan, [3, 3, 3, 3, 3, 3, 2])
+
+    def test_high_overhead_prefers_fewer_calls(self):
+        # A second round of calls costs more than larger batches
+        plan = plan_batches(20, model_with(20.0, 0.1), 2, 2, 10)
+        self.assertEqual(plan, [10, 10])
+
+    def test_respects_batch_size_limits(self):
+        plan = plan_batches(30, model_with(0.0, 1.0), 100, 3, 10)
+        self.assertEqual(plan, [3] * 10)
+        plan = plan_batches(30, model_with(100.0, 0.0), 1, 3, 10)
+        self.assertEqual(plan, [10, 10, 10])
+
+    def test_small_requests(self):
+        self.assertEqual(plan_batches(1, BatchLatencyModel(), 4, 3, 10), [1])
+        self.assertEqual(plan_batches(0, BatchLatencyModel(), 4, 3, 10), [])
+
+
+class ConcurrencyBudgetTest(IsolatedAsyncioTestCase):
+    async def test_limits_calls_in_flight(self):
+        budget = ConcurrencyBudget(2)
+        in_flight = []
+
+        async def call():
+            async with budget.slot():
+                in_flight.append(budget.limit - budget.available())
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(call() for _ in range(6)))
+        self.assertEqual(max(in_flight), 2)
+        self.assertEqual(budget.available(), 2)
+
+    async def test_times_out_waiting_for_a_slot(self):
+        budget = ConcurrencyBudget(1)
+        async with budget.slot():
+            with self.assertRaises(asyncio.TimeoutError):
+                async with budget.slot(0.01):
+                    pass
+        self.assertEqual(budget.available(), 1)
+
+
+class AdaptiveQuestionGenerationTest(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.calls = []
+        self.model = model_with(0.5, 1.0)
+        patchers = [
+            patch.object(ai, "QUESTION_CHAIN", RunnableLambda(self._fake_chain)),
+            patch.object(ai, "QUESTION_LATENCY", self.model),
+            patch.object(ai, "QUESTION_BUDGET", ConcurrencyBudget(4)),
+            patch.object(ai.settings, "ENABLE_OPENAI", True),
+            patch.object(ai.settings, "QUESTION_SHARD_SIZE", 10),
+            patch.object(ai.settings, "QUESTION_SHARD_CONCURRENCY", 8),
+            patch.object(ai.settings, "QUESTION_BATCH_MIN_SIZE", 2),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def _fake_chain(self, inputs):
+        self.calls.append(inputs["n"])
+        return ai.TriviaGenerator(
+            thoughts="",
+            topic=inputs["topic"],
+            difficulty="easy",
+            n=inputs["n"],
+            questions=[
+                ai.Question(
+                    subtopic="Physics",
+                    question=f"Question {len(self.calls)}.{i}?",
+                    answer="a",
+                    options=["a", "b"],
+                )
+                for i in range(inputs["n"])
+            ],
+        )
+
+    async def test_batches_follow_the_plan_within_the_budget(self):
+        trivia = await ai.generate_questions("Science", ["Physics"], 12, "easy")
+        self.assertEqual(len(trivia.questions), 12)
+        # The global budget of 4 caps the request's concurrency of 8
+        self.assertEqual(sorted(self.calls), [3, 3, 3, 3])
+
+    @patch.object(ai, "QUESTION_BUDGET", ConcurrencyBudget(1))
+    async def test_saturated_budget_uses_one_call(self):
+        await ai.generate_questions("Science", ["Physics"], 10, "easy")
+        self.assertEqual(self.calls, [10])
+
+    async def test_observes_call_latency(self):
+        chain = (
+            ai.QUESTION_GENERATOR_PROMPT
+            | FakeQuizChatModel()
+            | ItemValidatingOutputParser(pydantic_object=ai.TriviaGenerator)
+        )
+        samples = len(self.model)
+        with patch.object(ai, "QUESTION_CHAIN", chain):
+            await ai.generate_questions("Science", ["Physics"], 2, "easy")
+        self.assertEqual(len(self.model), samples + 1)
+
+    @patch.object(ai.settings, "ADAPTIVE_BATCHING_ENABLED", False)
+    async def test_can_be_disabled(self):
+        await ai.generate_questions("Science", ["Physics"], 12, "easy")
+        self.assertEqual(sorted(self.calls), [6, 6])
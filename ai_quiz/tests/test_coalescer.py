@@ -0,0 +1,46 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from ai_quiz import metrics
+from ai_quiz.coalescer import Coalescer
+
+
+class CoalescerTest(IsolatedAsyncioTestCase):
+    def setUp(self):
+        metrics.reset()
+        self.flushed = []
+        self.window = 0.05
+
+        async def flush(key, items):
+            self.flushed.append((key, items))
+
+        self.coalescer = Coalescer("test", flush, lambda: self.window)
+
+    async def test_items_in_one_window_are_flushed_together(self):
+        for i in range(5):
+            await self.coalescer.add("room", i)
+        await self.coalescer.add("other", "x")
+        self.assertEqual(self.flushed, [])
+        await self.coalescer.drain()
+        self.assertEqual(self.flushed, [("room", [0, 1, 2, 3, 4]), ("other", ["x"])])
+
+    async def test_items_after_a_flush_open_a_new_window(self):
+        await self.coalescer.add("room", 1)
+        await asyncio.sleep(0.08)
+        await self.coalescer.add("room", 2)
+        await self.coalescer.drain()
+        self.assertEqual(self.flushed, [("room", [1]), ("room", [2])])
+
+    async def test_zero_window_flushes_at_once(self):
+        self.window = 0
+        await self.coalescer.add("room", 1)
+        self.assertEqual(self.flushed, [("room", [1])])
+
+    async def test_flush_errors_are_logged(self):
+        async def fail(key, items):
+            raise ValueError("down")
+
+        coalescer = Coalescer("test", fail, lambda: 0.01)
+        await coalescer.add("room", 1)
+        with self.assertLogs("ai_quiz.coalescer", "ERROR"):
+            await coalescer.drain()
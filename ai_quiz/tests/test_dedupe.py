@@ -0,0 +1,130 @@
+import time
+from unittest.mock import AsyncMock, patch
+
+from django.test import SimpleTestCase, TestCase
+
+from ai_quiz import dedupe, question_bank
+from ai_quiz.ai import Question, TriviaGenerator
+from ai_quiz.models import Game, Question as QuestionModel, Room, Topic
+from users.models import User
+
+
+class NearDuplicateIndexTest(SimpleTestCase):
+    def setUp(self):
+        self.index = dedupe.NearDuplicateIndex(threshold=0.6)
+        self.index.add("What is the largest planet in our solar system?", "Jupiter")
+        self.index.add("In which year did World War II end?", "1945")
+
+    def test_finds_reworded_question(self):
+        self.assertEqual(
+            self.index.find(
+                "Which planet is the largest in the solar system?", "jupiter"
+            ),
+            "What is the largest planet in our solar system?",
+        )
+        self.assertIsNotNone(
+            self.index.find("World War II ended in which year?", "1945")
+        )
+
+    def test_similar_text_with_other_answer_is_new(self):
+        self.assertIsNone(
+            self.index.find(
+                "What is the smallest planet in our solar system?", "Mercury"
+            )
+        )
+        self.assertIsNone(self.index.find("In which year did World War I end?", "1918"))
+
+    def test_unrelated_question_is_new(self):
+        self.assertIsNone(self.index.find("Who painted the Mona Lisa?", "Jupiter"))
+
+    def test_add_if_new(self):
+        self.assertTrue(self.index.add_if_new("Who painted the Mona Lisa?", "Da Vinci"))
+        self.assertFalse(
+            self.index.add_if_new(
+                "The Mona Lisa was painted by which artist?", "Da Vinci"
+            )
+        )
+        self.assertEqual(len(self.index), 3)
+
+    def test_lookup_is_sub_millisecond(self):
+        for i in range(2000):
+            self.index.add(
+                f"Which emperor ruled Rome in year {i} of the empire?", str(i)
+            )
+        started = time.perf_counter()
+        for _ in range(200):
+            self.index.find(
+                "Which city hosted the first modern Olympic Games?", "Athens"
+            )
+        self.assertLess((time.perf_counter() - started) / 200, 0.001)
+
+
+class QuestionBankDedupeTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="password123"
+        )
+        self.game = Game.objects.create(
+            room=Room.objects.create(host=user), status="waiting"
+        )
+        self.topic = Topic.get_or_create_by_name("Space")
+        QuestionModel.objects.create(
+            game=self.game,
+            question="What is the largest planet in our solar system?",
+            options=["Jupiter", "Mars"],
+            correct_answer="Jupiter",
+            topic=self.topic,
+            bank_key="other",
+        )
+
+    def tearDown(self):
+        dedupe._indexes.clear()
+
+    def trivia(self, *questions):
+        return TriviaGenerator(
+            thoughts="",
+            topic="Space",
+            difficulty="easy",
+            n=len(questions),
+            questions=[
+                Question(subtopic="", question=q, answer=a, options=[a, "Mars"])
+                for q, a in questions
+            ],
+        )
+
+    @patch("ai_quiz.question_bank.ai.generate_questions", new_callable=AsyncMock)
+    async def test_rejects_and_regenerates_near_duplicates(self, mock_generate):
+        mock_generate.side_effect = [
+            self.trivia(
+                ("Which planet is the largest in the solar system?", "Jupiter"),
+                ("Which planet is known as the red planet?", "Mars"),
+            ),
+            self.trivia(("Which planet has the most prominent rings?", "Saturn")),
+        ]
+        trivia = await question_bank.generate_questions(
+            topic="Space", subtopics=["Planets"], n=2, difficulty="easy"
+        )
+        self.assertEqual(
+            [q.question for q in trivia.questions],
+            [
+                "Which planet is known as the red planet?",
+                "Which planet has the most prominent rings?",
+            ],
+        )
+        self.assertEqual(mock_generate.call_args.kwargs["n"], 1)
+
+    @patch("ai_quiz.question_bank.dedupe.load_index", wraps=dedupe.load_index)
+    @patch("ai_quiz.question_bank.ai.generate_questions", new_callable=AsyncMock)
+    async def test_index_is_loaded_once_per_topic(self, mock_generate, mock_load):
+        mock_generate.side_effect = [
+            self.trivia(("Which planet is known as the red planet?", "Mars")),
+            self.trivia(("The red planet is known as which planet?", "Mars")),
+            self.trivia(("Which planet has the most prominent rings?", "Saturn")),
+        ]
+        for _ in range(2):
+            await question_bank.generate_questions(
+                topic="Space", subtopics=["Planets"], n=1, difficulty="easy"
+            )
+        self.assertEqual(mock_load.call_count, 1)
+        # The first game's question was added in memory and caught in the second
+        self.assertEqual(mock_generate.call_count, 3)
@@ -0,0 +1,101 @@
+import time
+from unittest import IsolatedAsyncioTestCase
+
+from langchain.output_parsers import YamlOutputParser
+
+from ai_quiz import ai
+from ai_quiz.fake_llm import FakeQuizChatModel
+from ai_quiz.output_parsers import ItemValidatingOutputParser
+
+
+def question_chain(llm):
+    return (
+        ai.QUESTION_GENERATOR_PROMPT
+        | llm
+        | ItemValidatingOutputParser(pydantic_object=ai.TriviaGenerator)
+    )
+
+
+INPUTS = {
+    "topic": "Rome",
+    "subtopics": ["Emperors", "Roads"],
+    "n": 7,
+    "difficulty": "hard",
+}
+
+
+class FakeQuizChatModelTest(IsolatedAsyncioTestCase):
+    async def test_answers_question_prompt_with_n_questions(self):
+        trivia = await question_chain(FakeQuizChatModel()).ainvoke(INPUTS)
+        self.assertEqual(len(trivia.questions), 7)
+        self.assertEqual(trivia.topic, "Rome")
+        for question in trivia.questions:
+            self.assertIn(question.subtopic, ["Emperors", "Roads"])
+            self.assertIn(question.answer, question.options)
+            self.assertEqual(len(question.options), 4)
+
+    async def test_answers_topic_prompt(self):
+        chain = (
+            ai.TOPIC_GENERATOR_PROMPT
+            | FakeQuizChatModel()
+            | ItemValidatingOutputParser(pydantic_object=ai.TopicGenerator)
+        )
+        result = await chain.ainvoke({"topic": "Rome"})
+        self.assertEqual(result.topic, "Rome")
+        self.assertEqual(len(result.subtopics), 10)
+
+    async def test_answers_yaml_prompt_with_yaml(self):
+        prompt = ai._build_prompt(
+            ai.QUESTION_GENERATOR_TEMPLATE, ai.QUESTION_OUTPUT_FORMATS, "yaml"
+        )
+        chain = (
+            prompt
+            | FakeQuizChatModel()
+            | YamlOutputParser(pydantic_object=ai.TriviaGenerator)
+        )
+        trivia = await chain.ainvoke(INPUTS)
+        self.assertEqual(len(trivia.questions), 7)
+
+    async def test_same_seed_is_reproducible(self):
+        first = await question_chain(FakeQuizChatModel(seed=1)).ainvoke(INPUTS)
+        second = await question_chain(FakeQuizChatModel(seed=1)).ainvoke(INPUTS)
+        other = await question_chain(FakeQuizChatModel(seed=2)).ainvoke(INPUTS)
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+
+    async def test_repeated_calls_return_new_questions(self):
+        chain = question_chain(FakeQuizChatModel())
+        first = await chain.ainvoke(INPUTS)
+        second = await chain.ainvoke(INPUTS)
+        self.assertNotEqual(first.questions, second.questions)
+
+    async def test_streams_with_latency_and_throughput(self):
+        llm = FakeQuizChatModel(latency=0.05, tokens_per_second=2000)
+        chain = ai.QUESTION_GENERATOR_PROMPT | llm
+        started = time.perf_counter()
+        chunks = [chunk async for chunk in chain.astream(INPUTS)]
+        elapsed = time.perf_counter() - started
+        self.assertGreater(len(chunks), 1)
+        # The first token waits for the latency and every later token for 1/tps
+        self.assertGreaterEqual(elapsed, 0.05 + (len(chunks) - 1) / 2000)
+
+    async def test_offline_generate_questions_honours_n(self):
+        trivia = await ai.generate_questions("Rome", ["Emperors"], 12, "easy")
+        self.assertEqual(len(trivia.questions), 12)
+
+    async def test_offline_combined_generation(self):
+        trivia = await ai.generate_topic_and_questions("Rome", 4, "hard")
+        self.assertEqual(len(trivia.subtopics), 10)
+        self.assertEqual(len(trivia.questions), 4)
+        for question in trivia.questions:
+            self.assertIn(question.subtopic, trivia.subtopics)
+
+    async def test_combined_stream_chooses_subtopics_first(self):
+        subtopics = []
+        seen = []
+        async for question in ai.stream_topic_and_questions(
+            "Rome", 3, "easy", subtopics
+        ):
+            seen.append(len(subtopics))
+            self.assertIn(question.subtopic, subtopics)
+        self.assertEqual(seen, [10, 10, 10])
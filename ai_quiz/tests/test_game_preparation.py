@@ -0,0 +1,302 @@
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ai_quiz import game_preparation, topic_cache
+from ai_quiz.ai import Question, TopicGenerator
+from ai_quiz.models import Game, GamePreparationJob, Question as QuestionModel
+from ai_quiz.models import Room, Topic
+from users.models import User
+
+
+def make_questions(count, prefix="Q"):
+    return [
+        Question(
+            subtopic="Physics", question=f"{prefix}{i}?", answer="a", options=["a"]
+        )
+        for i in range(count)
+    ]
+
+
+# Combined subtopic and question generation is covered in CombinedGenerationTest
+@patch("ai_quiz.game_preparation.settings.COMBINED_GENERATION_ENABLED", False)
+@patch("ai_quiz.game_preparation.settings.QUESTION_STREAM_BATCH_SIZE", 2)
+@patch("ai_quiz.game_preparation.send_room_event", new_callable=AsyncMock)
+@patch("ai_quiz.game_preparation.generate_subtopics", new_callable=AsyncMock)
+@patch("ai_quiz.game_preparation.stream_questions")
+class GamePreparationJobTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="password123"
+        )
+        self.room = Room.objects.create(host=self.user)
+        self.game = Game.objects.create(room=self.room, status="waiting")
+        self.job = GamePreparationJob.objects.create(
+            game=self.game, topic="Science", n=5, difficulty="easy", attempts=1
+        )
+
+    def _stream(self, mock_stream, questions):
+        async def fake_stream(**kwargs):
+            for question in questions[: kwargs["n"]]:
+                yield question
+
+        mock_stream.side_effect = fake_stream
+
+    def _event_types(self, mock_send):
+        return [call.args[1] for call in mock_send.call_args_list]
+
+    async def test_run_job_reports_progress(
+        self, mock_stream, mock_subtopics, mock_send
+    ):
+        mock_subtopics.return_value = TopicGenerator(
+            thoughts="", topic="Science", subtopics=["Physics"]
+        )
+        self._stream(mock_stream, make_questions(5))
+
+        await game_preparation.run_job(self.job.pk)
+
+        await self.job.arefresh_from_db()
+        self.assertEqual(self.job.status, "ready")
+        self.assertEqual(self.job.subtopics, ["Physics"])
+        self.assertEqual(await self.game.questions.acount(), 5)
+        self.assertEqual(
+            self._event_types(mock_send),
+            [
+                "subtopics_ready",
+                "questions_progress",
+                "questions_progress",
+                "questions_progress",
+                "game_ready",
+            ],
+        )
+        progress = [
+            call.args[2]["ready"]
+            for call in mock_send.call_args_list
+            if call.args[1] == "questions_progress"
+        ]
+        self.assertEqual(progress, [1, 3, 5])
+
+    async def test_run_job_marks_failure(self, mock_stream, mock_subtopics, mock_send):
+        mock_subtopics.side_effect = RuntimeError("LLM unavailable")
+
+        await game_preparation.run_job(self.job.pk)
+
+        await self.job.arefresh_from_db()
+        self.assertEqual(self.job.status, "failed")
+        self.assertEqual(self.job.error, "LLM unavailable")
+        self.assertEqual(self._event_types(mock_send), ["game_preparation_failed"])
+
+    async def test_broken_stream_keeps_the_questions_received(
+        self, mock_stream, mock_subtopics, mock_send
+    ):
+        mock_subtopics.return_value = TopicGenerator(
+            thoughts="", topic="Science", subtopics=["Physics"]
+        )
+
+        async def broken_stream(**kwargs):
+            for question in make_questions(4):
+                yield question
+            raise RuntimeError("connection reset")
+
+        mock_stream.side_effect = broken_stream
+
+        await game_preparation.run_job(self.job.pk)
+
+        await self.job.arefresh_from_db()
+        self.assertEqual((self.job.status, self.job.questions_ready), ("ready", 4))
+        self.assertEqual(await self.game.questions.acount(), 4)
+        self.assertEqual(self._event_types(mock_send)[-1], "game_ready")
+        self.assertNotIn("game_preparation_failed", self._event_types(mock_send))
+
+    async def test_stale_job_resumes_where_it_stopped(
+        self, mock_stream, mock_subtopics, mock_send
+    ):
+        self.job.subtopics = ["Physics"]
+        self.job.heartbeat_at = timezone.now() - timedelta(minutes=10)
+        await self.job.asave()
+        await QuestionModel.objects.acreate(
+            game=self.game, question="Q0?", options=["a"], correct_answer="a"
+        )
+        self._stream(mock_stream, make_questions(5, prefix="New"))
+
+        tasks = await game_preparation.resume_stale_jobs(self.room.room_code)
+        for task in tasks:
+            await task
+
+        self.assertEqual(len(tasks), 1)
+        self.assertEqual(mock_stream.call_args.kwargs["n"], 4)
+        mock_subtopics.assert_not_called()
+        await self.job.arefresh_from_db()
+        self.assertEqual(self.job.status, "ready")
+        self.assertEqual(self.job.attempts, 2)
+        self.assertEqual(await self.game.questions.acount(), 5)
+
+    def test_running_job_is_not_claimed(self, mock_stream, mock_subtopics, mock_send):
+        self.assertEqual(game_preparation.claim_stale_jobs(), [])
+
+    def test_job_fails_after_max_attempts(self, mock_stream, mock_subtopics, mock_send):
+        GamePreparationJob.objects.filter(pk=self.job.pk).update(
+            attempts=3, heartbeat_at=timezone.now() - timedelta(minutes=10)
+        )
+        self.assertEqual(game_preparation.claim_stale_jobs(), [])
+        updated_at = self.job.updated_at
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, "failed")
+        self.assertGreater(self.job.updated_at, updated_at)
+        mock_send.assert_awaited_once_with(
+            self.room.room_code,
+            "game_preparation_failed",
+            {"gameId": str(self.game.id), "error": self.job.error},
+        )
+        # Already failed jobs are not announced again
+        game_preparation.claim_stale_jobs()
+        self.assertEqual(mock_send.await_count, 1)
+
+
+@patch("ai_quiz.game_preparation.send_room_event", new_callable=AsyncMock)
+@patch("ai_quiz.game_preparation.generate_subtopics", new_callable=AsyncMock)
+@patch("ai_quiz.game_preparation.stream_questions")
+class CombinedGenerationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="password123"
+        )
+        self.room = Room.objects.create(host=self.user)
+        self.game = Game.objects.create(room=self.room, status="waiting")
+        self.job = GamePreparationJob.objects.create(
+            game=self.game, topic="Optics", n=3, difficulty="easy", attempts=1
+        )
+        topic_cache.invalidate("Optics")
+
+    async def test_subtopics_come_with_the_first_questions(
+        self, mock_stream, mock_subtopics, mock_send
+    ):
+        async def combined_stream(**kwargs):
+            kwargs["subtopics"].extend(["Lenses", "Mirrors"])
+            for question in make_questions(kwargs["n"]):
+                yield question
+
+        mock_stream.side_effect = combined_stream
+
+        await game_preparation.run_job(self.job.pk)
+
+        mock_subtopics.assert_not_called()
+        await self.job.arefresh_from_db()
+        self.assertEqual(self.job.status, "ready")
+        self.assertEqual(self.job.subtopics, ["Lenses", "Mirrors"])
+        topic = await Topic.objects.aget(normalized_name="optics")
+        self.assertEqual(topic.subtopics, ["Lenses", "Mirrors"])
+        events = [call.args[1] for call in mock_send.call_args_list]
+        self.assertEqual(events[0], "subtopics_ready")
+        self.assertEqual(
+            mock_send.call_args_list[0].args[2]["subtopics"], ["Lenses", "Mirrors"]
+        )
+
+    async def test_cached_subtopics_are_used(
+        self, mock_stream, mock_subtopics, mock_send
+    ):
+        await Topic.objects.acreate(
+            name="Optics", normalized_name="optics", subtopics=["Prisms"]
+        )
+
+        async def stream(**kwargs):
+            for question in make_questions(kwargs["n"]):
+                yield question
+
+        mock_stream.side_effect = stream
+
+        await game_preparation.run_job(self.job.pk)
+
+        mock_subtopics.assert_not_called()
+        self.assertEqual(mock_stream.call_args.kwargs["subtopics"], ["Prisms"])
+        await self.job.arefresh_from_db()
+        self.assertEqual(self.job.subtopics, ["Prisms"])
+
+    @patch("ai_quiz.game_preparation.settings.QUESTION_SHARD_SIZE", 2)
+    async def test_large_games_generate_subtopics_first(
+        self, mock_stream, mock_subtopics, mock_send
+    ):
+        mock_subtopics.return_value = TopicGenerator(
+            thoughts="", topic="Optics", subtopics=["Lenses"]
+        )
+
+        async def stream(**kwargs):
+            for question in make_questions(kwargs["n"]):
+                yield question
+
+        mock_stream.side_effect = stream
+
+        await game_preparation.run_job(self.job.pk)
+
+        mock_subtopics.assert_awaited_once()
+        self.assertEqual(mock_stream.call_args.kwargs["subtopics"], ["Lenses"])
+
+
+class CreateGameViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="password123"
+        )
+        self.room = Room.objects.create(host=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    @patch("ai_quiz.views.games.start_job")
+    def test_returns_immediately_with_preparing_status(self, mock_start_job):
+        response = self.client.post(
+            reverse("create_game"),
+            {
+                "roomCode": self.room.room_code,
+                "topic": "Science",
+                "subtopics": [],
+                "n": 5,
+                "difficulty": "easy",
+                "timePerQuestion": 30,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["status"], "preparing")
+        job = GamePreparationJob.objects.get(game_id=response.data["gameId"])
+        self.assertEqual(job.n, 5)
+        mock_start_job.assert_called_once_with(job.pk)
+
+    @patch("ai_quiz.views.games.start_job")
+    def test_host_subtopics_are_used(self, mock_start_job):
+        response = self.client.post(
+            reverse("create_game"),
+            {
+                "roomCode": self.room.room_code,
+                "topic": "Science",
+                "subtopics": ["Physics", " physics ", "Chemistry"],
+                "n": 5,
+                "difficulty": "easy",
+                "timePerQuestion": 30,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        job = GamePreparationJob.objects.get(game_id=response.data["gameId"])
+        self.assertEqual(job.subtopics, ["Physics", "Chemistry"])
+
+    @patch("ai_quiz.views.games.start_job")
+    def test_subtopics_are_optional(self, mock_start_job):
+        response = self.client.post(
+            reverse("create_game"),
+            {
+                "roomCode": self.room.room_code,
+                "topic": "Science",
+                "n": 5,
+                "difficulty": "easy",
+                "timePerQuestion": 30,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        job = GamePreparationJob.objects.get(game_id=response.data["gameId"])
+        self.assertEqual(job.subtopics, [])
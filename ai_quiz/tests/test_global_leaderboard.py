@@ -0,0 +1,186 @@
+import asyncio
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ai_quiz import leaderboard
+from ai_quiz.leaderboard import global_board
+from ai_quiz.models import (
+    Game,
+    GlobalLeaderboardEntry,
+    Leaderboard,
+    Participant,
+    Question,
+    Room,
+    Topic,
+)
+from users.models import GuestUser, User
+
+ENDED_AT = datetime(2026, 10, 14, 12, tzinfo=dt_timezone.utc)
+
+
+def result(score, correct=0, wrong=0):
+    return {"score": score, "correct_answers": correct, "wrong_answers": wrong}
+
+
+class GlobalLeaderboardTestCase(TestCase):
+    def setUp(self):
+        self.users = {
+            name: User.objects.create_user(
+                username=name, email=f"{name}@example.com", password="password123"
+            )
+            for name in ("alice", "bob", "carol")
+        }
+        self.topic = Topic.objects.create(name="Space", normalized_name="space")
+
+    def _game(self, data: dict, topic=None, ended_at=ENDED_AT) -> Game:
+        room = Room.objects.create(host=self.users["alice"])
+        for name in data:
+            if name in self.users:
+                Participant.objects.create(room=room, user=self.users[name])
+            else:
+                guest = GuestUser.objects.create(username=name, room=room)
+                Participant.objects.create(room=room, guest_user=guest)
+        game = Game.objects.create(room=room, status="finished", ended_at=ended_at)
+        Question.objects.create(
+            game=game,
+            question="Q?",
+            options=["a", "b"],
+            correct_answer="a",
+            topic=topic,
+        )
+        Leaderboard.objects.create(game=game, data=data)
+        return game
+
+    def _scores(self, scope="all", period="all") -> dict:
+        return {
+            entry.user.username: entry.score
+            for entry in global_board.top(scope, period, limit=100)
+        }
+
+
+class RecordGameTest(GlobalLeaderboardTestCase):
+    def test_adds_registered_players_to_every_board_of_the_game(self):
+        game = self._game(
+            {"alice": result(90, correct=1), "bob": result(40), "guest": result(500)},
+            topic=self.topic,
+        )
+        self.assertTrue(global_board.record_game(game, game.leaderboard.data))
+
+        boards = set(
+            GlobalLeaderboardEntry.objects.values_list("scope", "period").distinct()
+        )
+        topic = f"topic:{self.topic.id}"
+        self.assertEqual(
+            boards,
+            {
+                (scope, period)
+                for scope in ("all", topic)
+                for period in ("all", "week:2026-W42", "month:2026-10")
+            },
+        )
+        self.assertEqual(self._scores(topic, "week:2026-W42"), {"alice": 90, "bob": 40})
+        alice = GlobalLeaderboardEntry.objects.get(
+            scope="all", period="all", user=self.users["alice"]
+        )
+        self.assertEqual((alice.games_played, alice.correct_answers), (1, 1))
+
+    def test_counts_each_game_once(self):
+        game = self._game({"alice": result(90)})
+        self.assertTrue(global_board.record_game(game, game.leaderboard.data))
+        self.assertFalse(global_board.record_game(game, game.leaderboard.data))
+        self.assertEqual(self._scores(), {"alice": 90})
+
+    def test_totals_add_up_across_games_and_windows(self):
+        first = self._game({"alice": result(90), "bob": result(40)}, topic=self.topic)
+        later = datetime(2026, 11, 2, tzinfo=dt_timezone.utc)
+        second = self._game({"bob": result(70), "carol": result(10)}, ended_at=later)
+        for game in (first, second):
+            global_board.record_game(game, game.leaderboard.data)
+
+        self.assertEqual(self._scores(), {"bob": 110, "alice": 90, "carol": 10})
+        self.assertEqual(self._scores(period="month:2026-10"), {"alice": 90, "bob": 40})
+        self.assertEqual(self._scores(period="month:2026-11"), {"bob": 70, "carol": 10})
+        self.assertEqual(
+            self._scores(f"topic:{self.topic.id}"), {"alice": 90, "bob": 40}
+        )
+
+    def test_queries_do_not_grow_with_players(self):
+        small = self._game({"alice": result(1)}, topic=self.topic)
+        large = self._game({name: result(1) for name in self.users}, topic=self.topic)
+        with CaptureQueriesContext(connection) as small_queries:
+            global_board.record_game(small, small.leaderboard.data)
+        with self.assertNumQueries(len(small_queries)):
+            global_board.record_game(large, large.leaderboard.data)
+
+    def test_rank_of_breaks_ties_like_top(self):
+        game = self._game({"alice": result(50), "bob": result(90), "carol": result(50)})
+        global_board.record_game(game, game.leaderboard.data)
+        tied = sorted(["alice", "carol"], key=lambda name: self.users[name].id)
+        self.assertEqual(list(self._scores()), ["bob", *tied])
+        for rank, name in enumerate(["bob", *tied], start=1):
+            entry, found = global_board.rank_of(self.users[name].id)
+            self.assertEqual((entry.user_id, found), (self.users[name].id, rank))
+        self.assertEqual(
+            global_board.rank_of(self.users["alice"].id, period="month:2020-01"),
+            (None, None),
+        )
+
+    def test_ending_a_game_adds_it(self):
+        game = self._game({"alice": result(90)})
+        game.status = "in_progress"
+        self.addCleanup(asyncio.run, leaderboard.get_engine().clear(game.id))
+        game.end_game()
+        entry, rank = global_board.rank_of(self.users["alice"].id)
+        self.assertEqual((entry.score, entry.games_played, rank), (90, 1, 1))
+
+    def test_backfill_adds_finished_games_not_counted(self):
+        counted = self._game({"alice": result(90)})
+        global_board.record_game(counted, counted.leaderboard.data)
+        self._game({"alice": result(10), "bob": result(20)})
+        call_command("aggregate_global_leaderboards", stdout=open("/dev/null", "w"))
+        self.assertEqual(self._scores(), {"alice": 100, "bob": 20})
+
+
+class GlobalLeaderboardViewTest(GlobalLeaderboardTestCase):
+    def setUp(self):
+        super().setUp()
+        for data, topic in [
+            ({"alice": result(90), "bob": result(40)}, self.topic),
+            ({"bob": result(70), "carol": result(10)}, None),
+        ]:
+            game = self._game(data, topic=topic, ended_at=None)
+            global_board.record_game(game, game.leaderboard.data)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.users["carol"])
+
+    def test_returns_top_players_and_own_rank(self):
+        response = self.client.get(reverse("global_leaderboard"), {"limit": 2})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(
+            [(e["rank"], e["username"], e["score"]) for e in body["entries"]],
+            [(1, "bob", 110), (2, "alice", 90)],
+        )
+        self.assertEqual(body["entries"][0]["gamesPlayed"], 2)
+        self.assertEqual((body["me"]["rank"], body["me"]["score"]), (3, 10))
+
+    def test_filters_by_topic_and_window(self):
+        response = self.client.get(
+            reverse("global_leaderboard"), {"topic": " SPACE ", "window": "week"}
+        )
+        body = response.json()
+        self.assertEqual(body["scope"], f"topic:{self.topic.id}")
+        self.assertTrue(body["period"].startswith("week:"))
+        self.assertEqual([e["username"] for e in body["entries"]], ["alice", "bob"])
+        self.assertIsNone(body["me"])
+
+    def test_rejects_unknown_filters(self):
+        url = reverse("global_leaderboard")
+        self.assertEqual(self.client.get(url, {"window": "year"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"topic": "History"}).status_code, 404)
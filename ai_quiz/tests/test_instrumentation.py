@@ -0,0 +1,146 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from langchain_core.language_models import FakeListChatModel
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ai_quiz import ai, metrics
+from ai_quiz.fake_llm import FakeQuizChatModel
+from ai_quiz.instrumentation import trace_llm_call
+from ai_quiz.models import LLMCallRecord
+from ai_quiz.output_parsers import ItemValidatingOutputParser
+from users.models import User
+
+INPUTS = {"topic": "Rome", "subtopics": ["Emperors"], "n": 3, "difficulty": "easy"}
+
+
+def question_chain(llm):
+    return (
+        ai.QUESTION_GENERATOR_PROMPT
+        | llm
+        | ItemValidatingOutputParser(pydantic_object=ai.TriviaGenerator)
+    )
+
+
+class InstrumentationTest(TestCase):
+    def setUp(self):
+        metrics.reset()
+
+    async def test_records_timings_and_tokens(self):
+        llm = FakeQuizChatModel()
+        async with trace_llm_call("question", llm.model_name, "easy") as recorder:
+            await question_chain(llm).ainvoke(INPUTS, config={"callbacks": [recorder]})
+        self.assertGreater(recorder.prompt_tokens, 0)
+        self.assertGreater(recorder.completion_tokens, 0)
+        self.assertIsNotNone(recorder.latency)
+        self.assertEqual(recorder.time_to_first_token, recorder.latency)
+        tags = {"chain": "question", "model": "fake-quiz", "difficulty": "easy"}
+        self.assertEqual(
+            metrics.get_counter("llm_chain_calls", outcome="success", **tags), 1
+        )
+        self.assertEqual(
+            metrics.get_counter("llm_completion_tokens", **tags),
+            recorder.completion_tokens,
+        )
+        record = await LLMCallRecord.objects.aget()
+        self.assertEqual(record.outcome, "success")
+        self.assertEqual(record.prompt_tokens, recorder.prompt_tokens)
+
+    async def test_streaming_records_time_to_first_token(self):
+        llm = FakeQuizChatModel()
+        async with trace_llm_call("question_stream", llm.model_name) as recorder:
+            async for _ in (ai.QUESTION_GENERATOR_PROMPT | llm).astream(
+                INPUTS, config={"callbacks": [recorder]}
+            ):
+                pass
+        self.assertIsNotNone(recorder.first_token_at)
+        self.assertLessEqual(recorder.time_to_first_token, recorder.latency)
+        self.assertGreater(recorder.completion_tokens, 0)
+
+    async def test_counts_parse_failures(self):
+        llm = FakeListChatModel(responses=["not: [valid"])
+        with self.assertRaises(Exception):
+            async with trace_llm_call("question", "fake", "easy") as recorder:
+                await question_chain(llm).ainvoke(
+                    INPUTS, config={"callbacks": [recorder]}
+                )
+        self.assertEqual(recorder.outcome, "error")
+        tags = {"chain": "question", "model": "fake", "difficulty": "easy"}
+        self.assertEqual(metrics.get_counter("llm_parse_failures", **tags), 1)
+        record = await LLMCallRecord.objects.aget()
+        self.assertEqual(record.parse_failures, 1)
+
+    @patch("ai_quiz.instrumentation.settings.LLM_METRICS_PERSIST", False)
+    async def test_persistence_can_be_disabled(self):
+        async with trace_llm_call("topic", "fake"):
+            pass
+        self.assertFalse(await LLMCallRecord.objects.aexists())
+        self.assertEqual(
+            metrics.get_counter(
+                "llm_chain_calls",
+                outcome="success",
+                chain="topic",
+                model="fake",
+                difficulty="",
+            ),
+            1,
+        )
+
+    def test_metrics_endpoint_requires_admin(self):
+        metrics.observe("llm_latency_seconds", 1.5, chain="topic")
+        client = APIClient()
+        user = User.objects.create_user(
+            username="player", email="player@example.com", password="password123"
+        )
+        client.force_authenticate(user=user)
+        response = client.get(reverse("llm_metrics"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        user.is_staff = True
+        user.save()
+        response = client.get(reverse("llm_metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        histogram = response.data["histograms"][0]
+        self.assertEqual(histogram["name"], "llm_latency_seconds")
+        self.assertEqual(histogram["p95"], 1.5)
+
+    def test_report_command(self):
+        for latency in (1.0, 2.0):
+            LLMCallRecord.objects.create(
+                chain="question",
+                model="gpt-4o",
+                difficulty="hard",
+                outcome="success",
+                queue_wait=0.1,
+                time_to_first_token=0.5,
+                latency=latency,
+                prompt_tokens=100,
+                completion_tokens=400,
+            )
+        out = StringIO()
+        call_command("llm_metrics_report", stdout=out)
+        line = out.getvalue().splitlines()[1]
+        self.assertIn("question", line)
+        self.assertIn("0.50/0.50", line)
+        self.assertIn("100/400", line)
+
+    def test_prune_command_deletes_records_past_retention(self):
+        records = [
+            LLMCallRecord.objects.create(
+                chain="question", model="gpt-4o", outcome="success", queue_wait=0
+            )
+            for _ in range(2)
+        ]
+        LLMCallRecord.objects.filter(pk=records[0].pk).update(
+            created_at=timezone.now() - timedelta(days=31)
+        )
+        call_command("prune_llm_call_records", stdout=StringIO())
+        self.assertEqual(
+            list(LLMCallRecord.objects.values_list("pk", flat=True)), [records[1].pk]
+        )
@@ -0,0 +1,673 @@
+import asyncio
+import importlib
+import os
+import random
+import unittest
+import uuid
+from datetime import timedelta
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, call, patch
+
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ai_quiz import leaderboard
+from ai_quiz.consumers.event_handlers.leaderboard_update import (
+    LeaderboardUpdateEventHandler,
+)
+from ai_quiz.consumers.event_handlers.next_question import NextQuestionEventHandler
+from ai_quiz.consumers.event_handlers.question_answered import (
+    ANSWER_UPDATES,
+    QuestionAnsweredEventHandler,
+)
+from ai_quiz.leaderboard import (
+    AnswerResult,
+    GameNotLoaded,
+    InMemoryLeaderboardEngine,
+    Snapshot,
+    bitset,
+    protocol,
+    store,
+    timeline,
+)
+from ai_quiz.management.commands.benchmark_leaderboard import (
+    benchmark,
+    benchmark_answered_encoding,
+    benchmark_completion,
+)
+from ai_quiz.models import (
+    Answer,
+    Game,
+    Leaderboard,
+    LeaderboardFrame,
+    Question,
+    Room,
+)
+from users.models import User
+
+LEGACY_DATA = {
+    "alice": {"avatarStyle": "pixel", "avatarSeed": "a", "score": 0},
+    "bob": {
+        "avatarStyle": "pixel",
+        "avatarSeed": "b",
+        "score": 40,
+        "correct_answers": 1,
+        "answered": bitset.encode(1 << 12),
+    },
+}
+
+
+class EngineContract:
+    """Tests every `LeaderboardEngine` must pass."""
+
+    def make_engine(self):
+        raise NotImplementedError
+
+    async def asyncSetUp(self):
+        self.engine = self.make_engine()
+        self.game_id = uuid.uuid4()
+        self.addAsyncCleanup(self.engine.clear, self.game_id)
+
+    async def test_seeds_from_persisted_data_once(self):
+        self.assertTrue(await self.engine.load(self.game_id, LEGACY_DATA, 3))
+        self.assertFalse(await self.engine.load(self.game_id, {}, 0))
+        snapshot = await self.engine.snapshot(self.game_id)
+        self.assertEqual(snapshot.version, 3)
+        self.assertEqual(list(snapshot.data), ["bob", "alice"])
+        self.assertEqual(
+            snapshot.data["bob"],
+            {
+                "avatarStyle": "pixel",
+                "avatarSeed": "b",
+                "score": 40,
+                "correct_answers": 1,
+                "wrong_answers": 0,
+                "skipped_questions": 0,
+                "answered": bitset.encode(1 << 12),
+                "rank": 1,
+            },
+        )
+
+    async def test_replays_answers_missing_from_persisted_data(self):
+        answers = [
+            ("bob", 12, "correct", 50),
+            ("alice", 7, "correct", 60),
+            ("carol", 7, "wrong", 0),
+        ]
+        self.assertTrue(await self.engine.load(self.game_id, LEGACY_DATA, 1, answers))
+        snapshot = await self.engine.snapshot(self.game_id)
+        self.assertEqual(snapshot.version, 3)
+        self.assertEqual(list(snapshot.data), ["alice", "bob", "carol"])
+        self.assertEqual(snapshot.data["bob"]["score"], 40)
+        self.assertEqual(snapshot.data["carol"]["wrong_answers"], 1)
+        result = await self.engine.record_answer(self.game_id, "bob", 7, "wrong", 0)
+        self.assertTrue(result.all_answered)
+
+    async def test_records_answers_and_ranks(self):
+        await self.engine.load(self.game_id, LEGACY_DATA)
+        result = await self.engine.record_answer(
+            self.game_id, "alice", 2, "correct", 90
+        )
+        self.assertEqual((result.old_rank, result.rank, result.version), (2, 1, 1))
+        self.assertEqual(result.entry["score"], 90)
+        self.assertEqual(result.entry["avatarSeed"], "a")
+        self.assertEqual(result.entry["answered"], "20")
+        await self.engine.record_answer(self.game_id, "alice", 3, "wrong", 0)
+        snapshot = await self.engine.snapshot(self.game_id)
+        self.assertEqual(list(snapshot.data), ["alice", "bob"])
+        self.assertEqual(snapshot.data["alice"]["wrong_answers"], 1)
+        self.assertEqual(snapshot.data["bob"]["rank"], 2)
+        self.assertEqual(snapshot.version, 2)
+
+    async def test_counts_each_question_once(self):
+        await self.engine.load(self.game_id, LEGACY_DATA)
+        self.assertIsNone(
+            await self.engine.record_answer(self.game_id, "bob", 12, "correct", 50)
+        )
+        snapshot = await self.engine.snapshot(self.game_id)
+        self.assertEqual(snapshot.data["bob"]["score"], 40)
+        self.assertEqual(snapshot.version, 0)
+
+    async def test_adds_unknown_players(self):
+        await self.engine.load(self.game_id, {})
+        result = await self.engine.record_answer(self.game_id, "carol", 1, "skipped", 0)
+        self.assertIsNone(result.old_rank)
+        self.assertEqual(result.entry["skipped_questions"], 1)
+
+    async def test_concurrent_answers_are_not_lost(self):
+        await self.engine.load(self.game_id, {})
+        players = [f"player{i}" for i in range(20)]
+        await asyncio.gather(
+            *(
+                self.engine.record_answer(self.game_id, player, q, "correct", 10)
+                for player in players
+                for q in range(5)
+            )
+        )
+        snapshot = await self.engine.snapshot(self.game_id)
+        self.assertEqual(snapshot.version, 100)
+        self.assertTrue(all(e["score"] == 50 for e in snapshot.data.values()))
+        self.assertEqual(
+            sorted(e["rank"] for e in snapshot.data.values()), list(range(1, 21))
+        )
+
+    async def test_counts_answers_per_question(self):
+        await self.engine.load(self.game_id, LEGACY_DATA)
+        first = await self.engine.record_answer(self.game_id, "alice", 12, "wrong", 0)
+        self.assertEqual((first.question_answers, first.players), (2, 2))
+        self.assertTrue(first.all_answered)
+        second = await self.engine.record_answer(self.game_id, "bob", 5, "wrong", 0)
+        self.assertEqual((second.question_answers, second.players), (1, 2))
+        self.assertFalse(second.all_answered)
+
+    async def test_requires_loading(self):
+        with self.assertRaises(GameNotLoaded):
+            await self.engine.snapshot(self.game_id)
+        with self.assertRaises(GameNotLoaded):
+            await self.engine.record_answer(self.game_id, "alice", 1, "correct", 1)
+
+
+class InMemoryEngineTest(EngineContract, IsolatedAsyncioTestCase):
+    def make_engine(self):
+        return InMemoryLeaderboardEngine()
+
+
+@unittest.skipUnless(
+    os.environ.get("LEADERBOARD_TEST_REDIS_URL"),
+    "Set LEADERBOARD_TEST_REDIS_URL to test against Redis",
+)
+class RedisEngineTest(EngineContract, IsolatedAsyncioTestCase):
+    def make_engine(self):
+        from ai_quiz.leaderboard.redis_engine import RedisLeaderboardEngine
+
+        return RedisLeaderboardEngine(os.environ["LEADERBOARD_TEST_REDIS_URL"])
+
+
+class ScoreAnswerTest(unittest.TestCase):
+    def setUp(self):
+        self.question = Question(
+            correct_answer="a", time_per_question=10, updated_at=timezone.now()
+        )
+        self.asked_at = self.question.updated_at.timestamp() * 1000
+
+    def test_scores_by_response_time(self):
+        # 75.5 points, clear of float error truncating 75 to 74
+        self.assertEqual(
+            leaderboard.score_answer(self.question, "a", self.asked_at + 2450),
+            ("correct", 75),
+        )
+        self.assertEqual(
+            leaderboard.score_answer(self.question, "a", self.asked_at + 20000),
+            ("correct", 0),
+        )
+
+    def test_wrong_and_skipped_answers_score_nothing(self):
+        self.assertEqual(
+            leaderboard.score_answer(self.question, "b", self.asked_at), ("wrong", 0)
+        )
+        self.assertEqual(
+            leaderboard.score_answer(self.question, None, self.asked_at),
+            ("skipped", 0),
+        )
+
+
+class BitsetTest(unittest.TestCase):
+    def test_encodes_in_redis_bitmap_order(self):
+        self.assertEqual(bitset.encode(0), "")
+        self.assertEqual(bitset.encode(1), "80")
+        self.assertEqual(bitset.encode(bitset.from_ordinals([1, 9])), "4040")
+
+    def test_round_trips(self):
+        mask = bitset.from_ordinals([0, 3, 70])
+        self.assertEqual(bitset.decode(bitset.encode(mask)), mask)
+        self.assertEqual(list(bitset.ordinals(mask)), [0, 3, 70])
+        self.assertEqual(bitset.decode(None), 0)
+
+    def test_is_smaller_and_faster_to_serialize_than_id_lists(self):
+        results = benchmark_answered_encoding(players=10, questions=10, rounds=20)
+        self.assertLess(results["bitset"]["bytes"], results["id list"]["bytes"])
+        self.assertLess(results["bitset"]["seconds"], results["id list"]["seconds"])
+
+
+class TimelineFoldTest(unittest.TestCase):
+    def test_frames_fold_into_standings(self):
+        frames = [
+            {"alice": [90, 1], "bob": [40, 2]},
+            {"bob": [100, 1], "alice": [0, 2]},
+        ]
+        self.assertEqual(timeline.fold(frames), {"alice": [90, 2], "bob": [140, 1]})
+
+    def test_deltas_leave_out_unchanged_players(self):
+        standings = {"alice": [90, 1], "bob": [40, 2]}
+        data = {
+            "alice": {"score": 150, "rank": 1},
+            "bob": {"score": 40, "rank": 2},
+            "carol": {"score": 0, "rank": 3},
+        }
+        deltas = timeline.frame_deltas(standings, data)
+        self.assertEqual(deltas, {"alice": [60, 1], "carol": [0, 3]})
+        self.assertEqual(
+            timeline.fold([deltas], standings),
+            {"alice": [150, 1], "bob": [40, 2], "carol": [0, 3]},
+        )
+
+
+def answer_result(username, version, score, old_rank, rank):
+    return AnswerResult(
+        username=username,
+        version=version,
+        entry={"score": score, "answered": "40", "rank": rank},
+        old_rank=old_rank,
+        rank=rank,
+    )
+
+
+class ProtocolTest(unittest.TestCase):
+    def test_delta_carries_changed_entries_and_moves(self):
+        message = protocol.delta_message(
+            [
+                answer_result("alice", 4, 50, 3, 1),
+                answer_result("bob", 5, 20, 2, 2),
+                answer_result("alice", 6, 90, 1, 1),
+            ]
+        )
+        self.assertEqual(message["type"], "leaderboard_delta")
+        self.assertEqual((message["prevSeq"], message["seq"]), (3, 6))
+        self.assertEqual(
+            message["payload"]["entries"],
+            [
+                {"username": "alice", "score": 90, "rank": 1, "seq": 6},
+                {"username": "bob", "score": 20, "rank": 2, "seq": 5},
+            ],
+        )
+        self.assertEqual(
+            message["payload"]["moves"],
+            [{"username": "alice", "seq": 4, "from": 3, "to": 1}],
+        )
+
+    def test_coalesced_deltas_applied_in_order_rebuild_the_ranks(self):
+        async def play():
+            engine = InMemoryLeaderboardEngine()
+            names = [f"player{i}" for i in range(6)]
+            await engine.load("game", {name: {} for name in names})
+            snapshot = await engine.snapshot("game")
+            ranks = {username: e["rank"] for username, e in snapshot.data.items()}
+            rng = random.Random(0)
+            results = [
+                await engine.record_answer(
+                    "game", name, question, "correct", rng.randint(1, 100)
+                )
+                for question in range(3)
+                for name in rng.sample(names, len(names))
+            ]
+            for i in range(0, len(results), 4):
+                payload = protocol.delta_message(results[i : i + 4])["payload"]
+                # The move of an answer goes before its entry
+                changes = sorted(
+                    [(move["seq"], 0, move) for move in payload["moves"]]
+                    + [(entry["seq"], 1, entry) for entry in payload["entries"]],
+                    key=lambda change: change[:2],
+                )
+                for _, _, change in changes:
+                    if "rank" in change:
+                        ranks[change["username"]] = change["rank"]
+                        continue
+                    below = change["from"] or len(ranks) + 1
+                    for username, rank in ranks.items():
+                        if change["to"] <= rank < below:
+                            ranks[username] = rank + 1
+                    ranks[change["username"]] = change["to"]
+            snapshot = await engine.snapshot("game")
+            return ranks, {username: e["rank"] for username, e in snapshot.data.items()}
+
+        ranks, expected = asyncio.run(play())
+        self.assertEqual(ranks, expected)
+
+    def test_snapshot_leaves_out_answered_questions(self):
+        snapshot = Snapshot(version=7, data={"alice": {"score": 5, "answered": "40"}})
+        self.assertEqual(
+            protocol.snapshot_message(snapshot),
+            {
+                "type": "leaderboard_update",
+                "seq": 7,
+                "payload": [{"username": "alice", "score": 5}],
+            },
+        )
+
+    def test_deltas_send_fewer_bytes_than_snapshots(self):
+        results = benchmark(players=10, questions=3)
+        self.assertLess(results["delta"], results["full"])
+        self.assertLess(results["full"], results["full (legacy)"])
+
+    def test_counters_detect_completion_faster_than_scans(self):
+        results = benchmark_completion(players=50, questions=2)
+        self.assertLess(results["counter"], results["scan"])
+
+
+COALESCE_WINDOW = (
+    "ai_quiz.consumers.event_handlers.question_answered.settings"
+    ".LEADERBOARD_COALESCE_WINDOW"
+)
+
+
+class LeaderboardGameTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="host", email="host@example.com", password="password123"
+        )
+        self.room = Room.objects.create(host=self.user)
+        self.game = Game.objects.create(room=self.room, status="in_progress")
+        Leaderboard.objects.create(game=self.game, data=LEGACY_DATA)
+        self.questions = [
+            Question.objects.create(
+                game=self.game,
+                question=f"Q{i}?",
+                options=["a", "b"],
+                correct_answer="a",
+                time_per_question=10,
+            )
+            for i in range(5)
+        ]
+        self.handler = QuestionAnsweredEventHandler()
+        self.addCleanup(asyncio.run, leaderboard.get_engine().clear(self.game.id))
+
+    def _consumer(self, username):
+        consumer = AsyncMock()
+        consumer.username = username
+        return consumer
+
+    async def _answer(self, username, question, answer="a"):
+        # Worth 90.5 points, clear of float error truncating 90 to 89
+        answered_at = question.updated_at + timedelta(milliseconds=950)
+        timestamp = answered_at.timestamp() * 1000
+        return await self.handler._handle_leaderboard_update(
+            question_id=str(question.id),
+            answer=answer,
+            consumer=self._consumer(username),
+            current_question=question,
+            game=self.game,
+            timestamp=timestamp,
+        )
+
+
+@patch(COALESCE_WINDOW, 0)
+class QuestionAnsweredLeaderboardTest(LeaderboardGameTestCase):
+    async def test_concurrent_answers_are_all_persisted(self):
+        players = [f"player{i}" for i in range(10)]
+        await asyncio.gather(
+            *(self._answer(p, q) for p in players for q in self.questions)
+        )
+        await leaderboard.checkpoint(self.game.id)
+        row = await Leaderboard.objects.aget(game=self.game)
+        self.assertEqual(row.version, 50)
+        for player in players:
+            self.assertEqual(row.data[player]["correct_answers"], 5)
+            self.assertEqual(row.data[player]["score"], 5 * 90)
+        self.assertEqual(row.data["bob"]["avatarSeed"], "b")
+
+    async def test_repeated_answer_is_rejected(self):
+        consumer = self._consumer("alice")
+        question = self.questions[0]
+        for _ in range(2):
+            await self.handler._handle_leaderboard_update(
+                question_id=str(question.id),
+                answer="a",
+                consumer=consumer,
+                current_question=question,
+                game=self.game,
+                timestamp=question.updated_at.timestamp() * 1000,
+            )
+        consumer.send_error.assert_called_once_with("Question already answered.")
+        await leaderboard.checkpoint(self.game.id)
+        row = await Leaderboard.objects.aget(game=self.game)
+        self.assertEqual(row.data["alice"]["score"], 100)
+
+    async def test_stale_snapshots_are_not_persisted(self):
+        await self._answer("alice", self.questions[0])
+        await leaderboard.checkpoint(self.game.id)
+        row = await Leaderboard.objects.aget(game=self.game)
+        stale = Snapshot(version=row.version - 1, data={})
+        self.assertFalse(await leaderboard.persist_snapshot(self.game.id, stale))
+        await row.arefresh_from_db()
+        self.assertIn("alice", row.data)
+
+    async def test_all_players_answered_is_announced(self):
+        question = self.questions[0]
+        consumers = {name: self._consumer(name) for name in LEGACY_DATA}
+        for consumer in consumers.values():
+            await self.handler._handle_leaderboard_update(
+                question_id=str(question.id),
+                answer="b",
+                consumer=consumer,
+                current_question=question,
+                game=self.game,
+                timestamp=question.updated_at.timestamp() * 1000,
+            )
+        all_answered = call({"type": "all_players_answered", "payload": {}})
+        self.assertNotIn(all_answered, consumers["alice"].send_data_to_room.mock_calls)
+        self.assertIn(all_answered, consumers["bob"].send_data_to_room.mock_calls)
+
+    async def test_resync_sends_snapshot_to_requester(self):
+        await self._answer("alice", self.questions[0])
+        consumer = self._consumer("bob")
+        consumer.room_code = self.room.room_code
+        await LeaderboardUpdateEventHandler().handle({}, consumer)
+        consumer.send_data_to_room.assert_not_called()
+        message = consumer.send_data_to_user.call_args.args[0]
+        self.assertEqual(message["type"], "leaderboard_update")
+        self.assertEqual(message["seq"], 1)
+        self.assertEqual(message["payload"][0]["username"], "alice")
+
+
+@patch(COALESCE_WINDOW, 0.05)
+class CoalescedLeaderboardTest(LeaderboardGameTestCase):
+    async def test_burst_of_answers_is_broadcast_once(self):
+        consumer = AsyncMock()
+        players = [f"player{i}" for i in range(20)]
+
+        async def answer(username):
+            consumer.username = username
+            question = self.questions[0]
+            await self.handler._handle_leaderboard_update(
+                question_id=str(question.id),
+                answer="a",
+                consumer=consumer,
+                current_question=question,
+                game=self.game,
+                timestamp=question.updated_at.timestamp() * 1000,
+            )
+
+        await asyncio.gather(*(answer(p) for p in players))
+        # Validations are not held back by the window
+        self.assertEqual(consumer.send_data_to_user.call_count, 20)
+        consumer.send_data_to_room.assert_not_called()
+        await ANSWER_UPDATES.drain()
+        consumer.send_data_to_room.assert_called_once()
+        delta = consumer.send_data_to_room.call_args.args[0]
+        self.assertEqual(delta["type"], "leaderboard_delta")
+        self.assertEqual((delta["prevSeq"], delta["seq"]), (0, 20))
+        self.assertEqual(
+            sorted(e["username"] for e in delta["payload"]["entries"]), sorted(players)
+        )
+        # Journaled in one insert; the leaderboard waits for the question to close
+        self.assertEqual(
+            await Answer.objects.filter(question__game=self.game).acount(), 20
+        )
+        row = await Leaderboard.objects.aget(game=self.game)
+        self.assertEqual(row.version, 0)
+
+    async def test_game_ending_within_the_window_is_not_reloaded(self):
+        await self._answer("alice", self.questions[0])
+        # Closes the question, but the broadcast waits for the window
+        await self._answer("bob", self.questions[0])
+        await self.game.aend_game()
+        await ANSWER_UPDATES.drain()
+        with self.assertRaises(GameNotLoaded):
+            await leaderboard.get_engine().snapshot(self.game.id)
+        self.assertEqual((await Leaderboard.objects.aget(game=self.game)).version, 2)
+
+
+@patch(COALESCE_WINDOW, 0)
+class WriteBehindTest(LeaderboardGameTestCase):
+    async def _row(self):
+        return await Leaderboard.objects.aget(game=self.game)
+
+    async def test_answers_are_persisted_when_the_question_closes(self):
+        await self._answer("alice", self.questions[0])
+        self.assertEqual((await self._row()).version, 0)
+        await self._answer("bob", self.questions[0])
+        row = await self._row()
+        self.assertEqual(row.version, 2)
+        self.assertEqual(row.data["bob"]["score"], 130)
+
+    @patch("ai_quiz.leaderboard.store.settings.LEADERBOARD_CHECKPOINT_INTERVAL", 0)
+    async def test_answers_are_checkpointed_periodically(self):
+        await self._answer("alice", self.questions[0])
+        self.assertEqual((await self._row()).version, 1)
+
+    async def test_next_question_persists_the_closed_question(self):
+        await Game.objects.filter(id=self.game.id).aupdate(current_question=1)
+        await self._answer("alice", self.questions[0])
+        await NextQuestionEventHandler().get_next_question(self.room.room_code)
+        self.assertEqual((await self._row()).version, 1)
+
+    async def test_ending_the_game_persists_and_forgets_the_leaderboard(self):
+        await self._answer("alice", self.questions[0])
+        await self.game.aend_game()
+        self.assertEqual((await self._row()).data["alice"]["score"], 90)
+        with self.assertRaises(GameNotLoaded):
+            await leaderboard.get_engine().snapshot(self.game.id)
+
+    async def test_aborting_the_game_forgets_the_leaderboard(self):
+        await self._answer("alice", self.questions[0])
+        await self.room.aend_all_games()
+        self.assertNotIn(str(self.game.id), store._checkpointed)
+        self.assertNotIn(str(self.game.id), store._ordinals)
+        with self.assertRaises(GameNotLoaded):
+            await leaderboard.get_engine().snapshot(self.game.id)
+
+    async def test_lost_leaderboard_is_rebuilt_from_the_journal(self):
+        await self._answer("alice", self.questions[0])
+        await leaderboard.checkpoint(self.game.id)
+        await self._answer("alice", self.questions[1], answer="b")
+        await self._answer("carol", self.questions[1])
+        # The worker holding the live leaderboard goes away
+        await leaderboard.get_engine().clear(self.game.id)
+
+        snapshot = await leaderboard.get_snapshot(self.game)
+        self.assertEqual(snapshot.version, 3)
+        self.assertEqual(snapshot.data["alice"]["score"], 90)
+        self.assertEqual(snapshot.data["alice"]["wrong_answers"], 1)
+        self.assertEqual(snapshot.data["carol"]["correct_answers"], 1)
+        self.assertEqual(snapshot.data["bob"]["avatarSeed"], "b")
+
+
+@patch(COALESCE_WINDOW, 0)
+class AnsweredBitsetTest(LeaderboardGameTestCase):
+    async def test_answers_set_the_question_ordinal(self):
+        await self._answer("alice", self.questions[3])
+        snapshot = await leaderboard.get_snapshot(self.game)
+        self.assertEqual(snapshot.data["alice"]["answered"], bitset.encode(1 << 3))
+
+    def test_migration_converts_id_lists(self):
+        migration = importlib.import_module(
+            "ai_quiz.migrations.0021_leaderboard_answered_bitset"
+        )
+        ids = [self.questions[1].id, self.questions[3].id]
+        Leaderboard.objects.filter(game=self.game).update(
+            data={"alice": {"score": 5, "answered_questions": [str(q) for q in ids]}}
+        )
+
+        migration.encode_answered_questions(apps, None)
+        data = Leaderboard.objects.get(game=self.game).data
+        self.assertEqual(data["alice"], {"score": 5, "answered": "50"})
+
+        migration.decode_answered_questions(apps, None)
+        data = Leaderboard.objects.get(game=self.game).data
+        self.assertEqual(data["alice"]["answered_questions"], [str(q) for q in ids])
+
+
+@patch(COALESCE_WINDOW, 0)
+class LeaderboardTimelineTest(LeaderboardGameTestCase):
+    def _frames(self):
+        return list(
+            LeaderboardFrame.objects.filter(game=self.game)
+            .order_by("id")
+            .values_list("question", "deltas")
+        )
+
+    async def _play(self):
+        # Question 0 closes once both players answered; question 1 as the
+        # host moves on
+        await self._answer("alice", self.questions[0])
+        await self._answer("bob", self.questions[0], answer="b")
+        await Game.objects.filter(id=self.game.id).aupdate(current_question=2)
+        await self._answer("bob", self.questions[1])
+        await NextQuestionEventHandler().get_next_question(self.room.room_code)
+
+    def test_a_frame_is_logged_per_closed_question(self):
+        async_to_sync(self._play)()
+        self.assertEqual(
+            self._frames(),
+            [
+                (0, {"alice": [90, 1], "bob": [40, 2]}),
+                (1, {"bob": [90, 1], "alice": [0, 2]}),
+            ],
+        )
+        # Closing a question again logs nothing
+        async_to_sync(leaderboard.close_question)(self.game, 1)
+        self.assertEqual(len(self._frames()), 2)
+
+    def test_ending_the_game_logs_the_last_frame(self):
+        Game.objects.filter(id=self.game.id).update(current_question=1)
+        self.game.refresh_from_db()
+        async_to_sync(self._answer)("alice", self.questions[0])
+        self.game.end_game()
+        self.assertEqual(self._frames(), [(0, {"alice": [90, 1], "bob": [40, 2]})])
+
+    def test_timeline_is_served_in_constant_queries(self):
+        async_to_sync(self._play)()
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        url = reverse("game_timeline", args=[self.game.id])
+        with self.assertNumQueries(3):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        frames = response.json()["frames"]
+        self.assertEqual(
+            [f["questionId"] for f in frames], [q.id for q in self.questions[:2]]
+        )
+        self.assertEqual([f["seq"] for f in frames], [2, 3])
+        final = timeline.fold(f["deltas"] for f in frames)
+        data = Leaderboard.objects.get(game=self.game).data
+        self.assertEqual(final, {u: [e["score"], e["rank"]] for u, e in data.items()})
+
+    async def _serve_all(self):
+        served = []
+        handler = NextQuestionEventHandler()
+        while True:
+            question, _ = await handler.get_next_question(self.room.room_code)
+            if question is None:
+                return served
+            served.append(question.id)
+            await self._answer("alice", question)
+            # Rows touched latest first, as serving them would
+            for other in reversed(self.questions):
+                await other.asave()
+
+    def test_frames_follow_the_questions_served(self):
+        served = async_to_sync(self._serve_all)()
+        self.assertEqual(served, sorted(q.id for q in self.questions))
+        frames = timeline.get_timeline(self.game.id)["frames"]
+        self.assertEqual([f["questionId"] for f in frames], served)
+        self.assertEqual([f["deltas"]["alice"][0] for f in frames], [90] * 5)
+
+    def test_timeline_of_unknown_game_is_not_found(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.get(reverse("game_timeline", args=[uuid.uuid4()]))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,85 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from ai_quiz import metrics
+from ai_quiz.llm_policy import CallPolicy, LLMUnavailableError, call_with_policy
+
+
+def make_policy(**kwargs):
+    return CallPolicy(
+        name="test",
+        deadline=kwargs.pop("deadline", 1.0),
+        backoff_base=0.001,
+        backoff_max=0.001,
+        **kwargs,
+    )
+
+
+class CallWithPolicyTest(IsolatedAsyncioTestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def outcome(self, outcome):
+        return metrics.get_counter("llm_calls", chain="test", outcome=outcome)
+
+    async def test_success_records_latency(self):
+        policy = make_policy()
+
+        async def call():
+            return "ok"
+
+        self.assertEqual(await call_with_policy(policy, call), "ok")
+        self.assertEqual(self.outcome("success"), 1)
+        self.assertEqual(len(policy.latencies), 1)
+
+    async def test_retries_after_error(self):
+        attempts = []
+
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise RuntimeError("rate limited")
+            return "ok"
+
+        result = await call_with_policy(make_policy(max_retries=2), flaky)
+        self.assertEqual(result, "ok")
+        self.assertEqual(self.outcome("error"), 2)
+        self.assertEqual(self.outcome("retry_success"), 1)
+
+    async def test_deadline_uses_fallback(self):
+        async def slow():
+            await asyncio.sleep(5)
+
+        async def fallback():
+            return "stored"
+
+        result = await call_with_policy(make_policy(deadline=0.05), slow, fallback)
+        self.assertEqual(result, "stored")
+        self.assertEqual(self.outcome("timeout"), 1)
+        self.assertEqual(self.outcome("fallback"), 1)
+
+    async def test_raises_without_fallback(self):
+        async def broken():
+            raise RuntimeError("down")
+
+        with self.assertRaises(LLMUnavailableError):
+            await call_with_policy(make_policy(max_retries=1), broken)
+        self.assertEqual(self.outcome("error"), 2)
+        self.assertEqual(self.outcome("failure"), 1)
+
+    async def test_hedges_slow_call(self):
+        policy = make_policy(hedge_min_samples=5)
+        for _ in range(5):
+            policy.latencies.record(0.01)
+        calls = []
+
+        async def call():
+            calls.append(1)
+            if len(calls) == 1:
+                await asyncio.sleep(5)
+                return "primary"
+            return "hedge"
+
+        self.assertEqual(await call_with_policy(policy, call), "hedge")
+        self.assertEqual(self.outcome("hedged"), 1)
+        self.assertEqual(self.outcome("hedge_won"), 1)
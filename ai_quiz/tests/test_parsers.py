@@ -0,0 +1,195 @@
+import json
+
+from django.test import SimpleTestCase
+from langchain_core.exceptions import OutputParserException
+
+from ai_quiz import metrics
+from ai_quiz.ai import Question, Subtopic, TopicTriviaGenerator, TriviaGenerator
+from ai_quiz.management.commands.benchmark_parsers import benchmark
+from ai_quiz.output_parsers import ItemValidatingOutputParser
+from ai_quiz.parsers import (
+    StreamingJsonListParser,
+    StreamingYamlListParser,
+    parse_structured,
+)
+
+QUESTIONS_YAML = """```yaml
+thoughts: "Cover a few subtopics"
+topic: "Science"
+difficulty: "easy"
+n: 3
+questions:
+ - subtopic: "Physics"
+  question: "What is the unit of force?"
+  answer: "Newton"
+  options: ["Newton", "Joule", "Watt", "Pascal"]
+ - subtopic: "Chemistry"
+  question: "What is H2O?"
+  answer: "Water"
+  options:
+    - "Water"
+    - "Salt"
+    - "Sugar"
+    - "Oxygen"
+ - subtopic: "Biology"
+  question: "Broken item without options"
+ - subtopic: "Biology"
+  question: "What do plants absorb?"
+  answer: "CO2"
+  options: ["CO2", "O2", "N2", "He"]
+```
+"""
+
+
+class StreamingYamlListParserTest(SimpleTestCase):
+    def test_yields_items_as_they_close(self):
+        parser = StreamingYamlListParser(pydantic_object=Question)
+        emitted_at = []
+        questions = []
+        for position, char in enumerate(QUESTIONS_YAML):
+            for question in parser.feed(char):
+                emitted_at.append(position)
+                questions.append(question)
+        questions.extend(parser.close())
+
+        self.assertEqual([q.answer for q in questions], ["Newton", "Water", "CO2"])
+        self.assertEqual(questions[1].options[-1], "Oxygen")
+        # The first question is available long before the document ends
+        self.assertLess(emitted_at[0], QUESTIONS_YAML.index("What is H2O?"))
+        self.assertEqual(parser.failures, 1)
+
+    def test_sibling_key_closes_list(self):
+        parser = StreamingYamlListParser(pydantic_object=Question)
+        items = parser.feed(
+            "questions:\n"
+            "- subtopic: a\n"
+            "  question: q?\n"
+            "  answer: x\n"
+            "  options: [x, y]\n"
+            "n: 1\n"
+        )
+        self.assertEqual([q.question for q in items], ["q?"])
+        self.assertEqual(parser.close(), [])
+
+    def test_close_flushes_last_item(self):
+        parser = StreamingYamlListParser(pydantic_object=Question)
+        self.assertEqual(
+            parser.feed("questions:\n  - subtopic: a\n    question: q?\n"), []
+        )
+        self.assertEqual(parser.feed("    answer: x\n    options: [x, y]"), [])
+        self.assertEqual([q.question for q in parser.close()], ["q?"])
+
+
+QUESTIONS_JSON = (
+    "```json\n"
+    + json.dumps(
+        {
+            "thoughts": 'Mind the "quotes", commas and [brackets]',
+            "topic": "Science",
+            "subtopics": ["Physics", "Chemistry"],
+            "difficulty": "easy",
+            "n": 3,
+            "questions": [
+                {
+                    "subtopic": "Physics",
+                    "question": "What is the unit of force, {N} or [J]?",
+                    "answer": "Newton",
+                    "options": ["Newton", "Joule", "Watt", "Pascal"],
+                },
+                {"subtopic": "Biology", "question": "Broken item without options"},
+                {
+                    "subtopic": "Chemistry",
+                    "question": 'What is "H2O", \\ or water?',
+                    "answer": "Water",
+                    "options": ["Water", "Salt", "Sugar", "Oxygen"],
+                },
+            ],
+        },
+        indent=2,
+    )
+    + "\n```"
+)
+
+
+class StreamingJsonListParserTest(SimpleTestCase):
+    def test_yields_items_as_they_close(self):
+        parser = StreamingJsonListParser(pydantic_object=Question)
+        emitted_at = []
+        questions = []
+        for position, char in enumerate(QUESTIONS_JSON):
+            for question in parser.feed(char):
+                emitted_at.append(position)
+                questions.append(question)
+        questions.extend(parser.close())
+
+        self.assertEqual([q.answer for q in questions], ["Newton", "Water"])
+        self.assertEqual(questions[1].question, 'What is "H2O", \\ or water?')
+        self.assertLess(emitted_at[0], QUESTIONS_JSON.index("Broken item"))
+        self.assertEqual(parser.failures, 1)
+
+    def test_parses_string_items(self):
+        parser = StreamingJsonListParser(pydantic_object=Subtopic, list_key="subtopics")
+        items = []
+        for start in range(0, len(QUESTIONS_JSON), 7):
+            items.extend(parser.feed(QUESTIONS_JSON[start : start + 7]))
+        self.assertEqual([item.root for item in items], ["Physics", "Chemistry"])
+
+    def test_close_drops_truncated_item(self):
+        parser = StreamingJsonListParser(pydantic_object=Question)
+        cut = QUESTIONS_JSON.index("Broken item")
+        self.assertEqual(len(parser.feed(QUESTIONS_JSON[:cut])), 1)
+        self.assertEqual(parser.close(), [])
+        self.assertEqual(parser.failures, 1)
+
+
+class ParseStructuredTest(SimpleTestCase):
+    def test_drops_only_invalid_items(self):
+        trivia, failures = parse_structured(QUESTIONS_JSON, TopicTriviaGenerator)
+        self.assertEqual([q.answer for q in trivia.questions], ["Newton", "Water"])
+        self.assertEqual(trivia.subtopics, ["Physics", "Chemistry"])
+        self.assertEqual(failures, 1)
+
+    def test_parses_yaml(self):
+        document = QUESTIONS_YAML.replace(" - subtopic", "- subtopic")
+        trivia, failures = parse_structured(document, TriviaGenerator, "yaml")
+        self.assertEqual(len(trivia.questions), 3)
+        self.assertEqual(failures, 1)
+
+    def test_accepts_unfenced_json(self):
+        trivia, _ = parse_structured(
+            QUESTIONS_JSON.removeprefix("```json").removesuffix("```"),
+            TriviaGenerator,
+        )
+        self.assertEqual(trivia.topic, "Science")
+
+    def test_rejects_malformed_document(self):
+        with self.assertRaises(ValueError):
+            parse_structured('{"thoughts": "", "topic": ', TriviaGenerator)
+        with self.assertRaises(ValueError):
+            parse_structured('{"questions": []}', TriviaGenerator)
+
+
+class ItemValidatingOutputParserTest(SimpleTestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_counts_dropped_items(self):
+        parser = ItemValidatingOutputParser(pydantic_object=TriviaGenerator)
+        trivia = parser.parse(QUESTIONS_JSON)
+        self.assertEqual(len(trivia.questions), 2)
+        self.assertEqual(
+            metrics.get_counter("llm_dropped_items", parser="TriviaGenerator"), 1
+        )
+
+    def test_raises_output_parser_exception(self):
+        parser = ItemValidatingOutputParser(pydantic_object=TriviaGenerator)
+        with self.assertRaises(OutputParserException):
+            parser.parse("not json")
+
+
+class BenchmarkParsersTest(SimpleTestCase):
+    def test_reports_every_parser(self):
+        results = benchmark(n=5, runs=1)
+        self.assertIn("yaml (YamlOutputParser)", results)
+        self.assertIn("json stream", results)
+        self.assertTrue(all(seconds > 0 for seconds in results.values()))
@@ -0,0 +1,177 @@
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+
+from django.test import TestCase
+from django.utils import timezone
+
+from ai_quiz import question_bank
+from ai_quiz.ai import Question, TopicTriviaGenerator, TriviaGenerator
+from ai_quiz.llm_policy import LLMUnavailableError
+from ai_quiz.models import Game, Question as QuestionModel, Room, Topic
+from users.models import User
+
+
+# Near-duplicate rejection is covered in test_dedupe
+@patch("ai_quiz.question_bank.settings.DEDUPE_ENABLED", False)
+class QuestionBankTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="password123"
+        )
+        self.room = Room.objects.create(host=self.user)
+        self.game = Game.objects.create(room=self.room, status="waiting")
+        self.bank_key = question_bank.make_bank_key(
+            "Science", "easy", ["Physics", "Chemistry"]
+        )
+
+    def _store(self, text, bank_key=None, **kwargs):
+        return QuestionModel.objects.create(
+            game=self.game,
+            question=text,
+            subtopic="Physics",
+            options=["a", "b", "c", "d"],
+            correct_answer="a",
+            bank_key=bank_key or self.bank_key,
+            **kwargs,
+        )
+
+    def test_make_bank_key_is_normalized(self):
+        self.assertEqual(
+            self.bank_key,
+            question_bank.make_bank_key(
+                "  science ", "EASY", ["chemistry", "Physics", "physics"]
+            ),
+        )
+        self.assertNotEqual(
+            self.bank_key,
+            question_bank.make_bank_key("Science", "hard", ["Physics", "Chemistry"]),
+        )
+
+    def test_get_bank_questions(self):
+        self._store("Q1?")
+        self._store("Q2?")
+        self._store("Other?", bank_key="other")
+        questions = question_bank.get_bank_questions(self.bank_key, 5)
+        self.assertEqual({q.question for q in questions}, {"Q1?", "Q2?"})
+
+    def test_get_bank_questions_respects_reuse_limit(self):
+        for _ in range(3):
+            self._store("Overused?")
+        self._store("Fresh?")
+        questions = question_bank.get_bank_questions(self.bank_key, 5, max_reuse=1)
+        self.assertEqual([q.question for q in questions], ["Fresh?"])
+
+    def test_get_bank_questions_respects_freshness(self):
+        stale = self._store("Stale?")
+        QuestionModel.objects.filter(pk=stale.pk).update(
+            created_at=timezone.now() - timedelta(days=60)
+        )
+        questions = question_bank.get_bank_questions(
+            self.bank_key, 5, max_age=timedelta(days=30)
+        )
+        self.assertEqual(questions, [])
+
+    @patch("ai_quiz.question_bank.ai.generate_questions", new_callable=AsyncMock)
+    async def test_generate_questions_only_requests_shortfall(self, mock_generate):
+        await QuestionModel.objects.acreate(
+            game=self.game,
+            question="Banked?",
+            options=["a", "b", "c", "d"],
+            correct_answer="a",
+            bank_key=self.bank_key,
+        )
+        mock_generate.return_value = TriviaGenerator(
+            thoughts="",
+            topic="Science",
+            difficulty="easy",
+            n=2,
+            questions=[
+                Question(subtopic="Physics", question=q, answer="a", options=["a"])
+                for q in ("New 1?", "New 2?")
+            ],
+        )
+        trivia = await question_bank.generate_questions(
+            topic="Science", subtopics=["Physics", "Chemistry"], n=3, difficulty="easy"
+        )
+        self.assertEqual(mock_generate.call_args.kwargs["n"], 2)
+        self.assertEqual(
+            [q.question for q in trivia.questions], ["Banked?", "New 1?", "New 2?"]
+        )
+
+    @patch("ai_quiz.question_bank.ai.generate_questions", new_callable=AsyncMock)
+    async def test_generate_questions_skips_llm_when_bank_is_full(self, mock_generate):
+        for text in ("Q1?", "Q2?"):
+            await QuestionModel.objects.acreate(
+                game=self.game,
+                question=text,
+                options=["a", "b", "c", "d"],
+                correct_answer="a",
+                bank_key=self.bank_key,
+            )
+        trivia = await question_bank.generate_questions(
+            topic="Science", subtopics=["Physics", "Chemistry"], n=2, difficulty="easy"
+        )
+        mock_generate.assert_not_called()
+        self.assertEqual(trivia.n, 2)
+
+    @patch("ai_quiz.question_bank.ai.generate_questions", new_callable=AsyncMock)
+    @patch(
+        "ai_quiz.question_bank.ai.generate_topic_and_questions", new_callable=AsyncMock
+    )
+    async def test_generate_questions_without_subtopics_makes_one_call(
+        self, mock_combined, mock_generate
+    ):
+        mock_combined.return_value = TopicTriviaGenerator(
+            thoughts="",
+            topic="Science",
+            subtopics=["Optics", "Waves"],
+            difficulty="easy",
+            n=1,
+            questions=[
+                Question(subtopic="Optics", question="Lens?", answer="a", options=["a"])
+            ],
+        )
+        subtopics = []
+        trivia = await question_bank.generate_questions(
+            topic="Science", subtopics=subtopics, n=1, difficulty="easy"
+        )
+        mock_generate.assert_not_called()
+        self.assertEqual(subtopics, ["Optics", "Waves"])
+        self.assertEqual([q.question for q in trivia.questions], ["Lens?"])
+
+    def test_get_fallback_questions_ignores_bank_key_and_age(self):
+        topic = Topic.get_or_create_by_name("Science")
+        old = self._store("Old?", bank_key="other", topic=topic)
+        QuestionModel.objects.filter(pk=old.pk).update(
+            created_at=timezone.now() - timedelta(days=365)
+        )
+        self._store("Asked?", topic=topic)
+        self._store("Unrelated?")
+        questions = question_bank.get_fallback_questions(
+            " science", "easy", 5, exclude=["asked?"]
+        )
+        self.assertEqual([q.question for q in questions], ["Old?"])
+
+    @patch("ai_quiz.question_bank.ai.stream_questions")
+    async def test_stream_falls_back_to_stored_questions(self, mock_stream):
+        topic = await Topic.aget_or_create_by_name("Science")
+        await QuestionModel.objects.acreate(
+            game=self.game,
+            question="Stored?",
+            options=["a"],
+            correct_answer="a",
+            topic=topic,
+        )
+
+        async def failing_stream(**kwargs):
+            yield Question(subtopic="", question="Fresh?", answer="a", options=["a"])
+            raise LLMUnavailableError("deadline exceeded")
+
+        mock_stream.side_effect = failing_stream
+        questions = [
+            q.question
+            async for q in question_bank.stream_questions(
+                topic="Science", subtopics=["Other"], n=3, difficulty="easy"
+            )
+        ]
+        self.assertEqual(questions, ["Fresh?", "Stored?"])
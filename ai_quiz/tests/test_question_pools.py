@@ -0,0 +1,164 @@
+from unittest.mock import AsyncMock, patch
+
+from channels.db import database_sync_to_async
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ai_quiz import question_pools
+from ai_quiz.ai import Question, TopicGenerator, TriviaGenerator
+from ai_quiz.llm_policy import AdmissionRejected
+from ai_quiz.models import Game, GamePreparationJob, Question as QuestionModel
+from ai_quiz.models import QuestionPool, Room, Topic
+from users.models import User
+
+
+def make_pool(topic, n=10, difficulty="easy"):
+    return QuestionPool.objects.create(
+        topic=topic,
+        difficulty=difficulty,
+        subtopics=["Physics"],
+        questions=[
+            {
+                "subtopic": "Physics",
+                "question": f"Q{i}?",
+                "answer": "a",
+                "options": ["a"],
+            }
+            for i in range(n)
+        ],
+        n=n,
+    )
+
+
+class QuestionPoolTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="password123"
+        )
+        self.room = Room.objects.create(host=self.user)
+        self.science = Topic.get_or_create_by_name("Science", ["Physics"])
+        self.history = Topic.get_or_create_by_name("History", ["Rome"])
+
+    def _play(self, topic, games, difficulty="easy"):
+        for _ in range(games):
+            game = Game.objects.create(room=self.room, status="ended")
+            QuestionModel.objects.create(
+                game=game,
+                question="Q?",
+                options=["a"],
+                correct_answer="a",
+                topic=topic,
+                difficulty=difficulty,
+            )
+
+    def test_popular_topics_ranks_by_games_played(self):
+        self._play(self.history, 1)
+        self._play(self.science, 3)
+        self.assertEqual(
+            question_pools.popular_topics(),
+            [(self.science, "easy"), (self.history, "easy")],
+        )
+        self.assertEqual(
+            question_pools.popular_topics(limit=1), [(self.science, "easy")]
+        )
+
+    def test_claim_pool_is_exclusive(self):
+        make_pool(self.science)
+        pool = question_pools.claim_pool(" science", "easy", 5)
+        self.assertEqual(pool.topic, self.science)
+        self.assertIsNone(question_pools.claim_pool("Science", "easy", 5))
+        self.assertEqual(QuestionPool.objects.get().status, "claimed")
+
+    def test_claim_pool_needs_enough_questions(self):
+        make_pool(self.science, n=5)
+        self.assertIsNone(question_pools.claim_pool("Science", "easy", 10))
+        self.assertIsNone(question_pools.claim_pool("Science", "hard", 5))
+
+    def test_claim_pool_matches_host_subtopics(self):
+        make_pool(self.science)
+        self.assertIsNone(question_pools.claim_pool("Science", "easy", 5, ["Optics"]))
+        pool = question_pools.claim_pool("Science", "easy", 5, ["physics"])
+        self.assertEqual(pool.topic, self.science)
+
+    @patch("ai_quiz.question_pools.settings.QUESTION_POOL_DEPTH", 2)
+    @patch("ai_quiz.question_pools.generate_subtopics", new_callable=AsyncMock)
+    @patch("ai_quiz.question_pools.generate_questions", new_callable=AsyncMock)
+    async def test_warm_pools_tops_up_to_depth(self, mock_questions, mock_subtopics):
+        await database_sync_to_async(self._play)(self.science, 2)
+        await database_sync_to_async(make_pool)(self.science)
+        mock_subtopics.return_value = TopicGenerator(
+            thoughts="", topic="Science", subtopics=["Physics"]
+        )
+        mock_questions.return_value = TriviaGenerator(
+            thoughts="",
+            topic="Science",
+            difficulty="easy",
+            n=1,
+            questions=[
+                Question(subtopic="Physics", question="New?", answer="a", options=["a"])
+            ],
+        )
+        self.assertEqual(await question_pools.warm_pools(), 1)
+        self.assertEqual(
+            await QuestionPool.objects.filter(topic=self.science).acount(), 2
+        )
+
+
+class CreateGameFromPoolTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="password123"
+        )
+        self.room = Room.objects.create(host=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        make_pool(Topic.get_or_create_by_name("Science"))
+
+    @patch("ai_quiz.views.games.start_job")
+    def test_create_game_claims_pool(self, mock_start_job):
+        response = self.client.post(
+            reverse("create_game"),
+            {
+                "roomCode": self.room.room_code,
+                "topic": "Science",
+                "subtopics": [],
+                "n": 5,
+                "difficulty": "easy",
+                "timePerQuestion": 30,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["status"], "ready")
+        mock_start_job.assert_not_called()
+        game_id = response.data["gameId"]
+        self.assertEqual(QuestionModel.objects.filter(game_id=game_id).count(), 5)
+        job = GamePreparationJob.objects.get(game_id=game_id)
+        self.assertEqual(job.subtopics, ["Physics"])
+
+    @patch("ai_quiz.views.games.start_job")
+    @patch(
+        "ai_quiz.views.games.LLM_ADMISSION.check",
+        side_effect=AdmissionRejected("busy", retry_after=12.2),
+    )
+    def test_pool_games_do_not_wait_for_the_llm(self, mock_check, mock_start_job):
+        response = self.client.post(
+            reverse("create_game"),
+            {
+                "roomCode": self.room.room_code,
+                "topic": "Science",
+                "n": 5,
+                "difficulty": "easy",
+                "timePerQuestion": 30,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["status"], "ready")
+        self.assertEqual(
+            (response.data["queuePosition"], response.data["estimatedWait"]), (0, 0)
+        )
+        mock_check.assert_not_called()
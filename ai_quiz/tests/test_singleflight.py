@@ -0,0 +1,203 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from ai_quiz import ai, dedupe, question_bank
+from ai_quiz.ai import Question, TopicGenerator, TriviaGenerator
+from ai_quiz.singleflight import SingleFlight, make_key
+
+
+def topics(name="Science"):
+    return TopicGenerator(thoughts="", topic=name, subtopics=["Physics"])
+
+
+def question(i):
+    return Question(
+        subtopic="Physics", question=f"Q{i}?", answer="a", options=["a", "b"]
+    )
+
+
+@patch("ai_quiz.singleflight.settings.SINGLE_FLIGHT_POLL_INTERVAL", 0.01)
+class SingleFlightTest(IsolatedAsyncioTestCase):
+    def setUp(self):
+        cache.clear()
+        self.flights = SingleFlight("test")
+        self.calls = 0
+
+    async def _slow_topics(self, name="Science"):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return topics(name)
+
+    async def test_concurrent_calls_share_one_execution(self):
+        first, second = await asyncio.gather(
+            self.flights.do("k", self._slow_topics, TopicGenerator),
+            self.flights.do("k", self._slow_topics, TopicGenerator),
+        )
+        self.assertEqual(self.calls, 1)
+        self.assertFalse(first[1])
+        self.assertTrue(second[1])
+        self.assertEqual(first[0], second[0])
+        # Each caller gets its own copy to mutate
+        self.assertIsNot(first[0], second[0])
+
+    async def test_different_keys_run_separately(self):
+        await asyncio.gather(
+            self.flights.do("a", self._slow_topics, TopicGenerator),
+            self.flights.do("b", self._slow_topics, TopicGenerator),
+        )
+        self.assertEqual(self.calls, 2)
+
+    async def test_later_calls_run_again(self):
+        await self.flights.do("k", self._slow_topics, TopicGenerator)
+        await self.flights.do("k", self._slow_topics, TopicGenerator)
+        self.assertEqual(self.calls, 2)
+
+    async def test_errors_reach_every_caller(self):
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("down")
+
+        results = await asyncio.gather(
+            self.flights.do("k", fail, TopicGenerator),
+            self.flights.do("k", fail, TopicGenerator),
+            return_exceptions=True,
+        )
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+
+    async def test_cancelled_caller_does_not_cancel_the_call(self):
+        first = asyncio.create_task(
+            self.flights.do("k", self._slow_topics, TopicGenerator)
+        )
+        await asyncio.sleep(0)
+        second = asyncio.create_task(
+            self.flights.do("k", self._slow_topics, TopicGenerator)
+        )
+        await asyncio.sleep(0)
+        first.cancel()
+        result, shared = await second
+        self.assertEqual(result.topic, "Science")
+        self.assertEqual(self.calls, 1)
+
+    async def test_waits_for_result_of_another_worker(self):
+        lock_key = "singleflight:test:k"
+        await cache.aset(lock_key, "other-worker")
+
+        async def other_worker_finishes():
+            await asyncio.sleep(0.05)
+            await cache.aset(f"{lock_key}:other-worker", topics("Remote").model_dump())
+            await cache.adelete(lock_key)
+
+        asyncio.create_task(other_worker_finishes())
+        result, shared = await self.flights.do("k", self._slow_topics, TopicGenerator)
+        self.assertEqual(result.topic, "Remote")
+        self.assertTrue(shared)
+        self.assertEqual(self.calls, 0)
+
+    async def test_takes_over_when_other_worker_gives_up(self):
+        lock_key = "singleflight:test:k"
+        await cache.aset(lock_key, "other-worker")
+
+        async def other_worker_fails():
+            await asyncio.sleep(0.05)
+            await cache.adelete(lock_key)
+
+        asyncio.create_task(other_worker_fails())
+        result, shared = await self.flights.do("k", self._slow_topics, TopicGenerator)
+        self.assertFalse(shared)
+        self.assertEqual(self.calls, 1)
+        self.assertIsNone(await cache.aget(lock_key))
+
+    async def test_streams_are_shared_between_consumers(self):
+        async def produce():
+            self.calls += 1
+            for i in range(3):
+                await asyncio.sleep(0.01)
+                yield question(i)
+
+        async def consume(shared):
+            return [
+                q.question
+                async for q in self.flights.stream("k", produce, Question, shared)
+            ]
+
+        leader_shared, follower_shared = [], []
+        first, second = await asyncio.gather(
+            consume(leader_shared), consume(follower_shared)
+        )
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(first, ["Q0?", "Q1?", "Q2?"])
+        self.assertEqual(second, first)
+        self.assertEqual(leader_shared, [])
+        self.assertEqual(len(follower_shared), 3)
+
+    async def test_stream_is_cancelled_when_consumers_stop(self):
+        produced = []
+
+        async def produce():
+            for i in range(100):
+                await asyncio.sleep(0.01)
+                produced.append(i)
+                yield question(i)
+
+        stream = self.flights.stream("k", produce, Question)
+        await anext(stream)
+        await stream.aclose()
+        await asyncio.sleep(0.05)
+        self.assertLess(len(produced), 5)
+
+    @patch("ai_quiz.singleflight.settings.SINGLE_FLIGHT_ENABLED", False)
+    async def test_can_be_disabled(self):
+        await asyncio.gather(
+            self.flights.do("k", self._slow_topics, TopicGenerator),
+            self.flights.do("k", self._slow_topics, TopicGenerator),
+        )
+        self.assertEqual(self.calls, 2)
+
+    def test_make_key_depends_on_every_part(self):
+        self.assertEqual(make_key("a", ["x"], 1), make_key("a", ["x"], 1))
+        self.assertNotEqual(make_key("a", ["x"], 1), make_key("a", ["x"], 2))
+
+
+class CoalescedGenerationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        dedupe._indexes.clear()
+
+    async def test_concurrent_subtopic_requests_make_one_call(self):
+        calls = []
+
+        async def generate(topic, fallback=None):
+            calls.append(topic)
+            await asyncio.sleep(0.05)
+            return topics(topic)
+
+        with patch("ai_quiz.ai._generate_subtopics", side_effect=generate):
+            results = await asyncio.gather(
+                ai.generate_subtopics("Science"), ai.generate_subtopics(" science ")
+            )
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results[0], results[1])
+
+    async def test_shared_questions_are_not_rejected_as_duplicates(self):
+        async def generate(topic, subtopics, n, difficulty, fallback=None):
+            await asyncio.sleep(0.05)
+            questions = [question(i) for i in range(n)]
+            return TriviaGenerator(
+                thoughts="",
+                topic=topic,
+                difficulty=difficulty,
+                n=n,
+                questions=questions,
+            )
+
+        with patch("ai_quiz.ai._generate_questions", side_effect=generate) as mock:
+            results = await asyncio.gather(
+                question_bank.generate_questions("Science", ["Physics"], 3, "easy"),
+                question_bank.generate_questions("Science", ["Physics"], 3, "easy"),
+            )
+        self.assertEqual(mock.call_count, 1)
+        self.assertEqual([len(r.questions) for r in results], [3, 3])
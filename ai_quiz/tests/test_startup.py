@@ -0,0 +1,27 @@
+from django.test import SimpleTestCase
+
+from ai_quiz import ai
+from ai_quiz.management.commands.benchmark_startup import (
+    deferred_modules_loaded,
+    measure_cold_import,
+)
+
+
+class ColdImportTest(SimpleTestCase):
+    def test_asgi_import_defers_llm_libraries(self):
+        measurement = measure_cold_import("quizio.asgi")
+        self.assertIn("ai_quiz.ai", measurement["modules"])
+        self.assertEqual(deferred_modules_loaded(measurement["modules"]), [])
+        self.assertGreater(measurement["seconds"], 0)
+        self.assertTrue(measurement["slowest"])
+
+
+class LazyAttributesTest(SimpleTestCase):
+    def test_chains_are_built_on_first_access(self):
+        chain = ai.TOPIC_CHAIN
+        self.assertIs(ai.TOPIC_CHAIN, chain)
+        self.assertIs(ai._lazy("TOPIC_CHAIN"), chain)
+
+    def test_unknown_attributes_still_raise(self):
+        with self.assertRaises(AttributeError):
+            ai.NOT_A_CHAIN
@@ -0,0 +1,100 @@
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from ai_quiz import topic_cache
+from ai_quiz.ai import TopicGenerator
+from ai_quiz.models import Topic
+from quizio.utils import TTLCache
+
+
+class TTLCacheTest(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    @patch("quizio.utils.time.monotonic")
+    def test_entries_expire(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        cache = TTLCache(maxsize=2, ttl=10)
+        cache.set("a", 1)
+        mock_monotonic.return_value = 111.0
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+
+class SubtopicCacheTest(TestCase):
+    def setUp(self):
+        topic_cache._subtopic_cache.clear()
+        self.generated = TopicGenerator(
+            thoughts="", topic="Science", subtopics=["Physics", "Chemistry"]
+        )
+
+    def tearDown(self):
+        topic_cache._subtopic_cache.clear()
+
+    def test_get_or_create_by_name_deduplicates(self):
+        first = Topic.get_or_create_by_name("Science")
+        second = Topic.get_or_create_by_name("  SCIENCE ", ["Physics"])
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Topic.objects.count(), 1)
+        second.refresh_from_db()
+        self.assertEqual(second.subtopics, ["Physics"])
+
+    @patch("ai_quiz.topic_cache.ai.generate_subtopics", new_callable=AsyncMock)
+    async def test_generates_once_per_topic(self, mock_generate):
+        mock_generate.return_value = self.generated
+        first = await topic_cache.generate_subtopics("Science")
+        second = await topic_cache.generate_subtopics("science")
+        mock_generate.assert_called_once()
+        self.assertEqual(first.subtopics, second.subtopics)
+        self.assertEqual(await Topic.objects.acount(), 1)
+
+    @patch("ai_quiz.topic_cache.ai.generate_subtopics", new_callable=AsyncMock)
+    async def test_reads_stored_topic_after_lru_miss(self, mock_generate):
+        await Topic.objects.acreate(name="Science", subtopics=["Physics"])
+        result = await topic_cache.generate_subtopics("Science")
+        mock_generate.assert_not_called()
+        self.assertEqual(result.subtopics, ["Physics"])
+
+    @patch("ai_quiz.topic_cache.ai.generate_subtopics", new_callable=AsyncMock)
+    async def test_regenerates_stale_topic(self, mock_generate):
+        mock_generate.return_value = self.generated
+        topic = await Topic.objects.acreate(name="Science", subtopics=["Physics"])
+        await Topic.objects.filter(pk=topic.pk).aupdate(
+            updated_at=timezone.now() - timedelta(days=365)
+        )
+        result = await topic_cache.generate_subtopics("Science")
+        mock_generate.assert_called_once()
+        self.assertEqual(result.subtopics, ["Physics", "Chemistry"])
+
+    @patch("ai_quiz.topic_cache.ai.generate_subtopics", new_callable=AsyncMock)
+    async def test_returns_copy(self, mock_generate):
+        mock_generate.return_value = self.generated
+        result = await topic_cache.generate_subtopics("Science")
+        result.subtopics.reverse()
+        again = await topic_cache.generate_subtopics("Science")
+        self.assertEqual(again.subtopics, ["Physics", "Chemistry"])
+
+    @patch("ai_quiz.topic_cache.ai.generate_subtopics")
+    async def test_serves_stale_topic_when_llm_is_down(self, mock_generate):
+        async def unavailable(topic, fallback, shared):
+            return await fallback()
+
+        mock_generate.side_effect = unavailable
+        topic = await Topic.objects.acreate(name="Science", subtopics=["Physics"])
+        await Topic.objects.filter(pk=topic.pk).aupdate(
+            updated_at=timezone.now() - timedelta(days=365)
+        )
+        result = await topic_cache.generate_subtopics("Science")
+        self.assertEqual(result.subtopics, ["Physics"])
+        # The stale entry is not cached, so the LLM is tried again next time
+        self.assertEqual(len(topic_cache._subtopic_cache), 0)
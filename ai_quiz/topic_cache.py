@@ -0,0 +1,99 @@
+import logging
+
+from channels.db import database_sync_to_async
+from django.utils import timezone
+
+import quizio.settings as settings
+from ai_quiz import ai
+from ai_quiz.ai import TopicGenerator
+from ai_quiz.models import Topic
+from quizio.utils import TTLCache, normalize_text
+
+logger = logging.getLogger(__name__)
+
+_subtopic_cache = TTLCache(
+    maxsize=settings.SUBTOPIC_CACHE_SIZE,
+    ttl=settings.SUBTOPIC_CACHE_TTL.total_seconds(),
+)
+
+
+def get_stored_subtopics(
+    normalized_name: str, include_stale: bool = False
+) -> TopicGenerator | None:
+    """Return the stored subtopics for a topic if they are still fresh."""
+    topics = Topic.objects.filter(normalized_name=normalized_name)
+    if not include_stale:
+        topics = topics.filter(
+            updated_at__gte=timezone.now() - settings.SUBTOPIC_CACHE_TTL
+        )
+    topic = topics.first()
+    if topic is None or not topic.subtopics:
+        return None
+    return TopicGenerator(thoughts="", topic=topic.name, subtopics=topic.subtopics)
+
+
+def store_subtopics(name: str, subtopics: list[str]) -> Topic:
+    topic, _ = Topic.objects.update_or_create(
+        normalized_name=normalize_text(name),
+        defaults={"name": name, "subtopics": subtopics},
+    )
+    return topic
+
+
+async def get_cached_subtopics(topic: str) -> TopicGenerator | None:
+    """Resolve subtopics from the LRU, then the Topic table, never the LLM."""
+    key = normalize_text(topic)
+    cached = _subtopic_cache.get(key)
+    if cached is None:
+        cached = await database_sync_to_async(get_stored_subtopics)(key)
+        if cached is not None:
+            _subtopic_cache.set(key, cached)
+    return None if cached is None else cached.model_copy(deep=True)
+
+
+async def remember_subtopics(topic: str, subtopics: list[str]):
+    """Store subtopics generated outside `generate_subtopics`."""
+    await database_sync_to_async(store_subtopics)(topic, subtopics)
+    _subtopic_cache.set(
+        normalize_text(topic),
+        TopicGenerator(thoughts="", topic=topic, subtopics=list(subtopics)),
+    )
+
+
+async def generate_subtopics(topic: str) -> TopicGenerator:
+    """Resolve subtopics from the LRU, then the Topic table, then the LLM.
+
+    Drop-in replacement for `ai.generate_subtopics`. A copy is returned so
+    callers can shuffle the list without touching the cached entry.
+    """
+    key = normalize_text(topic)
+    cached = await get_cached_subtopics(topic)
+    if cached is not None:
+        return cached
+    logger.info(f"Subtopic cache miss for topic: {topic}")
+    stale = None
+
+    async def stale_subtopics():
+        # Expired subtopics beat no game at all when the LLM is down
+        nonlocal stale
+        stale = await database_sync_to_async(get_stored_subtopics)(
+            key, include_stale=True
+        )
+        if stale is None:
+            raise LookupError(f"No stored subtopics for topic: {topic}")
+        return stale
+
+    shared = []
+    generated = await ai.generate_subtopics(
+        topic, fallback=stale_subtopics, shared=shared
+    )
+    if generated is stale or shared:
+        # Stale subtopics are neither stored nor cached, so the next call
+        # tries the LLM again; shared ones are stored by the call that made them
+        return generated.model_copy(deep=True)
+    await remember_subtopics(topic, generated.subtopics)
+    return generated.model_copy(deep=True)
+
+
+def invalidate(topic: str):
+    _subtopic_cache.delete(normalize_text(topic))
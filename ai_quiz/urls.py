@@ -6,11 +6,14 @@ from ai_quiz.views import (
     JoinRoomView,
     StartGameView,
     EndGameView,
+    GameTimelineView,
     SubtopicsAPIView,
     StartSinglePlayerGameAPIView,
     QuestionsAPIView,
     CheckAnswerAPIView,
     CheckRoomValidView,
+    LLMMetricsView,
+    GlobalLeaderboardView,
 )
 
 urlpatterns = [
@@ -21,6 +24,11 @@ urlpatterns = [
     path("game/create/", CreateGameView.as_view(), name="create_game"),
     path("game/start/", StartGameView.as_view(), name="start_game"),
     path("game/end/", EndGameView.as_view(), name="end_game"),
+    path(
+        "game/<uuid:game_id>/timeline/",
+        GameTimelineView.as_view(),
+        name="game_timeline",
+    ),
     path("topic/", SubtopicsAPIView.as_view(), name="generate_subtopics"),
     path(
         "single-player/start",
@@ -37,4 +45,10 @@ urlpatterns = [
         CheckAnswerAPIView.as_view(),
         name="check_single_player_answer",
     ),
+    path(
+        "leaderboards/global/",
+        GlobalLeaderboardView.as_view(),
+        name="global_leaderboard",
+    ),
+    path("metrics/llm/", LLMMetricsView.as_view(), name="llm_metrics"),
 ]
@@ -1,4 +1,11 @@
-from ai_quiz.views.games import CreateGameView, EndGameView, StartGameView
+from ai_quiz.views.games import (
+    CreateGameView,
+    EndGameView,
+    GameTimelineView,
+    StartGameView,
+)
+from ai_quiz.views.leaderboards import GlobalLeaderboardView
+from ai_quiz.views.metrics import LLMMetricsView
 from ai_quiz.views.questions import SubtopicsAPIView
 from ai_quiz.views.rooms import (
     CreateRoomView,
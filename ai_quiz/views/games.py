@@ -1,4 +1,6 @@
 import logging
+import math
+
 from django.db.models import Q
 from adrf.views import APIView as AsyncAPIView
 from channels.db import database_sync_to_async
@@ -8,8 +10,11 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from ai_quiz.ai import generate_questions, generate_subtopics
-from ai_quiz.models import Game, Participant, Question, Room, Topic
+from ai_quiz import leaderboard
+from ai_quiz.admission import LLM_ADMISSION
+from ai_quiz.game_preparation import acreate_job_from_pool, create_job, start_job
+from ai_quiz.llm_policy import AdmissionRejected
+from ai_quiz.models import Game, GamePreparationJob, Participant, Room
 from ai_quiz.serializers import (
     CreateGameRequestSerializer,
     CreateGameResponseSerializer,
@@ -42,54 +47,48 @@ class CreateGameView(AsyncAPIView):
             return None
 
     async def create_game(
-        self, room: Room, topic: str, n, difficulty: str, time_per_question: int = 30
-    ):
-        """Create a new game object associated with the room."""
+        self,
+        room: Room,
+        topic: str,
+        n,
+        difficulty: str,
+        time_per_question: int = 30,
+        subtopics: list[str] | None = None,
+    ) -> tuple[Game, GamePreparationJob | None]:
+        """Create a new game, filled from a question pool when one is ready.
+        Returns the game and its job, or None if it still needs preparing."""
         game = await Game.objects.acreate(room=room, status="waiting")
         await database_sync_to_async(game.create_leaderboard)()
-        subtopics = await generate_subtopics(topic)
-        await self._fetch_and_create_questions(
+        job = await acreate_job_from_pool(
             game=game,
             topic=topic,
-            subtopics=subtopics.subtopics,
             n=n,
             difficulty=difficulty,
             time_per_question=time_per_question,
+            subtopics=subtopics,
         )
-        return game.id
+        return game, job
 
-    async def _fetch_and_create_questions(
+    async def prepare_game(
         self,
         game: Game,
         topic: str,
-        subtopics: list[str],
-        n: int,
+        n,
         difficulty: str,
         time_per_question: int = 30,
-    ):
-        """Fetch questions from the AI backend and create question objects."""
-        questions = await generate_questions(
+        subtopics: list[str] | None = None,
+    ) -> GamePreparationJob:
+        """Prepare the game in the background."""
+        job = await create_job(
+            game=game,
             topic=topic,
-            subtopics=subtopics,
             n=n,
             difficulty=difficulty,
+            time_per_question=time_per_question,
+            subtopics=subtopics,
         )
-        topic = await Topic.objects.acreate(name=topic, subtopics=subtopics)
-        questions = await Question.objects.abulk_create(
-            [
-                Question(
-                    game=game,
-                    subtopic=question.subtopic,
-                    question=question.question,
-                    correct_answer=question.answer,
-                    options=question.options,
-                    topic=topic,
-                    time_per_question=time_per_question,
-                )
-                for question in questions.questions
-            ]
-        )
-        return questions
+        start_job(job.pk)
+        return job
 
     @swagger_auto_schema(
         request_body=CreateGameRequestSerializer,
@@ -112,15 +111,43 @@ class CreateGameView(AsyncAPIView):
                 {"error": "No active rooms found for user."},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        await room.aend_all_games()
+        args = (
+            data["topic"],
+            data["n"],
+            data["difficulty"],
+            data["timePerQuestion"],
+            data["subtopics"],
+        )
+        # The host joins first so the new leaderboard includes them
         await Participant.objects.aget_or_create(
             room=room, user=request.user, status="ready"
         )
-        game_id = await self.create_game(
-            room, data["topic"], data["n"], data["difficulty"], data["timePerQuestion"]
-        )
+        game, job = await self.create_game(room, *args)
+        # A game filled from a pool makes no LLM call, so it never queues
+        queue_position, estimated_wait = 0, 0.0
+        if job is None:
+            try:
+                # Rejected before the room changes when the LLM queue is too long
+                queue_position, estimated_wait = LLM_ADMISSION.check(str(room.host_id))
+            except AdmissionRejected as e:
+                await game.adelete()
+                retry_after = math.ceil(e.retry_after)
+                return Response(
+                    {
+                        "error": "Question generation is busy, try again later.",
+                        "retryAfter": retry_after,
+                    },
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={"Retry-After": str(retry_after)},
+                )
+        await room.aend_all_games(keep=game)
+        if job is None:
+            job = await self.prepare_game(game, *args)
         response_data = {
-            "gameId": game_id,
+            "gameId": game.id,
+            "status": job.status,
+            "queuePosition": queue_position,
+            "estimatedWait": round(estimated_wait, 1),
         }
         return Response(response_data, status=status.HTTP_201_CREATED)
 
@@ -156,6 +183,11 @@ class StartGameView(APIView):
                 )
 
             game: Game = room.get_current_game()
+            if not game.questions.exists():
+                return Response(
+                    {"error": "Questions are still being generated."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
             game.status = "in_progress"
             game.save()
             room.status = "active"
@@ -197,3 +229,16 @@ class EndGameView(APIView):
         # End the game (e.g., setting a game state, etc.)
         game.end_game()
         return Response({"status": "game_ended"}, status=status.HTTP_200_OK)
+
+
+class GameTimelineView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, game_id, *args, **kwargs):
+        """The leaderboard of the game after each question, as logged frames
+        of score and rank changes."""
+        if not Game.objects.filter(id=game_id).exists():
+            return Response(
+                {"error": "Game not found."}, status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(leaderboard.get_timeline(game_id), status=status.HTTP_200_OK)
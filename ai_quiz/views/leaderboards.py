@@ -0,0 +1,74 @@
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ai_quiz.leaderboard import global_board
+from ai_quiz.models import Topic
+from quizio.utils import normalize_text
+
+# Longest board a single request can read
+MAX_LIMIT = 100
+
+
+def _entry(entry, rank: int, username: str) -> dict:
+    return {
+        "rank": rank,
+        "username": username,
+        "score": entry.score,
+        "gamesPlayed": entry.games_played,
+        "correctAnswers": entry.correct_answers,
+        "wrongAnswers": entry.wrong_answers,
+        "skippedQuestions": entry.skipped_questions,
+    }
+
+
+class GlobalLeaderboardView(APIView):
+    """The top players over every finished game, optionally of one topic and
+    the current week or month, and the requesting user's own rank."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        window = request.query_params.get("window", global_board.ALL)
+        if window != global_board.ALL and window not in global_board.WINDOWS:
+            return Response(
+                {"error": "window must be one of all, week or month."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            limit = min(int(request.query_params.get("limit", 10)), MAX_LIMIT)
+        except ValueError:
+            return Response(
+                {"error": "limit must be a number."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        scope = global_board.scope_key()
+        topic_name = request.query_params.get("topic")
+        if topic_name:
+            topic = Topic.objects.filter(
+                normalized_name=normalize_text(topic_name)
+            ).first()
+            if topic is None:
+                return Response(
+                    {"error": "Topic not found."}, status=status.HTTP_404_NOT_FOUND
+                )
+            scope = global_board.scope_key(topic.id)
+        period = global_board.period_key(window, timezone.now())
+
+        entries = global_board.top(scope, period, max(limit, 0))
+        mine, rank = global_board.rank_of(request.user.id, scope, period)
+        return Response(
+            {
+                "scope": scope,
+                "period": period,
+                "entries": [
+                    _entry(entry, i, entry.user.username)
+                    for i, entry in enumerate(entries, start=1)
+                ],
+                "me": _entry(mine, rank, request.user.username) if mine else None,
+            },
+            status=status.HTTP_200_OK,
+        )
@@ -0,0 +1,16 @@
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ai_quiz import metrics
+
+
+class LLMMetricsView(APIView):
+    """In-process LLM call counters and latency percentiles of this worker."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(
+            {"counters": metrics.counters(), "histograms": metrics.histograms()}
+        )
@@ -6,13 +6,14 @@ from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from ai_quiz.ai import generate_questions, generate_subtopics
+from ai_quiz.ai import generate_questions
 from ai_quiz.models import Question
 from ai_quiz.serializers import (
     QuestionsRequestSerializer,
     SubtopicsRequestSerializer,
     SubtopicsResponseSerializer,
 )
+from ai_quiz.topic_cache import generate_subtopics
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -4,12 +4,12 @@ from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from ai_quiz.ai import generate_questions
 from ai_quiz.models import (
     SinglePlayerGame,
     SinglePlayerQuestion,
     Topic,
 )
+from ai_quiz.question_bank import generate_questions, make_bank_key
 from ai_quiz.serializers import (
     QuestionsRequestSerializer,
     SingleQuestionsResponseSerializer,
@@ -43,11 +43,16 @@ class StartSinglePlayerGameAPIView(AsyncAPIView):
                 },
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        topic = await Topic.objects.acreate(
-            name=serializer.data.get("topic"),
-            subtopics=serializer.data.get("subtopics"),
+        topic = await Topic.aget_or_create_by_name(
+            serializer.data.get("topic"),
+            serializer.data.get("subtopics"),
         )
         questions = await generate_questions(**serializer.data)
+        bank_key = make_bank_key(
+            serializer.data.get("topic"),
+            serializer.data.get("difficulty"),
+            serializer.data.get("subtopics"),
+        )
 
         questions = await SinglePlayerQuestion.objects.abulk_create(
             [
@@ -60,6 +65,7 @@ class StartSinglePlayerGameAPIView(AsyncAPIView):
                     correct_answer=q.answer,
                     timer=serializer.data.get("timer"),
                     difficulty=serializer.data.get("difficulty"),
+                    bank_key=bank_key,
                 )
                 for q in questions.questions
             ]
@@ -178,6 +178,182 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Shared cache used for cross-worker locks; each worker has its own memory cache otherwise
+if os.environ.get("REDIS_CACHE_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_CACHE_URL"],
+        }
+    }
+
 if DEBUG:
     CORS_ALLOW_ALL_ORIGINS = True
 ENABLE_OPENAI = os.environ.get("ENABLE_OPENAI", False)
+
+# Question bank: reuse previously generated questions before calling the LLM
+QUESTION_BANK_ENABLED = (
+    os.environ.get("QUESTION_BANK_ENABLED", "true").lower() == "true"
+)
+# Only questions generated within this window are served from the bank
+QUESTION_BANK_MAX_AGE = timedelta(
+    days=int(os.environ.get("QUESTION_BANK_MAX_AGE_DAYS", 30))
+)
+# How many times a banked question may be served again after its first use
+QUESTION_BANK_MAX_REUSE = int(os.environ.get("QUESTION_BANK_MAX_REUSE", 5))
+# Upper bound on rows read per lookup so popular keys stay cheap
+QUESTION_BANK_SCAN_LIMIT = int(os.environ.get("QUESTION_BANK_SCAN_LIMIT", 500))
+
+# Subtopic cache: in-process LRU in front of the Topic table
+SUBTOPIC_CACHE_SIZE = int(os.environ.get("SUBTOPIC_CACHE_SIZE", 1024))
+# Cached subtopics older than this are regenerated by the LLM
+SUBTOPIC_CACHE_TTL = timedelta(
+    hours=int(os.environ.get("SUBTOPIC_CACHE_TTL_HOURS", 24 * 7))
+)
+
+# Stream questions into the game as the LLM produces them
+QUESTION_STREAMING_ENABLED = (
+    os.environ.get("QUESTION_STREAMING_ENABLED", "true").lower() == "true"
+)
+# Number of streamed questions written per bulk insert
+QUESTION_STREAM_BATCH_SIZE = int(os.environ.get("QUESTION_STREAM_BATCH_SIZE", 5))
+
+# Requests for more than this many questions are split into concurrent shards
+QUESTION_SHARD_SIZE = int(os.environ.get("QUESTION_SHARD_SIZE", 10))
+# Maximum number of shard LLM calls in flight for a single request
+QUESTION_SHARD_CONCURRENCY = int(os.environ.get("QUESTION_SHARD_CONCURRENCY", 4))
+
+# Preparation jobs whose heartbeat is older than this are considered dead
+GAME_PREPARATION_STALE_AFTER = timedelta(
+    seconds=int(os.environ.get("GAME_PREPARATION_STALE_AFTER_SECONDS", 60))
+)
+# A job that died this many times is marked as failed instead of resumed
+GAME_PREPARATION_MAX_ATTEMPTS = int(os.environ.get("GAME_PREPARATION_MAX_ATTEMPTS", 3))
+
+# LLM call policy: deadlines cover every retry and the backoff between them
+LLM_TOPIC_DEADLINE = float(os.environ.get("LLM_TOPIC_DEADLINE_SECONDS", 20))
+LLM_QUESTION_DEADLINE = float(os.environ.get("LLM_QUESTION_DEADLINE_SECONDS", 90))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 2))
+LLM_RETRY_BACKOFF = float(os.environ.get("LLM_RETRY_BACKOFF_SECONDS", 0.5))
+LLM_RETRY_BACKOFF_MAX = float(os.environ.get("LLM_RETRY_BACKOFF_MAX_SECONDS", 4))
+# A second, hedged request is sent once a call is slower than this percentile
+LLM_HEDGE_PERCENTILE = float(os.environ.get("LLM_HEDGE_PERCENTILE", 95))
+# Hedging stays off until this many latencies have been observed
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", 20))
+
+# Offline stand-in for the LLM used when ENABLE_OPENAI is off (see ai_quiz/fake_llm.py)
+FAKE_LLM_SEED = int(os.environ.get("FAKE_LLM_SEED", 0))
+# Median seconds before the first token; the jitter is the sigma of a log-normal factor
+FAKE_LLM_LATENCY = float(os.environ.get("FAKE_LLM_LATENCY_SECONDS", 0))
+FAKE_LLM_LATENCY_JITTER = float(os.environ.get("FAKE_LLM_LATENCY_JITTER", 0))
+# Streaming speed in words per second, 0 to return the whole response at once
+FAKE_LLM_TOKENS_PER_SECOND = float(os.environ.get("FAKE_LLM_TOKENS_PER_SECOND", 0))
+FAKE_LLM_THROUGHPUT_JITTER = float(os.environ.get("FAKE_LLM_THROUGHPUT_JITTER", 0))
+
+# Reject LLM questions that reword a question already asked on the topic
+DEDUPE_ENABLED = os.environ.get("DEDUPE_ENABLED", "true").lower() == "true"
+# Minimum shingle overlap (Jaccard) for two questions with the same answer
+DEDUPE_THRESHOLD = float(os.environ.get("DEDUPE_THRESHOLD", 0.6))
+# Per-topic indexes kept in memory and how long before one is reloaded
+DEDUPE_INDEX_TOPICS = int(os.environ.get("DEDUPE_INDEX_TOPICS", 256))
+DEDUPE_INDEX_TTL = timedelta(
+    minutes=int(os.environ.get("DEDUPE_INDEX_TTL_MINUTES", 60))
+)
+# Stored questions per table loaded into a topic's index
+DEDUPE_INDEX_MAX_QUESTIONS = int(os.environ.get("DEDUPE_INDEX_MAX_QUESTIONS", 5000))
+# Extra LLM rounds to replace rejected near-duplicates
+DEDUPE_REGENERATE_ROUNDS = int(os.environ.get("DEDUPE_REGENERATE_ROUNDS", 1))
+
+# Pre-warmed question pools for popular topics, claimed when a game is created
+QUESTION_POOL_ENABLED = (
+    os.environ.get("QUESTION_POOL_ENABLED", "true").lower() == "true"
+)
+# How many of the most played topic/difficulty pairs get pools
+QUESTION_POOL_TOPICS = int(os.environ.get("QUESTION_POOL_TOPICS", 30))
+# Games played within this window count towards a topic's popularity
+QUESTION_POOL_POPULARITY_WINDOW = timedelta(
+    days=int(os.environ.get("QUESTION_POOL_POPULARITY_WINDOW_DAYS", 7))
+)
+# Available pools kept ready per topic and difficulty
+QUESTION_POOL_DEPTH = int(os.environ.get("QUESTION_POOL_DEPTH", 3))
+# Questions per pool; games asking for more go through the LLM
+QUESTION_POOL_SET_SIZE = int(os.environ.get("QUESTION_POOL_SET_SIZE", 10))
+# Unclaimed pools older than this are discarded
+QUESTION_POOL_MAX_AGE = timedelta(
+    days=int(os.environ.get("QUESTION_POOL_MAX_AGE_DAYS", 7))
+)
+# Seconds between warming passes when running in a loop
+QUESTION_POOL_WARM_INTERVAL = int(os.environ.get("QUESTION_POOL_WARM_INTERVAL", 300))
+# Pools generated concurrently during a warming pass
+QUESTION_POOL_WARM_CONCURRENCY = int(
+    os.environ.get("QUESTION_POOL_WARM_CONCURRENCY", 4)
+)
+
+# Store a row per LLM chain call for the llm_metrics_report command
+LLM_METRICS_PERSIST = os.environ.get("LLM_METRICS_PERSIST", "true").lower() == "true"
+# Stored LLM calls older than this are deleted by prune_llm_call_records
+LLM_CALL_RECORD_RETENTION = timedelta(
+    days=int(os.environ.get("LLM_CALL_RECORD_RETENTION_DAYS", 30))
+)
+
+# Concurrent identical LLM calls share one result (see ai_quiz/singleflight.py)
+SINGLE_FLIGHT_ENABLED = (
+    os.environ.get("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+)
+# Seconds a worker holds the lock on a call; other workers wait at most this long
+SINGLE_FLIGHT_LOCK_TTL = float(os.environ.get("SINGLE_FLIGHT_LOCK_TTL_SECONDS", 150))
+# How often workers waiting on another worker's call check for its result
+SINGLE_FLIGHT_POLL_INTERVAL = float(
+    os.environ.get("SINGLE_FLIGHT_POLL_INTERVAL_SECONDS", 0.25)
+)
+# Seconds a published result stays readable by waiting workers
+SINGLE_FLIGHT_RESULT_TTL = float(os.environ.get("SINGLE_FLIGHT_RESULT_TTL_SECONDS", 60))
+
+# Games without subtopics get them from the same LLM call as their questions
+COMBINED_GENERATION_ENABLED = (
+    os.environ.get("COMBINED_GENERATION_ENABLED", "true").lower() == "true"
+)
+
+# Response format the LLM is asked for: "json" (JSON mode with OpenAI) or "yaml"
+LLM_OUTPUT_FORMAT = os.environ.get("LLM_OUTPUT_FORMAT", "json").lower()
+
+# Size question batches from the observed LLM latency instead of QUESTION_SHARD_SIZE
+ADAPTIVE_BATCHING_ENABLED = (
+    os.environ.get("ADAPTIVE_BATCHING_ENABLED", "true").lower() == "true"
+)
+# Smallest adaptive batch, so the fixed cost of a call is not paid too often
+QUESTION_BATCH_MIN_SIZE = int(os.environ.get("QUESTION_BATCH_MIN_SIZE", 3))
+# Maximum number of question LLM calls in flight across all requests
+QUESTION_LLM_CONCURRENCY = int(os.environ.get("QUESTION_LLM_CONCURRENCY", 16))
+
+# Cluster-wide admission control for LLM calls (see ai_quiz/admission.py)
+ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "true").lower() == "true"
+# Maximum number of LLM calls in flight across all workers
+ADMISSION_CONCURRENCY = int(os.environ.get("ADMISSION_CONCURRENCY", 32))
+# LLM calls started per second across all workers
+ADMISSION_RATE = int(os.environ.get("ADMISSION_RATE_PER_SECOND", 10))
+# Calls expected to queue longer than this many seconds are rejected
+ADMISSION_MAX_QUEUE_WAIT = float(os.environ.get("ADMISSION_MAX_QUEUE_WAIT_SECONDS", 15))
+# Seconds before the slot of a worker that died is freed
+ADMISSION_SLOT_LEASE = int(os.environ.get("ADMISSION_SLOT_LEASE_SECONDS", 300))
+# Seconds between checks for slots freed by other workers
+ADMISSION_POLL_INTERVAL = float(os.environ.get("ADMISSION_POLL_INTERVAL_SECONDS", 0.1))
+
+# Redis holding the live leaderboards of games in progress; without it they
+# are kept in process memory, which is only correct with a single worker
+LEADERBOARD_REDIS_URL = os.environ.get(
+    "LEADERBOARD_REDIS_URL", os.environ.get("REDIS_CACHE_URL")
+)
+# Seconds a live leaderboard, every player's keys included, outlives its last
+# answer
+LEADERBOARD_TTL = int(os.environ.get("LEADERBOARD_TTL_SECONDS", 24 * 60 * 60))
+# Leaderboard changes within this many seconds go out as one room broadcast;
+# 0 broadcasts every answer on its own
+LEADERBOARD_COALESCE_WINDOW = float(
+    os.environ.get("LEADERBOARD_COALESCE_WINDOW_SECONDS", 0.1)
+)
+# Live leaderboards are written to the database when a question closes, when
+# the game ends and at least this often while answers come in
+LEADERBOARD_CHECKPOINT_INTERVAL = float(
+    os.environ.get("LEADERBOARD_CHECKPOINT_INTERVAL_SECONDS", 30)
+)
@@ -1,4 +1,7 @@
 import base64
+import threading
+import time
+from collections import OrderedDict
 from io import BytesIO
 from urllib.parse import parse_qs
 
@@ -33,3 +36,48 @@ def generate_qr_code(string: str):
     img.save(buffered, format="PNG")
     qr_code_base64 = base64.b64encode(buffered.getvalue()).decode("utf-8")
     return qr_code_base64
+
+
+def normalize_text(value: str) -> str:
+    """Lowercase and collapse whitespace so equivalent inputs compare equal."""
+    return " ".join(str(value).lower().split())
+
+
+class TTLCache:
+    """A small in-process LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 128, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires_at, value = self._data[key]
+            except KeyError:
+                return default
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)